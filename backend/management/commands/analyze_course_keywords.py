@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.utils.analysis_utils import bulk_analyze_keywords
+
+
+class Command(BaseCommand):
+    help = '重新分析課程任務所有作業的關鍵詞（單次查詢、平行斷詞、bulk_update 寫回）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_task_id', type=int, help='課程任務 ID')
+        parser.add_argument('--processes', type=int, help='平行斷詞的行程數（預設為 KEYWORD_BULK_PROCESSES）', required=False)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        result = bulk_analyze_keywords(options['course_task_id'], processes=options.get('processes'))
+        if not result['success']:
+            raise CommandError(result['message'])
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f"已分析 {result['data']['analyzed_count']} 份作業的關鍵詞，耗時 {elapsed:.2f} 秒"
+        ))
@@ -0,0 +1,113 @@
+import re
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.models import StudentCourseTask
+from backend.utils.keyword_analyzer import TOP_KEYWORDS, KeywordAnalyzer
+from backend.utils.keyword_normalization import get_dictionary_words, get_normalization_map
+
+# 舊版寫死的相似詞合併
+SIMILAR_WORDS = {
+    'api': ['apis', 'ap', 'api'],
+}
+
+
+def legacy_analyze(text):
+    """舊版 analyze_keywords 的作法：每次重建停用詞集合、逐詞執行兩次未編譯的正規表示式"""
+    import jieba
+    from stopwordsiso import stopwords
+
+    words = jieba.cut(text.lower())
+    stop_words = set(stopwords(['zh', 'en']))
+    filtered_words = []
+    for word in words:
+        word = word.lower().strip()
+        if (word and
+                word not in stop_words and
+                len(word) > 1 and
+                not re.match(r'^\d+$', word) and
+                re.search(r'[a-zA-Z\u4e00-\u9fff]', word)):
+            filtered_words.append(word)
+
+    word_counts = Counter(filtered_words)
+    for main_word, variants in SIMILAR_WORDS.items():
+        total_count = sum(word_counts[variant] for variant in variants if variant in word_counts)
+        if total_count > 0:
+            for variant in variants:
+                if variant != main_word and variant in word_counts:
+                    del word_counts[variant]
+            word_counts[main_word] = total_count
+
+    return {
+        'top_keywords': dict(word_counts.most_common(TOP_KEYWORDS)),
+        'total_words': len(filtered_words),
+        'unique_words': len(word_counts)
+    }
+
+
+class Command(BaseCommand):
+    help = '量測關鍵詞分析每份作業的斷詞成本，比較舊版作法與共用的 KeywordAnalyzer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course-task', type=int, help='只使用指定課程任務的作業', required=False)
+        parser.add_argument('--limit', type=int, default=200, help='最多使用的作業數')
+        parser.add_argument('--file', action='append', default=[], help='改用文字檔作為樣本（可重複指定）')
+        parser.add_argument('--repeat', type=int, default=3, help='每份樣本重複量測的次數，取最佳值')
+
+    def _load_texts(self, options):
+        if options['file']:
+            texts = []
+            for path in options['file']:
+                with open(path, encoding='utf-8') as f:
+                    texts.append(f.read())
+            return texts
+
+        queryset = StudentCourseTask.objects.exclude(ocr_content='').order_by('id')
+        if options.get('course_task'):
+            queryset = queryset.filter(course_task_id=options['course_task'])
+        return list(queryset.values_list('ocr_content', flat=True)[:options['limit']])
+
+    def _measure(self, func, texts, repeat):
+        best = None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            for text in texts:
+                func(text)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def handle(self, *args, **options):
+        texts = self._load_texts(options)
+        if not texts:
+            raise CommandError('沒有可量測的樣本（需要已有 OCR 內容的作業，或以 --file 指定文字檔）')
+
+        # 冷啟動：jieba 詞典與停用詞載入，只在每個 worker 行程付出一次
+        start = time.perf_counter()
+        analyzer = KeywordAnalyzer()
+        init_ms = (time.perf_counter() - start) * 1000
+
+        normalization = get_normalization_map()
+        dictionary_words = get_dictionary_words()
+        mismatches = sum(
+            legacy_analyze(text) != analyzer.analyze(text, normalization, dictionary_words) for text in texts
+        )
+        if mismatches:
+            self.stdout.write(self.style.WARNING(f'{mismatches} 份樣本的分析結果與舊版不同（正規化對照表不只合併 api）'))
+
+        characters = sum(len(text) for text in texts)
+        legacy = self._measure(legacy_analyze, texts, options['repeat'])
+        current = self._measure(
+            lambda text: analyzer.analyze(text, normalization, dictionary_words), texts, options['repeat']
+        )
+
+        self.stdout.write(f'樣本 {len(texts)} 份，平均 {characters / len(texts):.0f} 字')
+        self.stdout.write(f'初始化（jieba 詞典 + 停用詞）: {init_ms:.1f} ms')
+        for label, elapsed in (('舊版', legacy), ('KeywordAnalyzer', current)):
+            self.stdout.write(
+                f'{label:<16}{elapsed * 1000 / len(texts):>10.2f} ms/份'
+                f'{characters / elapsed / 1000:>12.1f} k字/秒'
+            )
+        self.stdout.write(self.style.SUCCESS(f'加速 {legacy / current:.2f} 倍'))
@@ -0,0 +1,143 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from backend.models import Course, CourseTask, Student, StudentClass, StudentCourseTask
+from backend.utils.rollup_sql import aggregate_course_task_rollup, supports_sql_rollup
+from backend.utils.rollup_utils import compute_course_task_rollup_in_python
+from backend.utils.tool_counter import ASSISTIVE_TOOLS
+
+
+class BenchmarkRollback(Exception):
+    pass
+
+
+def legacy_rollup(course_task_id):
+    """舊版 analyze_all_student_course_tasks 的作法：載入完整的作業物件逐一加總"""
+    all_assistive_tool_analysis = {}
+    all_prompt_analysis = {}
+    all_keyword_analysis = {}
+    student_course_tasks = StudentCourseTask.objects.filter(course_task_id=course_task_id)
+    for task in student_course_tasks:
+        if task.assistive_tool_analysis:
+            for tool, value in task.assistive_tool_analysis.items():
+                all_assistive_tool_analysis[tool] = all_assistive_tool_analysis.get(tool, 0) + value
+        if task.prompt_analysis and 'prompts' in task.prompt_analysis:
+            for prompt_item in task.prompt_analysis['prompts']:
+                keyword = prompt_item.get('keyword')
+                all_prompt_analysis[keyword] = all_prompt_analysis.get(keyword, 0) + prompt_item.get('times', 0)
+        if task.keyword_analysis and 'top_keywords' in task.keyword_analysis:
+            for keyword, count in task.keyword_analysis['top_keywords'].items():
+                all_keyword_analysis[keyword] = all_keyword_analysis.get(keyword, 0) + count
+    return {
+        'student_tasks_count': student_course_tasks.count(),
+        'all_assistive_tool_analysis': all_assistive_tool_analysis,
+        'all_prompt_analysis': all_prompt_analysis,
+        'all_keyword_analysis': all_keyword_analysis,
+    }
+
+
+def generate_analysis(rng, vocabulary, prompts):
+    return {
+        # 與實際分析結果相同，列出所有輔助工具（未使用的為 0）
+        'assistive_tool_analysis': {tool: rng.choice((0, 0, 0, 1, 2, 5)) for tool in ASSISTIVE_TOOLS},
+        'prompt_analysis': {'prompts': [
+            {'keyword': keyword, 'times': rng.randint(1, 4)} for keyword in rng.sample(prompts, rng.randint(0, 6))
+        ]},
+        'keyword_analysis': {
+            'top_keywords': {keyword: rng.randint(1, 30) for keyword in rng.sample(vocabulary, 50)},
+            'total_words': 0,
+            'unique_words': 50,
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = '比較課程任務彙總的三種計算方式：舊版逐物件迴圈、Python 逐筆加總與資料庫端 JSON 聚合查詢'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course-task', type=int, help='使用既有課程任務的作業，不產生測試資料', required=False)
+        parser.add_argument('--submissions', type=int, default=10000, help='產生的測試作業數（量測後全部回滾）')
+        parser.add_argument('--vocabulary', type=int, default=3000, help='測試資料的關鍵詞詞彙量')
+        parser.add_argument('--repeat', type=int, default=3, help='每種方式重複量測的次數，取最佳值')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def _create_submissions(self, options):
+        rng = random.Random(options['seed'])
+        vocabulary = [f'詞彙{index}' for index in range(max(options['vocabulary'], 50))]
+        prompts = [f'提示{index}' for index in range(200)]
+
+        student_class = StudentClass.objects.create(name='rollup benchmark')
+        course = Course.objects.create(name='rollup benchmark', student_class=student_class)
+        course_task = CourseTask.objects.create(name='rollup benchmark', student_class=student_class, course=course)
+        students = Student.objects.bulk_create(
+            [
+                Student(student_id=f'rb{course_task.id}_{index}', name=f'benchmark {index}',
+                        student_class=student_class, password='!')
+                for index in range(options['submissions'])
+            ],
+            batch_size=1000,
+        )
+        # bulk_create 不經過 save()，不會觸發彙總的增量更新
+        StudentCourseTask.objects.bulk_create(
+            [
+                StudentCourseTask(
+                    student=student, course=course, course_task=course_task,
+                    **generate_analysis(rng, vocabulary, prompts)
+                )
+                for student in students
+            ],
+            batch_size=500,
+        )
+        return course_task.id
+
+    def _measure(self, func, course_task_id, repeat):
+        best = None
+        result = None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            result = func(course_task_id)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def _run(self, course_task_id, options):
+        paths = [('舊版迴圈', legacy_rollup), ('Python 加總', compute_course_task_rollup_in_python)]
+        if supports_sql_rollup():
+            paths.append((f'SQL 聚合 ({connection.vendor})', aggregate_course_task_rollup))
+        else:
+            self.stdout.write(self.style.WARNING(f'{connection.vendor} 不支援 SQL 聚合，只比較 Python 的作法'))
+
+        results = []
+        for label, func in paths:
+            elapsed, result = self._measure(func, course_task_id, options['repeat'])
+            results.append((label, elapsed, result))
+
+        count = results[0][2]['student_tasks_count']
+        self.stdout.write(f'課程任務 {course_task_id}，共 {count} 份作業')
+        baseline = results[0][1]
+        for label, elapsed, _ in results:
+            self.stdout.write(f'{label:<20}{elapsed * 1000:>10.1f} ms{baseline / elapsed:>8.2f} 倍')
+
+        reference = results[0][2]
+        mismatched = [label for label, _, result in results[1:] if result != reference]
+        if mismatched:
+            raise CommandError(f'彙總結果與舊版不同: {", ".join(mismatched)}')
+        self.stdout.write(self.style.SUCCESS('各方式的彙總結果相同'))
+
+    def handle(self, *args, **options):
+        if options.get('course_task'):
+            self._run(options['course_task'], options)
+            return
+
+        try:
+            with transaction.atomic():
+                start = time.perf_counter()
+                course_task_id = self._create_submissions(options)
+                self.stdout.write(f'產生 {options["submissions"]} 份測試作業: {time.perf_counter() - start:.1f} 秒')
+                self._run(course_task_id, options)
+                raise BenchmarkRollback()
+        except BenchmarkRollback:
+            self.stdout.write('已回滾測試資料')
@@ -0,0 +1,108 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# web 行程不應載入的重量級套件（只屬於 Celery worker）
+FORBIDDEN_MODULES = ['torch', 'torchvision', 'easyocr', 'cv2', 'jieba', 'openai', 'scipy', 'skimage']
+
+# 模擬 web worker 啟動（Dockerfile 以 gunicorn + UvicornWorker 提供 ASGI application）：
+# 載入 ASGI application 並解析全部 URL（會引用所有 views）
+STARTUP_SCRIPT = """
+import resource
+from uiux_jambot_research.asgi import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+class Command(BaseCommand):
+    help = '以 python -X importtime 量測 web 行程冷啟動時間與記憶體，並檢查是否誤載入 ML 套件'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-import-ms',
+            type=float,
+            default=getattr(settings, 'WEB_STARTUP_MAX_IMPORT_MS', 2000),
+            help='冷啟動 import 時間上限 (毫秒)',
+        )
+        parser.add_argument(
+            '--max-rss-mb',
+            type=float,
+            default=getattr(settings, 'WEB_STARTUP_MAX_RSS_MB', 150),
+            help='單一 web worker 啟動後的記憶體上限 (MB)',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='列出最耗時的前 N 個模組',
+        )
+
+    def handle(self, *args, **options):
+        env = os.environ.copy()
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'uiux_jambot_research.settings')
+
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            raise CommandError(f'web 行程啟動失敗:\n{proc.stderr[-2000:]}')
+
+        imports = self._parse_importtime(proc.stderr)
+        total_ms = sum(self_us for _, self_us, _ in imports) / 1000
+        rss_mb = self._parse_rss_mb(proc.stdout)
+
+        self.stdout.write(f'載入模組數: {len(imports)}')
+        self.stdout.write(f'import 總耗時: {total_ms:.1f} ms')
+        self.stdout.write(f'最大常駐記憶體: {rss_mb:.1f} MB')
+
+        self.stdout.write(f'最耗時的 {options["top"]} 個模組 (cumulative):')
+        for name, _, cumulative_us in sorted(imports, key=lambda item: item[2], reverse=True)[:options['top']]:
+            self.stdout.write(f'  {cumulative_us / 1000:9.1f} ms  {name}')
+
+        errors = []
+        loaded = {name.split('.')[0] for name, _, _ in imports}
+        leaked = [module for module in FORBIDDEN_MODULES if module in loaded]
+        if leaked:
+            errors.append(f'web 行程載入了 worker 專用套件: {", ".join(leaked)}')
+        if total_ms > options['max_import_ms']:
+            errors.append(f'import 耗時 {total_ms:.1f} ms 超過上限 {options["max_import_ms"]} ms')
+        if rss_mb > options['max_rss_mb']:
+            errors.append(f'記憶體 {rss_mb:.1f} MB 超過上限 {options["max_rss_mb"]} MB')
+
+        if errors:
+            raise CommandError('\n'.join(errors))
+
+        self.stdout.write(self.style.SUCCESS('web 行程啟動成本符合預算'))
+
+    @staticmethod
+    def _parse_importtime(stderr):
+        """解析 importtime 輸出：import time: self [us] | cumulative | imported package"""
+        imports = []
+        for line in stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            parts = line[len('import time:'):].split('|')
+            if len(parts) != 3 or not parts[0].strip().isdigit():
+                continue
+            imports.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+        return imports
+
+    @staticmethod
+    def _parse_rss_mb(stdout):
+        lines = stdout.strip().splitlines()
+        if not lines:
+            return 0.0
+        # Linux 的 ru_maxrss 單位為 KB，macOS 為 bytes
+        max_rss = int(lines[-1])
+        if sys.platform == 'darwin':
+            return max_rss / 1024 / 1024
+        return max_rss / 1024
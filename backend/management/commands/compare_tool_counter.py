@@ -0,0 +1,90 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from backend.models import StudentCourseTask
+from backend.utils.tool_counter import ASSISTIVE_TOOLS, count_assistive_tools
+
+
+class Command(BaseCommand):
+    help = '比較本機輔助工具比對與已儲存的 GPT 分析結果，評估是否可改用本機統計'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course-task', type=int, help='只比較指定課程任務的作業', required=False)
+        parser.add_argument('--limit', type=int, help='最多比較的作業數', required=False)
+        parser.add_argument('--show-diffs', type=int, default=10, help='列出差異最大的作業數')
+
+    def handle(self, *args, **options):
+        queryset = StudentCourseTask.objects.exclude(ocr_content='').exclude(
+            assistive_tool_analysis={}
+        ).order_by('id')
+        if options.get('course_task'):
+            queryset = queryset.filter(course_task_id=options['course_task'])
+        if options.get('limit'):
+            queryset = queryset[:options['limit']]
+
+        stats = {tool: {'exact': 0, 'abs_error': 0, 'llm_total': 0, 'local_total': 0, 'tp': 0, 'fp': 0, 'fn': 0}
+                 for tool in ASSISTIVE_TOOLS}
+        diffs = []
+        documents = 0
+        exact_documents = 0
+        elapsed = 0.0
+
+        for task_id, ocr_content, llm_counts in queryset.values_list('id', 'ocr_content', 'assistive_tool_analysis'):
+            start = time.perf_counter()
+            local_counts = count_assistive_tools(ocr_content)
+            elapsed += time.perf_counter() - start
+            documents += 1
+
+            document_error = 0
+            for tool in ASSISTIVE_TOOLS:
+                llm_count = int(llm_counts.get(tool) or 0)
+                local_count = local_counts[tool]
+                tool_stats = stats[tool]
+                tool_stats['exact'] += llm_count == local_count
+                tool_stats['abs_error'] += abs(llm_count - local_count)
+                tool_stats['llm_total'] += llm_count
+                tool_stats['local_total'] += local_count
+                # 以「是否使用過該工具」計算 precision / recall
+                if local_count and llm_count:
+                    tool_stats['tp'] += 1
+                elif local_count:
+                    tool_stats['fp'] += 1
+                elif llm_count:
+                    tool_stats['fn'] += 1
+                document_error += abs(llm_count - local_count)
+
+            exact_documents += document_error == 0
+            if document_error:
+                diffs.append((document_error, task_id, llm_counts, local_counts))
+
+        if not documents:
+            self.stdout.write(self.style.WARNING('沒有可比較的作業（需要已有 OCR 內容與 GPT 輔助工具分析）'))
+            return
+
+        self.stdout.write(f'比較 {documents} 份作業，本機比對平均 {elapsed * 1e6 / documents:.1f} µs/份')
+        self.stdout.write(f'{"工具":<22}{"完全一致":>10}{"MAE":>8}{"GPT 總數":>10}{"本機總數":>10}{"Precision":>11}{"Recall":>8}')
+        for tool in ASSISTIVE_TOOLS:
+            tool_stats = stats[tool]
+            predicted = tool_stats['tp'] + tool_stats['fp']
+            actual = tool_stats['tp'] + tool_stats['fn']
+            precision = f"{tool_stats['tp'] / predicted:.2f}" if predicted else '-'
+            recall = f"{tool_stats['tp'] / actual:.2f}" if actual else '-'
+            self.stdout.write(
+                f"{tool:<22}{tool_stats['exact'] * 100 / documents:>9.1f}%"
+                f"{tool_stats['abs_error'] / documents:>8.2f}"
+                f"{tool_stats['llm_total']:>10}{tool_stats['local_total']:>10}"
+                f"{precision:>11}{recall:>8}"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'所有工具次數完全一致的作業: {exact_documents}/{documents} ({exact_documents * 100 / documents:.1f}%)'
+        ))
+
+        diffs.sort(key=lambda diff: diff[:2], reverse=True)
+        for document_error, task_id, llm_counts, local_counts in diffs[:options['show_diffs']]:
+            changed = {
+                tool: (llm_counts.get(tool, 0), local_counts[tool])
+                for tool in ASSISTIVE_TOOLS if int(llm_counts.get(tool) or 0) != local_counts[tool]
+            }
+            self.stdout.write(f'作業 {task_id} 差異 {document_error}: (GPT, 本機) {changed}')
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend.models import LLMCacheEntry
+from backend.utils.analysis_utils import ASSIST_TOOLS_PROMPT_VERSION, PROMPT_ONLY_PROMPT_VERSION
+from backend.utils.llm_cache import prune_llm_cache
+
+
+class Command(BaseCommand):
+    help = '清理 LLM 回應快取（過期、舊提示詞版本及超出容量的項目）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-entries',
+            type=int,
+            default=getattr(settings, 'LLM_CACHE_MAX_ENTRIES', 5000),
+            help='保留的最大筆數',
+        )
+        parser.add_argument(
+            '--max-bytes',
+            type=int,
+            default=getattr(settings, 'LLM_CACHE_MAX_BYTES', 50 * 1024 * 1024),
+            help='保留的最大結果總大小 (bytes)',
+        )
+        parser.add_argument(
+            '--stale-prompt',
+            action='store_true',
+            help='刪除非目前提示詞版本產生的項目',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='清空所有 LLM 回應快取',
+        )
+
+    def handle(self, *args, **options):
+        before = LLMCacheEntry.objects.count()
+
+        if options['clear']:
+            deleted = LLMCacheEntry.objects.all().delete()[0]
+        else:
+            deleted = prune_llm_cache(
+                max_entries=options['max_entries'],
+                max_bytes=options['max_bytes'],
+                expired=True,
+                keep_prompt_versions=(
+                    [ASSIST_TOOLS_PROMPT_VERSION, PROMPT_ONLY_PROMPT_VERSION] if options['stale_prompt'] else None
+                ),
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'LLM 快取清理完成! 原有 {before} 筆，刪除了 {deleted} 筆，剩餘 {before - deleted} 筆'
+        ))
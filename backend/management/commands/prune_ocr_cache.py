@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend.models import OCRCacheEntry
+from backend.utils.ocr_cache import prune_ocr_cache
+
+
+class Command(BaseCommand):
+    help = '清理 OCR 快取（依最久未使用順序淘汰）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-entries',
+            type=int,
+            default=getattr(settings, 'OCR_CACHE_MAX_ENTRIES', 5000),
+            help='保留的最大筆數',
+        )
+        parser.add_argument(
+            '--max-bytes',
+            type=int,
+            default=getattr(settings, 'OCR_CACHE_MAX_BYTES', 200 * 1024 * 1024),
+            help='保留的最大文本總大小 (bytes)',
+        )
+        parser.add_argument(
+            '--max-age-days',
+            type=int,
+            help='刪除超過指定天數未使用的項目',
+            required=False
+        )
+        parser.add_argument(
+            '--stale-engine',
+            action='store_true',
+            help='刪除非目前 OCR 引擎版本產生的項目',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='清空所有 OCR 快取',
+        )
+
+    def handle(self, *args, **options):
+        before = OCRCacheEntry.objects.count()
+
+        if options['clear']:
+            deleted = OCRCacheEntry.objects.all().delete()[0]
+        else:
+            deleted = prune_ocr_cache(
+                max_entries=options['max_entries'],
+                max_bytes=options['max_bytes'],
+                max_age_days=options.get('max_age_days'),
+                stale_engine=options['stale_engine'],
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'OCR 快取清理完成! 原有 {before} 筆，刪除了 {deleted} 筆，剩餘 {before - deleted} 筆'
+        ))
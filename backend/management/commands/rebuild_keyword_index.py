@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from backend.models import CourseTask, StudentCourseTask
+from backend.utils.analysis_utils import bulk_analyze_keywords
+from backend.utils.keyword_index import rebuild_document_frequency, rebuild_postings
+
+
+class Command(BaseCommand):
+    help = '重建關鍵詞文件頻率與反向索引；尚未建立詞頻的作業會先重新斷詞（不需重新 OCR）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course-task', type=int, help='只重建指定課程任務', required=False)
+
+    def handle(self, *args, **options):
+        course_task_ids = CourseTask.objects.order_by('id').values_list('id', flat=True)
+        if options.get('course_task'):
+            course_task_ids = course_task_ids.filter(id=options['course_task'])
+
+        for course_task_id in course_task_ids:
+            missing = StudentCourseTask.objects.filter(
+                course_task_id=course_task_id, keyword_counts={}
+            ).exclude(ocr_content='').exclude(ocr_content__isnull=True).exists()
+            if missing:
+                result = bulk_analyze_keywords(course_task_id)
+                if not result['success']:
+                    self.stdout.write(self.style.WARNING(f"課程任務 {course_task_id}: {result['message']}"))
+
+            keyword_count = rebuild_document_frequency(course_task_id)
+            task_count = rebuild_postings(course_task_id)
+            self.stdout.write(f'課程任務 {course_task_id}: {keyword_count} 個關鍵詞、{task_count} 份作業')
+
+        self.stdout.write(self.style.SUCCESS('關鍵詞索引重建完成'))
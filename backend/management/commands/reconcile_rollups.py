@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+
+from backend.models import Course, CourseTask
+from backend.utils.rollup_utils import (
+    compute_course_rollup, compute_course_task_rollup, get_course_rollup, get_course_task_rollup, rollups_match,
+    save_course_rollup, save_course_task_rollup
+)
+
+
+class Command(BaseCommand):
+    help = '以完整重新計算核對增量維護的課程任務與課程彙總，--fix 時以重新計算的結果覆寫不一致的彙總'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course-task', type=int, help='只核對指定課程任務與其所屬課程', required=False)
+        parser.add_argument('--fix', action='store_true', help='覆寫不一致的彙總')
+
+    def handle(self, *args, **options):
+        course_tasks = CourseTask.objects.order_by('id')
+        courses = Course.objects.order_by('id')
+        if options.get('course_task'):
+            course_tasks = course_tasks.filter(id=options['course_task'])
+            courses = courses.filter(course_tasks__id=options['course_task'])
+
+        checked = 0
+        mismatched = 0
+        for course_task in course_tasks:
+            checked += 1
+            computed = compute_course_task_rollup(course_task.id)
+            if rollups_match(get_course_task_rollup(course_task), computed):
+                continue
+
+            mismatched += 1
+            self.stdout.write(self.style.WARNING(f'課程任務 {course_task.id} ({course_task.name}) 的彙總不一致'))
+            if options['fix']:
+                save_course_task_rollup(course_task.id, computed)
+
+        # 課程彙總由課程任務的彙總加總而來，需在課程任務修復之後核對
+        for course in courses:
+            checked += 1
+            computed = compute_course_rollup(course.id)
+            if rollups_match(get_course_rollup(course), computed):
+                continue
+
+            mismatched += 1
+            self.stdout.write(self.style.WARNING(f'課程 {course.id} ({course.name}) 的彙總不一致'))
+            if options['fix']:
+                save_course_rollup(course.id, computed)
+
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS(f'已核對 {checked} 個彙總，皆一致'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'已核對 {checked} 個彙總，修復 {mismatched} 個不一致的彙總'))
+        else:
+            self.stdout.write(self.style.ERROR(f'已核對 {checked} 個彙總，{mismatched} 個不一致，可加上 --fix 修復'))
@@ -0,0 +1,156 @@
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from backend.utils.tool_counter import ASSISTIVE_TOOLS
+
+SUBMISSION_PATTERN = re.compile(r'<submission id="([^"]+)">\n(.*?)\n</submission>', re.S)
+
+
+def build_stub_analysis(text):
+    return {
+        'assistive_tool_analysis': {tool: text.count(tool) for tool in ASSISTIVE_TOOLS},
+        'prompt_analysis': {
+            'discussion_topics': {'topic': '測試主題', 'description': '由 LLM stub server 產生'},
+            'prompts': [{'keyword': '測試', 'times': 1}],
+        },
+    }
+
+
+def build_stub_content(user_content, drop_ratio=0.0):
+    """依使用者訊息產生固定格式的分析結果，讓解析與保存流程可以完整執行；合併請求回覆每份文本的結果"""
+    submissions = SUBMISSION_PATTERN.findall(user_content)
+    if not submissions:
+        return json.dumps(build_stub_analysis(user_content), ensure_ascii=False)
+    return json.dumps({
+        'results': [
+            {'id': submission_id, **build_stub_analysis(text)}
+            for submission_id, text in submissions if random.random() >= drop_ratio
+        ]
+    }, ensure_ascii=False)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """模擬 OpenAI chat completions API，可注入延遲、429 與 5xx 錯誤"""
+
+    options = {}
+    stats = {'requests': 0, 'rate_limited': 0, 'errors': 0, 'in_flight': 0, 'max_in_flight': 0}
+    stats_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        if self.options.get('verbose'):
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            with self.stats_lock:
+                self._send_json(200, dict(self.stats))
+            return
+        self._send_json(404, {'error': {'message': 'Not found'}})
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'Not found'}})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+
+        with self.stats_lock:
+            self.stats['requests'] += 1
+            self.stats['in_flight'] += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.stats['in_flight'])
+        try:
+            self._handle_completion(payload)
+        finally:
+            with self.stats_lock:
+                self.stats['in_flight'] -= 1
+
+    def _handle_completion(self, payload):
+        options = self.options
+        if random.random() < options['rate_limit_ratio']:
+            with self.stats_lock:
+                self.stats['rate_limited'] += 1
+            self._send_json(
+                429,
+                {'error': {'message': 'Rate limit reached', 'type': 'requests', 'code': 'rate_limit_exceeded'}},
+                headers={'retry-after': str(options['retry_after'])},
+            )
+            return
+        if random.random() < options['error_ratio']:
+            with self.stats_lock:
+                self.stats['errors'] += 1
+            self._send_json(500, {'error': {'message': 'Internal server error', 'type': 'server_error'}})
+            return
+
+        latency = options['latency'] + random.uniform(0, options['jitter'])
+        time.sleep(latency)
+
+        messages = payload.get('messages', [])
+        user_content = next((m['content'] for m in reversed(messages) if m.get('role') == 'user'), '')
+        content = build_stub_content(user_content, options['drop_ratio'])
+        prompt_tokens = sum(len(m.get('content', '')) for m in messages)
+        self._send_json(200, {
+            'id': f'chatcmpl-{uuid.uuid4().hex}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': payload.get('model', 'gpt-4o'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': len(content),
+                'total_tokens': prompt_tokens + len(content),
+            },
+        })
+
+
+class Command(BaseCommand):
+    help = '啟動模擬 OpenAI chat completions API 的本機 stub server（設定 OPENAI_BASE_URL 指向它進行測試）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='監聽位址')
+        parser.add_argument('--port', type=int, default=8765, help='監聽埠號')
+        parser.add_argument('--latency', type=float, default=0.5, help='每個請求的基本延遲(秒)')
+        parser.add_argument('--jitter', type=float, default=0.0, help='額外的隨機延遲上限(秒)')
+        parser.add_argument('--rate-limit-ratio', type=float, default=0.0, help='回傳 429 的比例 (0~1)')
+        parser.add_argument('--retry-after', type=float, default=1.0, help='429 回應的 Retry-After 秒數')
+        parser.add_argument('--error-ratio', type=float, default=0.0, help='回傳 500 的比例 (0~1)')
+        parser.add_argument('--drop-ratio', type=float, default=0.0, help='合併請求中遺漏單份結果的比例 (0~1)')
+        parser.add_argument('--verbose', action='store_true', help='輸出每個請求的存取紀錄')
+
+    def handle(self, *args, **options):
+        StubHandler.options = options
+        server = ThreadingHTTPServer((options['host'], options['port']), StubHandler)
+        server.daemon_threads = True
+
+        self.stdout.write(self.style.SUCCESS(
+            f"LLM stub server 已啟動: http://{options['host']}:{options['port']}/v1 "
+            f"(延遲 {options['latency']}s，429 比例 {options['rate_limit_ratio']}，500 比例 {options['error_ratio']})"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f'請求統計: {json.dumps(StubHandler.stats)}')
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.17 on 2026-10-18 11:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("backend", "0011_coursetask_all_keyword_analysis"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OCRCacheEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "content_hash",
+                    models.CharField(max_length=64, verbose_name="檔案 SHA-256"),
+                ),
+                (
+                    "languages",
+                    models.CharField(max_length=100, verbose_name="OCR 語言組合"),
+                ),
+                (
+                    "engine_version",
+                    models.CharField(max_length=50, verbose_name="OCR 引擎版本"),
+                ),
+                ("text", models.TextField(blank=True, verbose_name="OCR 文本內容")),
+                (
+                    "text_size",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="文本大小 (bytes)"
+                    ),
+                ),
+                (
+                    "hit_count",
+                    models.PositiveIntegerField(default=0, verbose_name="命中次數"),
+                ),
+                (
+                    "last_used_at",
+                    models.DateTimeField(
+                        auto_now_add=True, db_index=True, verbose_name="最後使用時間"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "OCR 快取",
+                "verbose_name_plural": "OCR 快取",
+                "db_table": "ocr_cache_entries",
+                "unique_together": {("content_hash", "languages", "engine_version")},
+            },
+        ),
+    ]
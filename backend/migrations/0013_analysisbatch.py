@@ -0,0 +1,86 @@
+# Generated by Django 4.2.17 on 2026-10-18 11:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("backend", "0012_ocrcacheentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnalysisBatch",
+            fields=[
+                (
+                    "id",
+                    models.CharField(
+                        max_length=64,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="批次 ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("RUNNING", "分析中"), ("SUCCESS", "已完成")],
+                        default="RUNNING",
+                        max_length=20,
+                        verbose_name="狀態",
+                    ),
+                ),
+                (
+                    "total",
+                    models.PositiveIntegerField(default=0, verbose_name="作業總數"),
+                ),
+                (
+                    "completed",
+                    models.PositiveIntegerField(default=0, verbose_name="完成數"),
+                ),
+                (
+                    "failed",
+                    models.PositiveIntegerField(default=0, verbose_name="失敗數"),
+                ),
+                (
+                    "ocr_done",
+                    models.PositiveIntegerField(default=0, verbose_name="OCR 完成數"),
+                ),
+                (
+                    "keywords_done",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="關鍵詞分析完成數"
+                    ),
+                ),
+                (
+                    "llm_done",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="GPT 分析完成數"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="完成時間"
+                    ),
+                ),
+                (
+                    "course_task",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="analysis_batches",
+                        to="backend.coursetask",
+                        verbose_name="課程作業",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "批量分析進度",
+                "verbose_name_plural": "批量分析進度",
+                "db_table": "analysis_batches",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0013_analysisbatch"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LLMCacheEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "cache_key",
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name="快取鍵 (SHA-256)"
+                    ),
+                ),
+                ("model", models.CharField(max_length=100, verbose_name="LLM 模型")),
+                (
+                    "prompt_version",
+                    models.CharField(
+                        db_index=True, max_length=50, verbose_name="提示詞版本"
+                    ),
+                ),
+                ("response", models.JSONField(default=dict, verbose_name="分析結果")),
+                (
+                    "response_size",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="結果大小 (bytes)"
+                    ),
+                ),
+                (
+                    "hit_count",
+                    models.PositiveIntegerField(default=0, verbose_name="命中次數"),
+                ),
+                (
+                    "last_used_at",
+                    models.DateTimeField(
+                        auto_now_add=True, db_index=True, verbose_name="最後使用時間"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                "verbose_name": "LLM 回應快取",
+                "verbose_name_plural": "LLM 回應快取",
+                "db_table": "llm_cache_entries",
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.17 on 2026-10-18 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0014_llmcacheentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="analysisbatch",
+            name="external_batch_id",
+            field=models.CharField(
+                blank=True, default="", max_length=100, verbose_name="外部批次 ID"
+            ),
+        ),
+        migrations.AddField(
+            model_name="analysisbatch",
+            name="mode",
+            field=models.CharField(
+                choices=[
+                    ("interactive", "即時分析"),
+                    ("packed", "合併請求"),
+                    ("offline", "離線批次"),
+                ],
+                default="interactive",
+                max_length=20,
+                verbose_name="分析模式",
+            ),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.17 on 2026-10-18 11:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0015_analysisbatch_mode"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="KeywordNormalization",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("variant", models.CharField(max_length=100, verbose_name="變體詞")),
+                ("canonical", models.CharField(max_length=100, verbose_name="標準詞")),
+                (
+                    "add_to_dictionary",
+                    models.BooleanField(
+                        default=False, verbose_name="加入 jieba 詞典（避免被切開）"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "course",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="keyword_normalizations",
+                        to="backend.course",
+                        verbose_name="課程",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "關鍵詞正規化",
+                "verbose_name_plural": "關鍵詞正規化",
+                "db_table": "keyword_normalizations",
+                "unique_together": {("course", "variant")},
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.17 on 2026-10-18 11:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0016_keywordnormalization"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="studentcoursetask",
+            name="keyword_counts",
+            field=models.JSONField(blank=True, default=dict, verbose_name="關鍵詞詞頻"),
+        ),
+        migrations.CreateModel(
+            name="KeywordDocumentFrequency",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("keyword", models.CharField(max_length=100, verbose_name="關鍵詞")),
+                (
+                    "document_count",
+                    models.IntegerField(default=0, verbose_name="含有該關鍵詞的作業數"),
+                ),
+                (
+                    "course_task",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="keyword_document_frequencies",
+                        to="backend.coursetask",
+                        verbose_name="課程作業",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "關鍵詞文件頻率",
+                "verbose_name_plural": "關鍵詞文件頻率",
+                "db_table": "keyword_document_frequencies",
+                "unique_together": {("course_task", "keyword")},
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.17 on 2026-10-18 11:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0017_keyword_document_frequency"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="KeywordPosting",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("keyword", models.CharField(max_length=100, verbose_name="關鍵詞")),
+                (
+                    "count",
+                    models.PositiveIntegerField(default=0, verbose_name="出現次數"),
+                ),
+            ],
+            options={
+                "verbose_name": "關鍵詞反向索引",
+                "verbose_name_plural": "關鍵詞反向索引",
+                "db_table": "keyword_postings",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="keyworddocumentfrequency",
+            index=models.Index(
+                fields=["course_task", "-document_count"], name="keyword_df_top"
+            ),
+        ),
+        migrations.AddField(
+            model_name="keywordposting",
+            name="course_task",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="keyword_postings",
+                to="backend.coursetask",
+                verbose_name="課程作業",
+            ),
+        ),
+        migrations.AddField(
+            model_name="keywordposting",
+            name="student_course_task",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="keyword_postings",
+                to="backend.studentcoursetask",
+                verbose_name="學生課程作業",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="keywordposting",
+            index=models.Index(
+                fields=["course_task", "keyword", "-count"],
+                name="keyword_posting_lookup",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="keywordposting",
+            unique_together={("student_course_task", "keyword")},
+        ),
+    ]
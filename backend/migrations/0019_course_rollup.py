@@ -0,0 +1,27 @@
+# Generated by Django 4.2.17 on 2026-10-18 12:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0018_keyword_posting"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="all_keyword_analysis",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="單元內所有關鍵字分析"
+            ),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="rollup_updated_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="彙總更新時間"
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.17 on 2026-10-18 12:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0019_course_rollup"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="analysisbatch",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("RUNNING", "分析中"),
+                    ("SUCCESS", "已完成"),
+                    ("FAILURE", "失敗"),
+                ],
+                default="RUNNING",
+                max_length=20,
+                verbose_name="狀態",
+            ),
+        ),
+        migrations.CreateModel(
+            name="AnalysisBatchMark",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "task_id",
+                    models.PositiveIntegerField(verbose_name="學生課程作業 ID"),
+                ),
+                ("stage", models.CharField(max_length=20, verbose_name="階段")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "batch",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="marks",
+                        to="backend.analysisbatch",
+                        verbose_name="批量分析",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "批量分析進度標記",
+                "verbose_name_plural": "批量分析進度標記",
+                "db_table": "analysis_batch_marks",
+                "unique_together": {("batch", "task_id", "stage")},
+            },
+        ),
+    ]
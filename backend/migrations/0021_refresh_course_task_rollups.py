@@ -0,0 +1,56 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _add(totals, key, value):
+    if key is not None and _is_number(value):
+        totals[key] = totals.get(key, 0) + value
+
+
+def refresh_course_task_rollups(apps, schema_editor):
+    # 課程任務的彙總改為增量維護，部署時先以完整重新計算建立正確的初始值；
+    # 使用歷史模型並在此重寫彙總邏輯（與 rollup_utils.get_rollup_contribution 相同），不依賴之後會變動的 utils
+    CourseTask = apps.get_model("backend", "CourseTask")
+    StudentCourseTask = apps.get_model("backend", "StudentCourseTask")
+
+    for course_task_id in CourseTask.objects.values_list("id", flat=True).iterator():
+        assistive, prompts, keywords = {}, {}, {}
+        for values in StudentCourseTask.objects.filter(course_task_id=course_task_id).values(
+            "assistive_tool_analysis", "prompt_analysis", "keyword_analysis"
+        ).iterator():
+            if isinstance(values["assistive_tool_analysis"], dict):
+                for tool, count in values["assistive_tool_analysis"].items():
+                    _add(assistive, tool, count)
+
+            prompt_data = values["prompt_analysis"]
+            if isinstance(prompt_data, dict) and isinstance(prompt_data.get("prompts"), list):
+                for item in prompt_data["prompts"]:
+                    if isinstance(item, dict):
+                        _add(prompts, item.get("keyword"), item.get("times", 0))
+
+            keyword_data = values["keyword_analysis"]
+            if isinstance(keyword_data, dict) and isinstance(keyword_data.get("top_keywords"), dict):
+                for keyword, count in keyword_data["top_keywords"].items():
+                    _add(keywords, keyword, count)
+
+        CourseTask.objects.filter(id=course_task_id).update(
+            all_assistive_tool_analysis=assistive,
+            all_prompt_analysis=[{"keyword": keyword, "times": times} for keyword, times in prompts.items()],
+            all_keyword_analysis=keywords,
+            updated_at=timezone.now(),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0020_analysis_batch_failure"),
+    ]
+
+    operations = [
+        migrations.RunPython(refresh_course_task_rollups, migrations.RunPython.noop),
+    ]
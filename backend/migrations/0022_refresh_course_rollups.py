@@ -0,0 +1,54 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def _add(totals, key, value):
+    if key is not None and isinstance(value, (int, float)) and not isinstance(value, bool):
+        totals[key] = totals.get(key, 0) + value
+
+
+def refresh_course_rollups(apps, schema_editor):
+    # 課程層級的彙總由課程任務的彙總加總而來，需在 0021 建立課程任務的彙總之後初始化；
+    # 使用歷史模型並在此重寫加總邏輯（與 rollup_utils.compute_course_rollup 相同），不依賴之後會變動的 utils
+    Course = apps.get_model("backend", "Course")
+    CourseTask = apps.get_model("backend", "CourseTask")
+
+    for course_id in Course.objects.values_list("id", flat=True).iterator():
+        assistive, prompts, keywords = {}, {}, {}
+        for values in CourseTask.objects.filter(course_id=course_id).values(
+            "all_assistive_tool_analysis", "all_prompt_analysis", "all_keyword_analysis"
+        ).iterator():
+            for tool, count in (values["all_assistive_tool_analysis"] or {}).items():
+                _add(assistive, tool, count)
+
+            prompt_data = values["all_prompt_analysis"]
+            if isinstance(prompt_data, dict):
+                for prompt, times in prompt_data.items():
+                    if times:
+                        _add(prompts, prompt, times)
+            else:
+                for item in prompt_data or []:
+                    if isinstance(item, dict) and item.get("times", 0):
+                        _add(prompts, item.get("keyword"), item.get("times", 0))
+
+            for keyword, count in (values["all_keyword_analysis"] or {}).items():
+                if count:
+                    _add(keywords, keyword, count)
+
+        Course.objects.filter(id=course_id).update(
+            all_assistive_tool_analysis=assistive,
+            all_prompt_analysis=[{"keyword": keyword, "times": times} for keyword, times in prompts.items()],
+            all_keyword_analysis=keywords,
+            rollup_updated_at=timezone.now(),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0021_refresh_course_task_rollups"),
+    ]
+
+    operations = [
+        migrations.RunPython(refresh_course_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+from collections import Counter
+
+from django.db import migrations
+
+# 與 keyword_index.MAX_KEYWORD_LENGTH 相同
+MAX_KEYWORD_LENGTH = 100
+
+
+def backfill_keyword_index(apps, schema_editor):
+    # 由既有作業的完整詞頻建立文件頻率與反向索引；使用歷史模型並在此重寫建立邏輯，不依賴之後會變動的 utils。
+    # 尚未建立詞頻（keyword_counts 為空）的作業需重新斷詞，請於部署後執行 python manage.py rebuild_keyword_index
+    CourseTask = apps.get_model("backend", "CourseTask")
+    StudentCourseTask = apps.get_model("backend", "StudentCourseTask")
+    KeywordDocumentFrequency = apps.get_model("backend", "KeywordDocumentFrequency")
+    KeywordPosting = apps.get_model("backend", "KeywordPosting")
+
+    for course_task_id in CourseTask.objects.values_list("id", flat=True).iterator():
+        document_counts = Counter()
+        postings = []
+        for task_id, keyword_counts in StudentCourseTask.objects.filter(
+            course_task_id=course_task_id
+        ).exclude(keyword_counts={}).values_list("id", "keyword_counts").iterator():
+            vocabulary = {keyword for keyword in keyword_counts if len(keyword) <= MAX_KEYWORD_LENGTH}
+            document_counts.update(vocabulary)
+            postings += [
+                KeywordPosting(
+                    student_course_task_id=task_id, course_task_id=course_task_id, keyword=keyword, count=count
+                )
+                for keyword, count in keyword_counts.items() if keyword in vocabulary and count > 0
+            ]
+
+        KeywordDocumentFrequency.objects.filter(course_task_id=course_task_id).delete()
+        KeywordDocumentFrequency.objects.bulk_create(
+            [
+                KeywordDocumentFrequency(course_task_id=course_task_id, keyword=keyword, document_count=count)
+                for keyword, count in document_counts.items()
+            ],
+            batch_size=1000,
+        )
+        KeywordPosting.objects.filter(course_task_id=course_task_id).delete()
+        KeywordPosting.objects.bulk_create(postings, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0022_refresh_course_rollups"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_keyword_index, migrations.RunPython.noop),
+    ]
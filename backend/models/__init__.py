@@ -1,15 +1,29 @@
+from .analysis_batch_marks import AnalysisBatchMark
+from .analysis_batches import AnalysisBatch
 from .course_tasks import CourseTask
 from .courses import Course
+from .keyword_document_frequencies import KeywordDocumentFrequency
+from .keyword_normalizations import KeywordNormalization
+from .keyword_postings import KeywordPosting
+from .llm_cache_entries import LLMCacheEntry
 from .login_attempts import LoginAttempt
+from .ocr_cache_entries import OCRCacheEntry
 from .student_classes import StudentClass
 from .student_course_tasks import StudentCourseTask
 from .student_courses import StudentCourse
 from .students import Student
 
 __all__ = [
+    'AnalysisBatch',
+    'AnalysisBatchMark',
     'CourseTask',
     'Course',
+    'KeywordDocumentFrequency',
+    'KeywordNormalization',
+    'KeywordPosting',
+    'LLMCacheEntry',
     'LoginAttempt',
+    'OCRCacheEntry',
     'StudentClass',
     'StudentCourseTask',
     'StudentCourse',
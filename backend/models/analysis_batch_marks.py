@@ -0,0 +1,27 @@
+from django.db import models
+from .analysis_batches import AnalysisBatch
+
+
+class AnalysisBatchMark(models.Model):
+    """記錄批次中每份作業已計入的階段，acks_late 重新投遞的任務不會重複累加進度"""
+    STAGE_FINISHED = 'finished'
+
+    batch = models.ForeignKey(
+        AnalysisBatch,
+        on_delete=models.CASCADE,
+        related_name='marks',
+        verbose_name="批量分析"
+    )
+    task_id = models.PositiveIntegerField(verbose_name="學生課程作業 ID")
+    # ocr / keywords / llm，或 finished 表示已計入完成數或失敗數
+    stage = models.CharField(max_length=20, verbose_name="階段")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'analysis_batch_marks'
+        verbose_name = '批量分析進度標記'
+        verbose_name_plural = '批量分析進度標記'
+        unique_together = ('batch', 'task_id', 'stage')
+
+    def __str__(self):
+        return f"{self.batch_id} - {self.task_id}: {self.stage}"
@@ -0,0 +1,69 @@
+from django.db import models
+from .course_tasks import CourseTask
+
+
+class AnalysisBatch(models.Model):
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_SUCCESS = 'SUCCESS'
+    STATUS_FAILURE = 'FAILURE'
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, '分析中'),
+        (STATUS_SUCCESS, '已完成'),
+        (STATUS_FAILURE, '失敗'),
+    ]
+    FINISHED_STATUSES = (STATUS_SUCCESS, STATUS_FAILURE)
+    MODE_INTERACTIVE = 'interactive'
+    MODE_PACKED = 'packed'
+    MODE_OFFLINE = 'offline'
+    MODE_CHOICES = [
+        (MODE_INTERACTIVE, '即時分析'),
+        (MODE_PACKED, '合併請求'),
+        (MODE_OFFLINE, '離線批次'),
+    ]
+
+    # 與 Celery GroupResult 共用同一個 ID，前端以此查詢進度
+    id = models.CharField(max_length=64, primary_key=True, verbose_name="批次 ID")
+    course_task = models.ForeignKey(
+        CourseTask,
+        on_delete=models.CASCADE,
+        related_name='analysis_batches',
+        verbose_name="課程作業"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_RUNNING,
+        verbose_name="狀態"
+    )
+    mode = models.CharField(
+        max_length=20,
+        choices=MODE_CHOICES,
+        default=MODE_INTERACTIVE,
+        verbose_name="分析模式"
+    )
+    # 離線模式送出的 OpenAI Batch ID（或本機替代實作的 ID）
+    external_batch_id = models.CharField(max_length=100, blank=True, default='', verbose_name="外部批次 ID")
+    total = models.PositiveIntegerField(default=0, verbose_name="作業總數")
+    completed = models.PositiveIntegerField(default=0, verbose_name="完成數")
+    failed = models.PositiveIntegerField(default=0, verbose_name="失敗數")
+    ocr_done = models.PositiveIntegerField(default=0, verbose_name="OCR 完成數")
+    keywords_done = models.PositiveIntegerField(default=0, verbose_name="關鍵詞分析完成數")
+    llm_done = models.PositiveIntegerField(default=0, verbose_name="GPT 分析完成數")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name="完成時間")
+
+    class Meta:
+        db_table = 'analysis_batches'
+        verbose_name = '批量分析進度'
+        verbose_name_plural = '批量分析進度'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.id} - {self.course_task.name}"
+
+    @property
+    def percentage(self):
+        if not self.total:
+            return 100.0
+        return round((self.completed + self.failed) * 100 / self.total, 1)
@@ -2,6 +2,10 @@ from django.db import models
 from .student_classes import StudentClass
 from .courses import Course
 
+# 由學生作業增量維護的彙總欄位（見 backend/utils/rollup_utils.py），一般儲存不寫入
+COURSE_TASK_ROLLUP_FIELDS = ('all_assistive_tool_analysis', 'all_prompt_analysis', 'all_keyword_analysis')
+
+
 def get_default_contents():
     return {'content': 'This is new content'}
 
@@ -61,5 +65,14 @@ class CourseTask(models.Model):
         verbose_name = '課程作業'
         verbose_name_plural = '課程作業'
 
+    def save(self, *args, **kwargs):
+        """更新既有課程任務時不寫入彙總欄位，避免記憶體中過期的彙總覆蓋 apply_rollup_changes 的增量"""
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in COURSE_TASK_ROLLUP_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.name} - {self.course.name}"
@@ -20,6 +20,16 @@ class Course(models.Model):
         blank=True,
         verbose_name="單元內所有提示分析"
     )
+    all_keyword_analysis = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="單元內所有關鍵字分析"
+    )
+    rollup_updated_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="彙總更新時間"
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
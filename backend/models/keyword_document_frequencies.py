@@ -0,0 +1,27 @@
+from django.db import models
+from .course_tasks import CourseTask
+
+
+class KeywordDocumentFrequency(models.Model):
+    """課程任務內含有該關鍵詞的作業數；課程層級的文件頻率為其下各課程任務的總和"""
+    course_task = models.ForeignKey(
+        CourseTask,
+        on_delete=models.CASCADE,
+        related_name='keyword_document_frequencies',
+        verbose_name="課程作業"
+    )
+    keyword = models.CharField(max_length=100, verbose_name="關鍵詞")
+    document_count = models.IntegerField(default=0, verbose_name="含有該關鍵詞的作業數")
+
+    class Meta:
+        db_table = 'keyword_document_frequencies'
+        verbose_name = '關鍵詞文件頻率'
+        verbose_name_plural = '關鍵詞文件頻率'
+        unique_together = ('course_task', 'keyword')
+        indexes = [
+            # 課程任務內依文件頻率取前 k 個關鍵詞
+            models.Index(fields=['course_task', '-document_count'], name='keyword_df_top'),
+        ]
+
+    def __str__(self):
+        return f"{self.course_task_id} - {self.keyword}: {self.document_count}"
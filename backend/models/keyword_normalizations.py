@@ -0,0 +1,36 @@
+from django.db import models
+from .courses import Course
+
+
+class KeywordNormalization(models.Model):
+    """關鍵詞正規化對照：斷詞後的 variant 一律計為 canonical（同義詞、縮寫、繁簡變體）"""
+    variant = models.CharField(max_length=100, verbose_name="變體詞")
+    canonical = models.CharField(max_length=100, verbose_name="標準詞")
+    # 未指定課程時套用到所有課程，課程的設定優先於全域設定
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='keyword_normalizations',
+        blank=True,
+        null=True,
+        verbose_name="課程"
+    )
+    add_to_dictionary = models.BooleanField(default=False, verbose_name="加入 jieba 詞典（避免被切開）")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'keyword_normalizations'
+        verbose_name = '關鍵詞正規化'
+        verbose_name_plural = '關鍵詞正規化'
+        unique_together = ('course', 'variant')
+
+    def save(self, *args, **kwargs):
+        # 關鍵詞分析會先轉成小寫，對照表也以小寫儲存
+        self.variant = self.variant.strip().lower()
+        self.canonical = self.canonical.strip().lower()
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.variant} -> {self.canonical}"
@@ -0,0 +1,34 @@
+from django.db import models
+from .course_tasks import CourseTask
+from .student_course_tasks import StudentCourseTask
+
+
+class KeywordPosting(models.Model):
+    """關鍵詞反向索引：關鍵詞 -> 含有該詞的作業與出現次數，供跨作業搜尋與共現查詢"""
+    student_course_task = models.ForeignKey(
+        StudentCourseTask,
+        on_delete=models.CASCADE,
+        related_name='keyword_postings',
+        verbose_name="學生課程作業"
+    )
+    # 與作業的課程任務相同，查詢時不需 join 作業表
+    course_task = models.ForeignKey(
+        CourseTask,
+        on_delete=models.CASCADE,
+        related_name='keyword_postings',
+        verbose_name="課程作業"
+    )
+    keyword = models.CharField(max_length=100, verbose_name="關鍵詞")
+    count = models.PositiveIntegerField(default=0, verbose_name="出現次數")
+
+    class Meta:
+        db_table = 'keyword_postings'
+        verbose_name = '關鍵詞反向索引'
+        verbose_name_plural = '關鍵詞反向索引'
+        unique_together = ('student_course_task', 'keyword')
+        indexes = [
+            models.Index(fields=['course_task', 'keyword', '-count'], name='keyword_posting_lookup'),
+        ]
+
+    def __str__(self):
+        return f"{self.keyword} - {self.student_course_task_id}: {self.count}"
@@ -0,0 +1,20 @@
+from django.db import models
+
+
+class LLMCacheEntry(models.Model):
+    cache_key = models.CharField(max_length=64, unique=True, verbose_name="快取鍵 (SHA-256)")
+    model = models.CharField(max_length=100, verbose_name="LLM 模型")
+    prompt_version = models.CharField(max_length=50, db_index=True, verbose_name="提示詞版本")
+    response = models.JSONField(default=dict, verbose_name="分析結果")
+    response_size = models.PositiveIntegerField(default=0, verbose_name="結果大小 (bytes)")
+    hit_count = models.PositiveIntegerField(default=0, verbose_name="命中次數")
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="最後使用時間")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'llm_cache_entries'
+        verbose_name = 'LLM 回應快取'
+        verbose_name_plural = 'LLM 回應快取'
+
+    def __str__(self):
+        return f"{self.cache_key[:12]} - {self.model} - {self.prompt_version}"
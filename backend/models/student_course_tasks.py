@@ -1,11 +1,17 @@
 from tabnanny import verbose
 
-from django.db import models
+import copy
+
+from django.db import models, transaction
 from .students import Student
 from .courses import Course
 from .course_tasks import CourseTask
 
 
+# 課程任務彙總所依據的欄位（見 backend/utils/rollup_utils.py）
+ROLLUP_FIELDS = ('assistive_tool_analysis', 'prompt_analysis', 'keyword_analysis')
+
+
 class StudentCourseTask(models.Model):
     student = models.ForeignKey(
         Student,
@@ -72,6 +78,13 @@ class StudentCourseTask(models.Model):
         verbose_name="關鍵詞分析"
     )
 
+    # 完整詞頻（不只前 50 名），供文件頻率索引與 TF-IDF 計算使用
+    keyword_counts = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="關鍵詞詞頻"
+    )
+
     is_analyzed = models.BooleanField(
         default=False,
         verbose_name="是否已分析"
@@ -86,5 +99,41 @@ class StudentCourseTask(models.Model):
         verbose_name_plural = '學生課程作業'
         unique_together = ['student', 'course_task']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 記錄載入時的分析結果，儲存時可判斷是否需要更新課程任務的彙總
+        instance._rollup_values = {
+            field: copy.deepcopy(value) for field, value in zip(field_names, values) if field in ROLLUP_FIELDS
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        """分析結果有變動時，在同一個交易中以增量更新課程任務的彙總"""
+        # 延遲載入，避免 models 與 utils 循環引用
+        from ..utils.rollup_utils import apply_rollup_changes
+
+        update_fields = kwargs.get('update_fields')
+        deferred = self.get_deferred_fields()
+        fields = [
+            field for field in ROLLUP_FIELDS
+            if field not in deferred and (update_fields is None or field in update_fields)
+        ]
+        new_values = {field: getattr(self, field) for field in fields}
+        loaded_values = getattr(self, '_rollup_values', {})
+        if not fields or (self.pk is not None and all(
+            field in loaded_values and loaded_values[field] == new_values[field] for field in fields
+        )):
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            old_values = None
+            if self.pk is not None:
+                # 以資料庫中的舊值計算增量，記憶體中的物件可能已過期
+                old_values = StudentCourseTask.objects.select_for_update().filter(pk=self.pk).values(*fields).first()
+            super().save(*args, **kwargs)
+            apply_rollup_changes([(self.course_task_id, old_values, new_values)])
+        self._rollup_values = {**loaded_values, **copy.deepcopy(new_values)}
+
     def __str__(self):
         return f"{self.student.name} - {self.course_task.name}"
@@ -1,9 +1,12 @@
 from rest_framework import serializers
 from ..models.courses import Course
+from .eager_loading import EagerLoadingMixin
 from .student_class_serializer import StudentClassSerializer
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('student_class',)
+
     student_class_detail = StudentClassSerializer(source='student_class', read_only=True)
 
     class Meta:
@@ -16,7 +19,9 @@ class CourseSerializer(serializers.ModelSerializer):
             'student_class_detail',
             'all_assistive_tool_analysis',
             'all_prompt_analysis',
+            'all_keyword_analysis',
+            'rollup_updated_at',
             'created_at',
             'updated_at'
         ]
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['rollup_updated_at', 'created_at', 'updated_at']
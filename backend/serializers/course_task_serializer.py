@@ -1,10 +1,13 @@
 from rest_framework import serializers
-from ..models.course_tasks import CourseTask
+from ..models.course_tasks import COURSE_TASK_ROLLUP_FIELDS, CourseTask
 from .course_serializer import CourseSerializer
+from .eager_loading import EagerLoadingMixin
 from .student_class_serializer import StudentClassSerializer
 
 
-class CourseTaskSerializer(serializers.ModelSerializer):
+class CourseTaskSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = (*CourseSerializer.related_to('course'), 'student_class')
+
     course_detail = CourseSerializer(source='course', read_only=True)
     student_class_detail = StudentClassSerializer(source='student_class', read_only=True)
     content_file_url = serializers.SerializerMethodField()
@@ -34,4 +37,5 @@ class CourseTaskSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at'
         ]
-        read_only_fields = ['created_at', 'updated_at']
+        # 彙總欄位由學生作業的分析結果維護，不開放透過 API 寫入
+        read_only_fields = [*COURSE_TASK_ROLLUP_FIELDS, 'created_at', 'updated_at']
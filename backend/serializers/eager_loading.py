@@ -0,0 +1,17 @@
+class EagerLoadingMixin:
+    """
+    巢狀序列化器需要的關聯，列表查詢時以 select_related 一次 JOIN 載入，
+    避免每一列再各自查詢學生、課程、班級（N+1 查詢）
+    """
+    select_related_fields = ()
+
+    @classmethod
+    def related_to(cls, field):
+        """經由 field 巢狀使用此序列化器時需要載入的關聯（含 field 本身）"""
+        return (field, *(f'{field}__{related}' for related in cls.select_related_fields))
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        return queryset
@@ -0,0 +1,18 @@
+from rest_framework import serializers
+from ..models.keyword_normalizations import KeywordNormalization
+
+
+class KeywordNormalizationSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = KeywordNormalization
+        fields = [
+            'id',
+            'variant',
+            'canonical',
+            'course',
+            'add_to_dictionary',
+            'created_at',
+            'updated_at'
+        ]
+        read_only_fields = ['created_at', 'updated_at']
@@ -2,9 +2,12 @@ from rest_framework import serializers
 from ..models.student_courses import StudentCourse
 from .student_serializer import StudentSerializer
 from .course_serializer import CourseSerializer
+from .eager_loading import EagerLoadingMixin
 
 
-class StudentCourseSerializer(serializers.ModelSerializer):
+class StudentCourseSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('student', *CourseSerializer.related_to('course'))
+
     student_detail = StudentSerializer(source='student', read_only=True)
     course_detail = CourseSerializer(source='course', read_only=True)
 
@@ -3,9 +3,14 @@ from ..models.student_course_tasks import StudentCourseTask
 from .student_serializer import StudentSerializer
 from .course_serializer import CourseSerializer
 from .course_task_serializer import CourseTaskSerializer
+from .eager_loading import EagerLoadingMixin
 
 
-class StudentCourseTaskSerializer(serializers.ModelSerializer):
+class StudentCourseTaskSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = (
+        'student', *CourseSerializer.related_to('course'), *CourseTaskSerializer.related_to('course_task')
+    )
+
     student_detail = StudentSerializer(source='student', read_only=True)
     course_detail = CourseSerializer(source='course', read_only=True)
     course_task_detail = CourseTaskSerializer(source='course_task', read_only=True)
@@ -0,0 +1,81 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models.course_tasks import CourseTask
+from .models.keyword_normalizations import KeywordNormalization
+from .models.student_course_tasks import ROLLUP_FIELDS, StudentCourseTask
+from .utils.keyword_index import update_document_frequency
+from .utils.keyword_normalization import invalidate_version
+from .utils.rollup_utils import apply_rollup_changes, enqueue_course_rollup_refresh
+
+
+def _invalidate_normalization_version():
+    # 立即清除讓本行程在交易中即可看到變動，提交後再清除一次，避免其他行程在提交前重新快取舊版本
+    invalidate_version()
+    transaction.on_commit(invalidate_version)
+
+
+def _enqueue_keyword_reanalysis(words, course_id):
+    from .tasks import reanalyze_normalized_keywords
+
+    words = sorted({word for word in words if word})
+    transaction.on_commit(lambda: reanalyze_normalized_keywords.delay(words, course_id))
+
+
+@receiver(post_init, sender=KeywordNormalization)
+def remember_keyword_normalization(sender, instance, **kwargs):
+    # 記錄修改前的值，變體詞或課程被修改時舊的作業也需要重新分析
+    instance._original = (instance.variant, instance.canonical, instance.course_id)
+
+
+@receiver(post_save, sender=KeywordNormalization)
+def keyword_normalization_saved(sender, instance, created, **kwargs):
+    """正規化對照變動時只重新分析含有相關詞的作業"""
+    _invalidate_normalization_version()
+    variant, canonical, course_id = instance._original
+    words = [instance.variant, instance.canonical]
+    if not created:
+        words += [variant, canonical]
+        if course_id != instance.course_id:
+            # 改變套用的課程時舊範圍的作業也受影響
+            _enqueue_keyword_reanalysis(words, course_id)
+    instance._original = (instance.variant, instance.canonical, instance.course_id)
+    _enqueue_keyword_reanalysis(words, instance.course_id)
+
+
+@receiver(post_delete, sender=KeywordNormalization)
+def keyword_normalization_deleted(sender, instance, **kwargs):
+    _invalidate_normalization_version()
+    _enqueue_keyword_reanalysis([instance.variant, instance.canonical], instance.course_id)
+
+
+@receiver(pre_delete, sender=StudentCourseTask)
+def remember_deleted_keyword_counts(sender, instance, **kwargs):
+    # API 的 queryset 延遲載入 keyword_counts，刪除後已無法再從資料庫讀取，需在刪除前取得
+    if 'keyword_counts' in instance.__dict__:
+        instance._deleted_keyword_counts = instance.keyword_counts
+    else:
+        instance._deleted_keyword_counts = StudentCourseTask.objects.filter(pk=instance.pk).values_list(
+            'keyword_counts', flat=True
+        ).first()
+
+
+@receiver(post_delete, sender=StudentCourseTask)
+def student_course_task_deleted(sender, instance, **kwargs):
+    """作業刪除時從文件頻率索引與課程任務彙總扣除其貢獻"""
+    keyword_counts = getattr(instance, '_deleted_keyword_counts', None)
+    if keyword_counts:
+        update_document_frequency(instance.course_task_id, keyword_counts, {})
+    # 從課程任務的彙總扣除該作業的貢獻
+    with transaction.atomic():
+        apply_rollup_changes([
+            (instance.course_task_id, {field: getattr(instance, field) for field in ROLLUP_FIELDS},
+             dict.fromkeys(ROLLUP_FIELDS))
+        ])
+
+
+@receiver(post_delete, sender=CourseTask)
+def course_task_deleted(sender, instance, **kwargs):
+    """課程任務刪除時重建所屬課程的彙總"""
+    enqueue_course_rollup_refresh([instance.course_id])
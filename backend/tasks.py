@@ -2,129 +2,460 @@
 
 # backend/tasks.py
 
-from celery import shared_task
+import uuid
+
+from celery import chain, chord, group, shared_task
+from celery.signals import worker_process_init
 from celery.utils.log import get_task_logger
+from django.conf import settings
+from django.core.cache import cache
 
-from .models import StudentCourse
+from .models.analysis_batches import AnalysisBatch
 from .models.student_course_tasks import StudentCourseTask
-from .models.course_tasks import CourseTask
-from .utils.analysis_utils import extract_text, analyze_keywords, analyze_assist_tools_and_prompt
+from .utils.analysis_utils import (
+    extract_text, analyze_keywords, analyze_assist_tools_and_prompt, bulk_analyze_keywords, reanalyze_keywords_containing
+)
+from .utils.offline_batch import (
+    TERMINAL_STATUSES, apply_batch_results, delete_batch_file, get_batch_backend, parse_batch_output, split_cached,
+    write_batch_file
+)
+from .utils.keyword_analyzer import get_keyword_analyzer
+from .utils.ocr_reader import get_reader_pool
+from .utils.packed_analysis import analyze_assist_tools_and_prompt_packed
+from .utils.progress_utils import create_batch, finish_batch, record_stage_done, record_task_finished
+from .utils.rollup_utils import get_course_rollup_pending_key, refresh_course_rollup
 
 logger = get_task_logger(__name__)
 
 
-@shared_task(bind=True)
-def analyze_single_task(self, task_id):
-    """
-    分析單個學生作業
-    """
+@worker_process_init.connect
+def warm_up_ocr_reader(**kwargs):
+    """worker 子行程啟動時預先載入 OCR 模型，之後的作業直接重複使用"""
+    if not getattr(settings, 'OCR_READER_PREWARM', True):
+        return
     try:
-        logger.info(f"開始分析學生作業 ID: {task_id}")
-        task = StudentCourseTask.objects.get(id=task_id)
-
-        # 1. 提取文本
-        if not task.ocr_content:
-            logger.info(f"正在進行 OCR 文字提取，作業 ID: {task_id}")
-            ocr_result = extract_text(task, True)
-            if not ocr_result['success']:
-                logger.error(f"OCR 提取失敗，作業 ID: {task_id}，錯誤: {ocr_result['message']}")
-                return {'status': 'FAILURE', 'message': ocr_result['message']}
-            # 刷新資料
-            task.refresh_from_db()
-
-        # 2. 分析關鍵詞
-        logger.info(f"正在進行關鍵詞分析，作業 ID: {task_id}")
-        keywords_result = analyze_keywords(task)
-        if not keywords_result['success']:
-            logger.error(f"關鍵詞分析失敗，作業 ID: {task_id}，錯誤: {keywords_result['message']}")
-            return {'status': 'FAILURE', 'message': keywords_result['message']}
-
-        # 3. 分析輔助工具與提示詞
-        logger.info(f"正在進行輔助工具與提示詞分析，作業 ID: {task_id}")
-        analysis_result = analyze_assist_tools_and_prompt(task)
-        if not analysis_result['success']:
-            logger.error(f"輔助工具分析失敗，作業 ID: {task_id}，錯誤: {analysis_result['message']}")
-            return {'status': 'FAILURE', 'message': analysis_result['message']}
-
-        # 4. 更新分析狀態
-        task.is_analyzed = True
-        task.save()
-
-        logger.info(f"作業分析完成，作業 ID: {task_id}")
+        get_reader_pool().warm_up()
+        logger.info("OCR reader 預載完成")
+    except Exception as e:
+        logger.error(f"OCR reader 預載失敗，將於第一次使用時再載入，錯誤: {str(e)}")
+
+
+@worker_process_init.connect
+def warm_up_keyword_analyzer(**kwargs):
+    """worker 子行程啟動時預先載入 jieba 詞典與停用詞，第一份作業不需等待初始化"""
+    if not getattr(settings, 'KEYWORD_ANALYZER_PREWARM', True):
+        return
+    try:
+        get_keyword_analyzer()
+        logger.info("關鍵詞分析器預載完成")
+    except Exception as e:
+        logger.error(f"關鍵詞分析器預載失敗，將於第一次使用時再載入，錯誤: {str(e)}")
+
+
+def _as_payload(payload):
+    """chain 中各階段之間傳遞的資料，單獨執行時第一個階段收到的是作業 ID"""
+    if isinstance(payload, dict):
+        return payload
+    return {'task_id': payload, 'status': 'SUCCESS', 'batch_id': None}
 
-        return {
-            'task_id': task_id,
-            'status': 'SUCCESS',
-        }
 
+def _stage_failed(task, payload, stage, result):
+    """可重試的錯誤交給 Celery 重試，超過次數或不可重試時標記失敗並讓後續階段略過"""
+    if result.get('retryable') and task.request.retries < task.max_retries:
+        countdown = task.default_retry_delay * (2 ** task.request.retries)
+        logger.warning(f"{stage} 階段失敗，{countdown} 秒後重試，作業 ID: {payload['task_id']}，錯誤: {result['message']}")
+        raise task.retry(countdown=countdown)
+
+    logger.error(f"{stage} 階段失敗，作業 ID: {payload['task_id']}，錯誤: {result['message']}")
+    record_task_finished(
+        payload.get('batch_id'), success=False,
+        task_id=payload['task_id'], stage=stage, message=result['message']
+    )
+    return {**payload, 'status': 'FAILURE', 'stage': stage, 'message': result['message']}
+
+
+def _run_stage(task, payload, stage, handler):
+    payload = _as_payload(payload)
+    if payload['status'] != 'SUCCESS':
+        # 前一個階段已失敗，直接把失敗結果往下傳
+        return payload
+
+    task_id = payload['task_id']
+    try:
+        student_task = StudentCourseTask.objects.get(id=task_id)
     except StudentCourseTask.DoesNotExist:
         logger.error(f"找不到學生作業，ID: {task_id}")
-        return {'status': 'FAILURE', 'message': f'找不到 ID 為 {task_id} 的學生作業'}
+        message = f'找不到 ID 為 {task_id} 的學生作業'
+        record_task_finished(payload.get('batch_id'), success=False, task_id=task_id, stage=stage, message=message)
+        return {**payload, 'status': 'FAILURE', 'stage': stage, 'message': message}
+
+    result = handler(student_task)
+    if not result['success']:
+        return _stage_failed(task, payload, stage, result)
+
+    record_stage_done(payload.get('batch_id'), stage, task_id=task_id)
+    if stage == 'llm':
+        record_task_finished(payload.get('batch_id'), success=True, task_id=task_id)
+    return payload
+
+
+def _ocr_handler(student_task):
+    # 已有 OCR 內容時略過，重試整條 chain 不會重複 OCR
+    if student_task.ocr_content:
+        logger.info(f"已有 OCR 內容，略過 OCR，作業 ID: {student_task.id}")
+        return {'success': True}
+    logger.info(f"正在進行 OCR 文字提取，作業 ID: {student_task.id}")
+    return extract_text(student_task, True)
+
+
+def _keyword_handler(student_task):
+    logger.info(f"正在進行關鍵詞分析，作業 ID: {student_task.id}")
+    return analyze_keywords(student_task)
+
+
+def _llm_handler(student_task):
+    # 已有 GPT 分析結果時略過，避免重複付費
+    if not (student_task.assistive_tool_analysis and student_task.prompt_analysis):
+        logger.info(f"正在進行輔助工具與提示詞分析，作業 ID: {student_task.id}")
+        result = analyze_assist_tools_and_prompt(student_task)
+        if not result['success']:
+            return result
+        if result.get('partial'):
+            logger.warning(f"GPT 回覆被截斷，已保存修復後的部分結果（不寫入快取），作業 ID: {student_task.id}")
+
+    student_task.is_analyzed = True
+    student_task.save()
+    logger.info(f"作業分析完成，作業 ID: {student_task.id}")
+    return {'success': True}
+
+
+@shared_task(bind=True, acks_late=True, max_retries=2, default_retry_delay=30)
+def ocr_stage(self, payload):
+    """OCR 階段（CPU 密集，路由到 ocr 佇列）"""
+    return _run_stage(self, payload, 'ocr', _ocr_handler)
+
+
+@shared_task(bind=True, acks_late=True, max_retries=2, default_retry_delay=10)
+def keyword_stage(self, payload):
+    """關鍵詞分析階段（路由到 keywords 佇列）"""
+    return _run_stage(self, payload, 'keywords', _keyword_handler)
+
+
+@shared_task(bind=True, acks_late=True, max_retries=5, default_retry_delay=15)
+def llm_stage(self, payload):
+    """GPT 輔助工具與提示詞分析階段（I/O 密集，路由到 llm 佇列）"""
+    return _run_stage(self, payload, 'llm', _llm_handler)
+
+
+@shared_task(bind=True, acks_late=True, max_retries=3, default_retry_delay=30)
+def packed_llm_stage(self, payloads):
+    """
+    合併模式的 GPT 分析階段（chord callback）：收到所有作業前兩個階段的結果，
+    將較短的文本合併成少數幾個請求分析，每份作業的結果與進度個別記錄
+    """
+    payloads = [_as_payload(payload) for payload in payloads]
+    pending = {
+        payload['task_id']: payload for payload in payloads
+        if payload['status'] == 'SUCCESS' and not payload.get('llm_done')
+    }
+    student_tasks = list(StudentCourseTask.objects.filter(id__in=pending))
+
+    # 已有 GPT 分析結果的作業不再送出
+    to_analyze = [task for task in student_tasks if not (task.assistive_tool_analysis and task.prompt_analysis)]
+    logger.info(f"合併分析 {len(to_analyze)} 份作業的輔助工具與提示詞")
+    results = analyze_assist_tools_and_prompt_packed(to_analyze)
+
+    retry_needed = False
+    for student_task in student_tasks:
+        payload = pending[student_task.id]
+        result = results.get(student_task.id, {'success': True})
+        if result['success']:
+            student_task.is_analyzed = True
+            student_task.save()
+            payload['llm_done'] = True
+            record_stage_done(payload.get('batch_id'), 'llm', task_id=student_task.id)
+            record_task_finished(payload.get('batch_id'), success=True, task_id=student_task.id)
+        elif result.get('retryable') and self.request.retries < self.max_retries:
+            retry_needed = True
+        else:
+            logger.error(f"llm 階段失敗，作業 ID: {student_task.id}，錯誤: {result['message']}")
+            record_task_finished(
+                payload.get('batch_id'), success=False,
+                task_id=student_task.id, stage='llm', message=result['message']
+            )
+            payload.update(status='FAILURE', stage='llm', message=result['message'])
+
+    for task_id in set(pending) - {task.id for task in student_tasks}:
+        message = f'找不到 ID 為 {task_id} 的學生作業'
+        record_task_finished(pending[task_id].get('batch_id'), success=False, task_id=task_id, stage='llm', message=message)
+        pending[task_id].update(status='FAILURE', stage='llm', message=message)
+
+    if retry_needed:
+        # 只重試尚未完成的作業，已完成的帶著 llm_done 標記略過
+        countdown = self.default_retry_delay * (2 ** self.request.retries)
+        raise self.retry(args=(payloads,), countdown=countdown)
+
+    return payloads
+
+
+def _record_llm_results(payloads, succeeded, errors):
+    """記錄離線批次中每份作業的完成或失敗，回傳更新後的 payload"""
+    for payload in payloads:
+        task_id = payload['task_id']
+        if payload['status'] != 'SUCCESS' or payload.get('llm_done'):
+            continue
+        if task_id in succeeded:
+            payload['llm_done'] = True
+            record_stage_done(payload.get('batch_id'), 'llm', task_id=task_id)
+            record_task_finished(payload.get('batch_id'), success=True, task_id=task_id)
+        elif task_id in errors:
+            record_task_finished(
+                payload.get('batch_id'), success=False, task_id=task_id, stage='llm', message=errors[task_id]
+            )
+            payload.update(status='FAILURE', stage='llm', message=errors[task_id])
+    return payloads
+
+
+@shared_task(bind=True, acks_late=True, max_retries=3, default_retry_delay=60)
+def submit_offline_batch(self, payloads, batch_id):
+    """
+    離線模式（chord callback）：將所有待分析作業的請求寫成 JSONL 後送出 Batch API，
+    不佔用即時請求的速率限制，之後由 poll_offline_batch 輪詢結果
+    """
+    payloads = [_as_payload(payload) for payload in payloads]
+    model = getattr(settings, 'LLM_MODEL', 'gpt-4o')
+    task_ids = [payload['task_id'] for payload in payloads if payload['status'] == 'SUCCESS']
+    student_tasks = list(StudentCourseTask.objects.filter(id__in=task_ids))
+
+    # 已有 GPT 分析結果的作業直接標記完成，命中快取的作業直接寫回
+    analyzed = [task for task in student_tasks if task.assistive_tool_analysis and task.prompt_analysis]
+    StudentCourseTask.objects.filter(id__in=[task.id for task in analyzed]).update(is_analyzed=True)
+    cached, to_submit = split_cached(
+        [task for task in student_tasks if task not in analyzed], model
+    )
+    succeeded = {task.id for task in analyzed} | set(apply_batch_results(cached, model, cache_results=False))
+    missing = set(task_ids) - {task.id for task in student_tasks}
+    errors = {task_id: f'找不到 ID 為 {task_id} 的學生作業' for task_id in missing}
+    payloads = _record_llm_results(payloads, succeeded, errors)
+
+    if not to_submit:
+        return {'payloads': payloads, 'external_batch_id': None}
+
+    path = write_batch_file(batch_id, to_submit, model)
+    try:
+        external_batch_id = get_batch_backend().submit(batch_id, path)
     except Exception as e:
-        logger.error(f"作業分析出現未預期錯誤，作業 ID: {task_id}，錯誤: {str(e)}")
-        return {'status': 'FAILURE', 'message': str(e)}
+        if getattr(e, 'retryable', True) and self.request.retries < self.max_retries:
+            raise self.retry(args=(payloads, batch_id), countdown=self.default_retry_delay * (2 ** self.request.retries))
+        logger.error(f"離線批次送出失敗，批次 ID: {batch_id}，錯誤: {str(e)}")
+        errors = {task.id: f'離線批次送出失敗: {str(e)}' for task in to_submit}
+        return {'payloads': _record_llm_results(payloads, set(), errors), 'external_batch_id': None}
+    finally:
+        # 輸入檔已上傳（或送出失敗、重試時會重新產生），不在本機保留學生的 OCR 全文
+        delete_batch_file(path)
+
+    AnalysisBatch.objects.filter(id=batch_id).update(external_batch_id=external_batch_id)
+    logger.info(f"已送出離線批次 {external_batch_id}，共 {len(to_submit)} 份作業")
+    return {'payloads': payloads, 'external_batch_id': external_batch_id}
+
+
+@shared_task(bind=True, acks_late=True, max_retries=None)
+def poll_offline_batch(self, state):
+    """輪詢離線批次，結束後以 bulk_update 寫回分析結果，回傳給 finalize_batch_analysis 的 payload"""
+    payloads = state['payloads']
+    external_batch_id = state['external_batch_id']
+    if not external_batch_id:
+        return payloads
+
+    status, output = get_batch_backend().retrieve(external_batch_id)
+    if status not in TERMINAL_STATUSES:
+        raise self.retry(countdown=getattr(settings, 'LLM_BATCH_POLL_INTERVAL', 300))
+
+    model = getattr(settings, 'LLM_MODEL', 'gpt-4o')
+    results, errors, partial = parse_batch_output(output or '')
+    succeeded = set(apply_batch_results(results, model, partial=partial))
+    try:
+        get_batch_backend().discard(external_batch_id)
+    except Exception as e:
+        logger.warning(f"刪除離線批次 {external_batch_id} 的輸出檔失敗: {str(e)}")
+    # 批次失敗或過期時，沒有輸出的作業都視為失敗
+    for payload in payloads:
+        task_id = payload['task_id']
+        if payload['status'] == 'SUCCESS' and not payload.get('llm_done') and task_id not in succeeded:
+            errors.setdefault(task_id, f'離線批次未完成 (狀態: {status})')
+    logger.info(f"離線批次 {external_batch_id} 結束 (狀態: {status})，成功 {len(succeeded)} 份，失敗 {len(errors)} 份")
+    return _record_llm_results(payloads, succeeded, errors)
+
+
+def build_analysis_chain(task_id, batch_id=None, include_llm=True):
+    """單份作業的分析流程：OCR -> 關鍵詞 -> GPT，各階段獨立重試"""
+    payload = {'task_id': task_id, 'status': 'SUCCESS', 'batch_id': batch_id}
+    if not include_llm:
+        # 合併與離線模式於所有作業完成前兩個階段後統一進行 GPT 分析
+        return chain(ocr_stage.s(payload), keyword_stage.s())
+    return chain(ocr_stage.s(payload), keyword_stage.s(), llm_stage.s())
 
 
 @shared_task(bind=True)
-def batch_analyze_tasks(self, course_id, course_task_id):
+def analyze_single_task(self, task_id):
     """
-    批量分析指定課程任務的所有學生作業
+    分析單個學生作業（啟動分析 chain）
     """
-    try:
-        logger.info(f"開始批量分析課程 ID:{course_id} 的所有學生作業")
-
-        # 獲取該課程任務的所有學生作業
-        student_tasks = StudentCourseTask.objects.filter(course_id=course_id, is_analyzed=False,
-                                                         task_file__isnull=False)
-        print(student_tasks)
-
-        if not student_tasks.exists():
-            logger.warning(f"課程任務 ID: {course_task_id} 沒有找到任何學生作業")
-            return {
-                'status': 'COMPLETED',
-                'message': '沒有找到任何學生作業',
-                'processed_count': 0,
-                'failed_count': 0,
-                'successful_tasks': [],
-                'failed_tasks': []
-            }
-
-        total_tasks = student_tasks.count()
-        logger.info(f"找到 {total_tasks} 個學生作業需要分析")
-
-        # 啟動所有分析任務
-        task_results = []
-        for idx, student_task in enumerate(student_tasks):
-            # 檢查作業是否已經分析過
-            if student_task.is_analyzed:
-                logger.info(f"學生作業 ID: {student_task.id} 已經分析過，跳過")
-                task_results.append({
-                    'task_id': student_task.id,
-                    'status': 'SKIPPED',
-                    'message': '作業已經分析過'
-                })
-                continue
-
-            logger.info(f"啟動作業 ID: {student_task.id} 的分析任務 ({idx + 1}/{total_tasks})")
-            result = analyze_single_task.delay(student_task.id)
-            task_results.append({
-                'task_id': student_task.id,
-                'celery_task_id': result.id,
-                'status': 'PENDING'
-            })
-
-        logger.info(f"批量分析啟動完成，共啟動了 {len(task_results)} 個任務")
+    logger.info(f"開始分析學生作業 ID: {task_id}")
+    result = build_analysis_chain(task_id).apply_async()
+    return {
+        'task_id': task_id,
+        'status': 'STARTED',
+        'celery_task_id': result.id,
+    }
+
+
+@shared_task(bind=True)
+def finalize_batch_analysis(self, results, course_task_id, batch_id=None):
+    """
+    chord callback：所有作業分析完成後結束批次（課程任務的彙總已隨各作業寫入增量更新）
+    """
+    successful_tasks = [result['task_id'] for result in results if result.get('status') == 'SUCCESS']
+    failed_tasks = [
+        {'task_id': result['task_id'], 'stage': result.get('stage'), 'message': result.get('message')}
+        for result in results if result.get('status') != 'SUCCESS'
+    ]
+
+    if batch_id:
+        finish_batch(batch_id)
+    logger.info(f"批量分析完成，課程任務 ID: {course_task_id}，成功 {len(successful_tasks)} 個，失敗 {len(failed_tasks)} 個")
+
+    return {
+        'status': 'COMPLETED',
+        'processed_count': len(successful_tasks),
+        'failed_count': len(failed_tasks),
+        'successful_tasks': successful_tasks,
+        'failed_tasks': failed_tasks
+    }
+
+
+@shared_task
+def fail_batch_analysis(batch_id):
+    """
+    chord 的 error callback：作業任務或 callback 失敗（逾時、資料庫錯誤、重試用盡）時結束批次並標記為失敗，
+    避免前端持續等待
+    """
+    logger.error(f"批量分析未能完成，批次 ID: {batch_id}")
+    finish_batch(batch_id, AnalysisBatch.STATUS_FAILURE)
+
+
+def start_batch_analysis(course_id, course_task_id, mode=None):
+    """
+    以 group + chord 啟動課程任務所有未分析作業的分析，回傳可輪詢的 GroupResult ID
+    mode 為 interactive（每份作業各自送出 GPT 請求）、packed（多份較短的作業合併成一個請求）
+    或 offline（透過 OpenAI Batch API 離線分析）
+    """
+    mode = mode or getattr(settings, 'ANALYSIS_BATCH_MODE', AnalysisBatch.MODE_INTERACTIVE)
+    if mode not in dict(AnalysisBatch.MODE_CHOICES):
+        raise ValueError(f'不支援的分析模式: {mode}')
+    logger.info(f"開始批量分析課程 ID:{course_id} 課程任務 ID:{course_task_id} 的所有學生作業")
+
+    task_ids = list(
+        StudentCourseTask.objects.filter(
+            course_id=course_id,
+            course_task_id=course_task_id,
+            is_analyzed=False,
+            task_file__isnull=False
+        ).exclude(task_file='').values_list('id', flat=True)
+    )
 
+    if not task_ids:
+        logger.warning(f"課程任務 ID: {course_task_id} 沒有找到任何需要分析的學生作業")
+        # 仍建立已完成的進度紀錄，前端輪詢可立即得到完成狀態
+        batch = create_batch(str(uuid.uuid4()), course_task_id, 0, mode)
         return {
-            'status': 'STARTED',
-            'message': f'成功啟動 {len(task_results)} 個分析任務',
-            'total_tasks': total_tasks,
-            'task_details': task_results
+            'status': 'COMPLETED',
+            'message': '沒有找到任何學生作業',
+            'group_id': batch.id,
+            'total_tasks': 0
         }
 
-    except CourseTask.DoesNotExist:
-        logger.error(f"找不到課程任務，ID: {course_task_id}")
-        return {'status': 'FAILURE', 'message': f'找不到 ID 為 {course_task_id} 的課程任務'}
+    logger.info(f"找到 {len(task_ids)} 個學生作業需要分析")
+    # 進度紀錄與 GroupResult 共用同一個 ID，各階段完成時原子地累加計數
+    batch_id = str(uuid.uuid4())
+    create_batch(batch_id, course_task_id, len(task_ids), mode)
+
+    header = group(
+        build_analysis_chain(task_id, batch_id, include_llm=mode == AnalysisBatch.MODE_INTERACTIVE)
+        for task_id in task_ids
+    )
+    group_result = header.freeze(group_id=batch_id)
+    group_result.save()
+    callback = finalize_batch_analysis.s(course_task_id, batch_id)
+    if mode == AnalysisBatch.MODE_PACKED:
+        callback = chain(packed_llm_stage.s(), callback)
+    elif mode == AnalysisBatch.MODE_OFFLINE:
+        callback = chain(submit_offline_batch.s(batch_id), poll_offline_batch.s(), callback)
+    # 作業任務拋出例外時 chord 不會執行 callback，改由 error callback 結束批次
+    callback.link_error(fail_batch_analysis.si(batch_id))
+    result = chord(header)(callback)
+
+    return {
+        'status': 'STARTED',
+        'message': f'成功啟動 {len(task_ids)} 個分析任務',
+        'group_id': group_result.id,
+        'rollup_task_id': result.id,
+        'total_tasks': len(task_ids)
+    }
+
+
+@shared_task(bind=True)
+def batch_analyze_tasks(self, course_id, course_task_id, mode=None):
+    """
+    批量分析指定課程任務的所有學生作業
+    """
+    try:
+        return start_batch_analysis(course_id, course_task_id, mode)
     except Exception as e:
         logger.error(f"批量分析啟動失敗，錯誤: {str(e)}")
         return {'status': 'FAILURE', 'message': str(e)}
+
+
+@shared_task(bind=True)
+def bulk_keyword_analysis(self, course_task_id):
+    """
+    重新分析課程任務所有作業的關鍵詞（路由到 keywords 佇列）
+    """
+    logger.info(f"開始批量關鍵詞分析，課程任務 ID: {course_task_id}")
+    result = bulk_analyze_keywords(course_task_id)
+    if not result['success']:
+        logger.error(f"批量關鍵詞分析失敗，課程任務 ID: {course_task_id}，錯誤: {result['message']}")
+        return {'status': 'FAILURE', 'message': result['message']}
+
+    logger.info(f"批量關鍵詞分析完成，課程任務 ID: {course_task_id}，共 {result['data']['analyzed_count']} 份作業")
+    return {'status': 'COMPLETED', **result['data']}
+
+
+@shared_task(bind=True, max_retries=2, default_retry_delay=30)
+def reanalyze_normalized_keywords(self, words, course_id=None):
+    """
+    關鍵詞正規化對照表變動後，只重新分析含有相關詞的作業（路由到 keywords 佇列）
+    """
+    result = reanalyze_keywords_containing(words, course_id)
+    if not result['success']:
+        logger.error(f"重新分析關鍵詞失敗，相關詞: {words}，錯誤: {result['message']}")
+        raise self.retry()
+
+    logger.info(f"正規化對照表變動，已重新分析 {result['data']['analyzed_count']} 份作業的關鍵詞，相關詞: {words}")
+    return {'status': 'COMPLETED', **result['data']}
+
+
+@shared_task(bind=True, max_retries=2, default_retry_delay=10)
+def rebuild_course_rollup(self, course_id):
+    """
+    課程任務的彙總變動後，由各課程任務的彙總重建課程層級的彙總（只讀取課程任務，不掃描學生作業）
+    """
+    # 讀取彙總前先清除合併用的快取鍵，讀取之後才提交的變動會再排入一次重建
+    cache.delete(get_course_rollup_pending_key(course_id))
+    try:
+        rollup = refresh_course_rollup(course_id)
+    except Exception as e:
+        logger.error(f"重建課程彙總失敗，課程 ID: {course_id}，錯誤: {str(e)}")
+        raise self.retry()
+
+    return {'status': 'COMPLETED', 'course_id': course_id, 'course_tasks_count': rollup['course_tasks_count']}
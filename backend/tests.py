@@ -1,3 +1,1045 @@
-from django.test import TestCase
+import json
+import re
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .models import (
+    Course, CourseTask, KeywordNormalization, LLMCacheEntry, Student, StudentClass, StudentCourse, StudentCourseTask
+)
+from .utils.analysis_utils import analyze_chunks
+from .utils.image_tiling import ImageStrips, _stitch, iter_tiles, ocr_image
+from .utils.keyword_index import get_document_frequencies, update_document_frequency
+from .utils.llm_json import LLMOutputError, normalize_analysis_result, parse_llm_json, repair_json
+from .utils.tool_counter import ASSISTIVE_TOOLS
+
+
+class QueryCountAssertionsMixin:
+    """列表端點的查詢數須與資料筆數無關，巢狀序列化器缺少關聯載入時（N+1 查詢）測試失敗"""
+
+    def assertListQueriesConstant(self, url, add_rows, sizes=(1, 5)):
+        query_counts = []
+        created = 0
+        for size in sizes:
+            add_rows(size - created)
+            created = size
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()), size)
+            query_counts.append(len(context))
+
+        self.assertEqual(
+            len(set(query_counts)), 1,
+            f'{url} 的查詢數隨資料筆數增加: ' + ', '.join(
+                f'{size} 筆 {count} 次' for size, count in zip(sizes, query_counts)
+            )
+        )
+
+
+class ListQueryCountTests(QueryCountAssertionsMixin, TestCase):
+    def setUp(self):
+        self.student_class = StudentClass.objects.create(name='class')
+        self.teacher = Student.objects.create_user('teacher', 'teacher', 'pw', student_class=self.student_class)
+        self.client = APIClient()
+        self.client.force_login(self.teacher)
+        self.row_index = 0
+
+    def _create_course(self):
+        # 每列使用各自的班級，確保巢狀關聯不會被同一物件的快取掩蓋
+        self.row_index += 1
+        student_class = StudentClass.objects.create(name=f'class {self.row_index}')
+        return Course.objects.create(name=f'course {self.row_index}', student_class=student_class)
+
+    def _create_course_task(self, course=None):
+        course = course or self._create_course()
+        return CourseTask.objects.create(name=f'task {self.row_index}', student_class=course.student_class, course=course)
+
+    def _create_student(self, student_class):
+        self.row_index += 1
+        return Student.objects.create_user(f's{self.row_index}', f'student {self.row_index}', 'pw',
+                                           student_class=student_class)
+
+    def _add_student_course_tasks(self, count, student=None, course=None):
+        for _ in range(count):
+            course_task = self._create_course_task(course)
+            StudentCourseTask.objects.create(
+                student=student or self._create_student(course_task.student_class),
+                course=course_task.course, course_task=course_task
+            )
+
+    def test_student_course_task_list(self):
+        self.assertListQueriesConstant('/api/student-course-tasks/', self._add_student_course_tasks)
+
+    def test_course_task_list(self):
+        self.assertListQueriesConstant(
+            '/api/course-tasks/', lambda count: [self._create_course_task() for _ in range(count)]
+        )
+
+    def test_course_list(self):
+        self.assertListQueriesConstant(
+            '/api/courses/', lambda count: [self._create_course() for _ in range(count)]
+        )
+
+    def test_student_course_list(self):
+        def add_rows(count):
+            for _ in range(count):
+                course = self._create_course()
+                StudentCourse.objects.create(student=self._create_student(course.student_class), course=course)
+
+        self.assertListQueriesConstant('/api/student-courses/', add_rows)
+
+    def test_course_tasks_of_course(self):
+        course = self._create_course()
+        self.assertListQueriesConstant(
+            f'/api/courses/{course.id}/course_tasks/',
+            lambda count: [self._create_course_task(course) for _ in range(count)]
+        )
+
+    def test_student_course_tasks_of_student_course(self):
+        course = self._create_course()
+        student = self._create_student(course.student_class)
+        student_course = StudentCourse.objects.create(student=student, course=course)
+        self.assertListQueriesConstant(
+            f'/api/student-courses/{student_course.id}/student_course_tasks/',
+            lambda count: self._add_student_course_tasks(count, student=student, course=course)
+        )
+
+
+class KeywordNormalizationPermissionTests(TestCase):
+    def setUp(self):
+        student_class = StudentClass.objects.create(name='class')
+        self.student = Student.objects.create_user('student', 'student', 'pw', student_class=student_class)
+        self.teacher = Student.objects.create_user('teacher', 'teacher', 'pw', student_class=student_class,
+                                                   is_staff=True)
+        self.client = APIClient()
+
+    def test_student_can_only_read(self):
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get('/api/keyword-normalizations/').status_code, 200)
+        response = self.client.post(
+            '/api/keyword-normalizations/', {'variant': 'apis', 'canonical': 'api', 'course': None}, format='json'
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(KeywordNormalization.objects.exists())
+
+    def test_teacher_can_write(self):
+        self.client.force_login(self.teacher)
+        response = self.client.post(
+            '/api/keyword-normalizations/', {'variant': 'apis', 'canonical': 'api', 'course': None}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+
+class KeywordAnalyzerDictionaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        student_class = StudentClass.objects.create(name='class')
+        self.course = Course.objects.create(name='course', student_class=student_class)
+        self.other_course = Course.objects.create(name='other', student_class=student_class)
+
+    def test_course_dictionary_words_do_not_leak_into_other_courses(self):
+        from .utils.keyword_analyzer import get_keyword_analyzer
+        from .utils.keyword_normalization import get_dictionary_words
+
+        KeywordNormalization.objects.create(
+            variant='介面設計', canonical='介面設計', course=self.course, add_to_dictionary=True
+        )
+        analyzer = get_keyword_analyzer()
+        text = '使用者介面設計很重要'
+        base_total = analyzer.tokenizer.total
+
+        self.assertEqual(get_dictionary_words(self.course.id), {'介面設計'})
+        self.assertEqual(get_dictionary_words(self.other_course.id), set())
+        self.assertIn('介面設計', analyzer.tokenize(text, dictionary_words=get_dictionary_words(self.course.id)))
+        self.assertNotIn('介面設計', analyzer.tokenize(text, dictionary_words=get_dictionary_words(self.other_course.id)))
+        # 共用的 jieba 詞典不受課程自訂詞影響
+        self.assertNotIn('介面設計', analyzer.tokenizer.FREQ)
+        self.assertEqual(analyzer.tokenizer.total, base_total)
+        self.assertIs(
+            analyzer.get_tokenizer(get_dictionary_words(self.course.id)),
+            analyzer.get_tokenizer(frozenset({'介面設計'}))
+        )
+
+    def test_version_is_cached_until_normalizations_change(self):
+        from .utils.keyword_normalization import get_dictionary_words, get_normalization_map
+
+        get_normalization_map(self.course.id)
+        get_dictionary_words(self.course.id)
+        with self.assertNumQueries(0):
+            get_normalization_map(self.course.id)
+            get_dictionary_words(self.course.id)
+
+        # 新增與刪除對照都經由 signals 清除版本快取，不需等待 TTL
+        normalization = KeywordNormalization.objects.create(
+            variant='ux', canonical='使用者經驗', course=self.course, add_to_dictionary=True
+        )
+        self.assertEqual(get_normalization_map(self.course.id).get('ux'), '使用者經驗')
+        self.assertEqual(get_dictionary_words(self.course.id), {'ux', '使用者經驗'})
+        normalization.delete()
+        self.assertNotIn('ux', get_normalization_map(self.course.id))
+        self.assertEqual(get_dictionary_words(self.course.id), set())
+
+
+class CourseRollupRefreshTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student_class = StudentClass.objects.create(name='class')
+        self.course = Course.objects.create(name='course', student_class=self.student_class)
+        self.course_task = CourseTask.objects.create(name='task', student_class=self.student_class, course=self.course)
+
+    def test_saves_are_coalesced_into_one_rebuild(self):
+        from .tasks import rebuild_course_rollup
+
+        with mock.patch.object(rebuild_course_rollup, 'apply_async') as apply_async:
+            for index in range(5):
+                student = Student.objects.create_user(f's{index}', f'student {index}', 'pw',
+                                                      student_class=self.student_class)
+                with self.captureOnCommitCallbacks(execute=True):
+                    StudentCourseTask.objects.create(
+                        student=student, course=self.course, course_task=self.course_task,
+                        keyword_analysis={'top_keywords': {'figma': 1}}
+                    )
+            self.assertEqual(apply_async.call_count, 1)
+
+            # 重建開始後的變動需再排入一次
+            rebuild_course_rollup.run(self.course.id)
+            self.course.refresh_from_db()
+            self.assertEqual(self.course.all_keyword_analysis, {'figma': 5})
+            with self.captureOnCommitCallbacks(execute=True):
+                StudentCourseTask.objects.filter(course_task=self.course_task).first().delete()
+            self.assertEqual(apply_async.call_count, 2)
+
+
+ANALYSIS_JSON = (
+    '{"assistive_tool_analysis": {"quick_question": 2}, "prompt_analysis": {"discussion_topics": '
+    '{"topic": "介面", "description": "說明"}, "prompts": [{"keyword": "配色", "times": 1}, '
+    '{"keyword": "字體", "times": 2}]}}'
+)
+
+
+class LLMJsonParsingTests(SimpleTestCase):
+    def test_plain_json_is_not_partial(self):
+        parsed, partial = parse_llm_json(ANALYSIS_JSON)
+        self.assertEqual(parsed['assistive_tool_analysis'], {'quick_question': 2})
+        self.assertFalse(partial)
+
+    def test_code_fence(self):
+        self.assertEqual(parse_llm_json(f'```json\n{ANALYSIS_JSON}\n```'), (json.loads(ANALYSIS_JSON), False))
+        self.assertEqual(parse_llm_json(f'```\n{ANALYSIS_JSON}'), (json.loads(ANALYSIS_JSON), False))
+
+    def test_surrounding_prose(self):
+        content = f'以下是分析結果：\n{ANALYSIS_JSON}\n希望有幫助！{{"extra": 1}}'
+        self.assertEqual(parse_llm_json(content), (json.loads(ANALYSIS_JSON), False))
+
+    def test_trailing_commas_are_not_partial(self):
+        self.assertEqual(repair_json('{"a": [1, 2,], "b": {"c": 1,},}'), ({'a': [1, 2], 'b': {'c': 1}}, False))
+
+    def test_cut_mid_string(self):
+        parsed, partial = repair_json('{"prompt_analysis": {"prompts": [{"keyword": "配色", "times": 1}, {"keyword": "字')
+        self.assertTrue(partial)
+        self.assertEqual(parsed['prompt_analysis']['prompts'][0], {'keyword': '配色', 'times': 1})
+
+    def test_cut_mid_key(self):
+        parsed, partial = repair_json('{"prompts": [{"keyword": "配色", "times": 1}], "discussion_to')
+        self.assertTrue(partial)
+        self.assertEqual(parsed, {'prompts': [{'keyword': '配色', 'times': 1}]})
+
+    def test_cut_after_key_keeps_incomplete_item_but_flags_partial(self):
+        # 退回到上一個逗號後最後一項缺少 times，需由 partial 標記提醒呼叫端不可當作完整結果
+        parsed, partial = parse_llm_json('{"prompts": [{"keyword": "配色", "times": 1}, {"keyword": "字體", "times":')
+        self.assertTrue(partial)
+        self.assertEqual(parsed, {'prompts': [{'keyword': '配色', 'times': 1}, {'keyword': '字體'}]})
+
+    def test_unrepairable(self):
+        with self.assertRaises(json.JSONDecodeError):
+            parse_llm_json('完全不是 JSON')
+
+
+class NormalizeAnalysisResultTests(SimpleTestCase):
+    def test_counts_are_coerced_and_invalid_prompts_dropped(self):
+        result = normalize_analysis_result({
+            'assistive_tool_analysis': {'quick_question': '3', 'rabbit_hole': True, 'summarize': 'many', 'custom': 1.7},
+            'prompt_analysis': {
+                'discussion_topics': 'not a dict',
+                'prompts': [{'keyword': '配色', 'times': '2'}, {'keyword': ''}, {'times': 1}, 'text',
+                            {'keyword': '字體'}],
+            },
+        })
+        self.assertEqual(result['assistive_tool_analysis'], {'quick_question': 3, 'rabbit_hole': 1, 'custom': 1})
+        self.assertEqual(result['prompt_analysis']['discussion_topics'], {})
+        self.assertEqual(result['prompt_analysis']['prompts'], [
+            {'keyword': '配色', 'times': 2}, {'keyword': '字體', 'times': 0}
+        ])
+
+    def test_missing_fields_raise(self):
+        for result in ([], {}, {'prompt_analysis': {}}, {'prompt_analysis': {'prompts': []}}):
+            with self.assertRaises(LLMOutputError):
+                normalize_analysis_result(result)
+
+    def test_tools_optional_when_counted_locally(self):
+        result = normalize_analysis_result({'prompt_analysis': {'prompts': []}}, include_tools=False)
+        self.assertNotIn('assistive_tool_analysis', result)
+
+
+class FakeLLMEngine:
+    def __init__(self, reply):
+        self.reply = reply
+
+    def complete_many(self, requests):
+        return [self.reply for _ in requests]
+
+
+class AnalyzeChunksCacheTests(TestCase):
+    def test_truncated_reply_is_flagged_and_not_cached(self):
+        result = analyze_chunks(FakeLLMEngine(ANALYSIS_JSON[:-30]), ['第一段'], 'gpt-4o')
+        self.assertTrue(result['success'])
+        self.assertTrue(result['partial'])
+        self.assertFalse(LLMCacheEntry.objects.exists())
+
+    def test_complete_chunks_are_cached(self):
+        result = analyze_chunks(FakeLLMEngine(ANALYSIS_JSON), ['第一段', '第二段'], 'gpt-4o')
+        self.assertTrue(result['success'])
+        self.assertNotIn('partial', result)
+        self.assertEqual(LLMCacheEntry.objects.count(), 2)
+
+
+class StudentCourseTaskDeleteTests(TestCase):
+    def test_delete_through_api_removes_document_frequencies(self):
+        student_class = StudentClass.objects.create(name='class')
+        course = Course.objects.create(name='course', student_class=student_class)
+        course_task = CourseTask.objects.create(name='task', student_class=student_class, course=course)
+        tasks = []
+        for index in range(2):
+            student = Student.objects.create_user(f's{index}', f'student {index}', 'pw', student_class=student_class)
+            task = StudentCourseTask.objects.create(student=student, course=course, course_task=course_task)
+            task.keyword_counts = {'介面': 2, f'詞{index}': 1}
+            task.save()
+            update_document_frequency(course_task.id, {}, task.keyword_counts)
+            tasks.append(task)
+
+        client = APIClient()
+        client.force_login(tasks[0].student)
+        # viewset 的 queryset 延遲載入 keyword_counts，刪除後的訊號仍需扣除正確的文件頻率
+        response = client.delete(f'/api/student-course-tasks/{tasks[0].id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(StudentCourseTask.objects.filter(id=tasks[0].id).exists())
+        self.assertEqual(get_document_frequencies(course_task_id=course_task.id), {'介面': 1, '詞1': 1})
+
+
+class ImageTilingTests(SimpleTestCase):
+    def test_iter_tiles_overlap_and_boundaries(self):
+        self.assertEqual(list(iter_tiles(5000, 2000, 200)), [
+            (0, 2000, False), (1800, 3800, False), (3600, 5000, True)
+        ])
+        self.assertEqual(list(iter_tiles(2000, 2000, 200)), [(0, 2000, True)])
+        self.assertEqual(list(iter_tiles(150, 2000, 200)), [(0, 150, True)])
+        # 重疊不小於條帶高度時仍每次至少前進一列
+        self.assertEqual(list(iter_tiles(3, 1, 5)), [(0, 1, False), (1, 2, False), (2, 3, True)])
+
+    def test_stitch_removes_duplicates_in_overlap(self):
+        tile_lines = [
+            [(10, '標題'), (1950, '接縫處的一行')],
+            [(1960, '接縫處的一行'), (2100, '下一行')],
+        ]
+        self.assertEqual(_stitch(tile_lines, 200), ['標題', '接縫處的一行', '下一行'])
+
+    def test_stitch_keeps_repeated_text_outside_overlap(self):
+        self.assertEqual(_stitch([[(10, '確定')], [(3000, '確定')]], 200), ['確定', '確定'])
+
+    def test_png_rows_match_full_decode(self):
+        import numpy as np
+        from PIL import Image
+
+        gradient = (np.add.outer(np.arange(523), np.arange(97)) % 256).astype('uint8')
+        images = {
+            'L': Image.fromarray(gradient),
+            'RGB': Image.fromarray(np.stack([gradient, gradient[::-1], (gradient * 3).astype('uint8')], -1)),
+            'RGBA': Image.fromarray(np.stack([gradient, gradient[::-1], gradient, gradient // 2], -1)),
+        }
+        images['P'] = images['RGB'].quantize(32)
+        with tempfile.TemporaryDirectory() as directory:
+            for mode, image in images.items():
+                path = os.path.join(directory, f'{mode}.png')
+                image.save(path)
+                with Image.open(path) as original:
+                    expected = np.asarray(original.convert('L'))
+
+                strips = ImageStrips(path)
+                try:
+                    self.assertIsNotNone(strips.rows)
+                    # 條帶彼此重疊，重疊的列由上一個條帶保留的結果提供
+                    for top, bottom, _ in iter_tiles(strips.height, 200, 30):
+                        np.testing.assert_array_equal(np.asarray(strips.load(top, bottom)), expected[top:bottom])
+                finally:
+                    strips.close()
+
+    def test_ocr_image_reads_strips_in_order_with_workers(self):
+        from contextlib import contextmanager
+
+        import numpy as np
+        from PIL import Image
+
+        class Reader:
+            def readtext(self, tile):
+                # 以條帶第 150 列的灰階值標示是哪一個條帶
+                return [([[0, 140], [1, 140], [1, 160], [0, 160]], str(int(tile[150, 0])), 1.0)]
+
+        class Pool:
+            @contextmanager
+            def acquire(self):
+                yield Reader()
+
+        rows = np.repeat(np.arange(1000) // 10, 50).reshape(1000, 50).astype('uint8')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'long.png')
+            Image.fromarray(rows).save(path)
+            with self.settings(OCR_TILE_HEIGHT=300, OCR_TILE_OVERLAP=40, OCR_TILE_WORKERS=2), \
+                    mock.patch('backend.utils.image_tiling.get_reader_pool', return_value=Pool()):
+                lines = ocr_image(path)
+        # 條帶起點為 0、260、520、780，第 150 列對應原圖第 150、410、670、930 列
+        self.assertEqual(lines, ['15', '41', '67', '93'])
+
+
+class CourseTaskRollupTests(TestCase):
+    def setUp(self):
+        self.student_class = StudentClass.objects.create(name='class')
+        self.course = Course.objects.create(name='course', student_class=self.student_class)
+        self.course_task = CourseTask.objects.create(name='task', student_class=self.student_class, course=self.course)
+        self.students = [
+            Student.objects.create_user(f's{index}', f'student {index}', 'pw', student_class=self.student_class)
+            for index in range(3)
+        ]
+
+    def _analysis(self, tool_count, prompt, keyword):
+        return {
+            'assistive_tool_analysis': {'quick_question': tool_count, 'summarize': 1},
+            'prompt_analysis': {'prompts': [{'keyword': prompt, 'times': 2}]},
+            'keyword_analysis': {'top_keywords': {keyword: 3, '介面': 1}},
+        }
+
+    def assertRollupMatchesRefresh(self):
+        from .utils.rollup_utils import compute_course_task_rollup, get_course_task_rollup, rollups_match
+
+        self.course_task.refresh_from_db()
+        incremental = get_course_task_rollup(self.course_task)
+        computed = compute_course_task_rollup(self.course_task.id)
+        self.assertTrue(rollups_match(incremental, computed), f'{incremental} != {computed}')
+        return incremental
+
+    def test_incremental_rollup_matches_refresh(self):
+        tasks = [
+            StudentCourseTask.objects.create(
+                student=student, course=self.course, course_task=self.course_task,
+                **self._analysis(index + 1, f'提示{index}', f'詞{index}')
+            )
+            for index, student in enumerate(self.students)
+        ]
+        rollup = self.assertRollupMatchesRefresh()
+        self.assertEqual(rollup['all_assistive_tool_analysis'], {'quick_question': 6, 'summarize': 3})
+
+        tasks[0].prompt_analysis = {'prompts': [{'keyword': '提示1', 'times': 5}]}
+        tasks[0].keyword_analysis = {'top_keywords': {}}
+        tasks[0].save()
+        tasks[1].assistive_tool_analysis = {'quick_question': 0, 'summarize': 0}
+        tasks[1].save(update_fields=['assistive_tool_analysis'])
+        rollup = self.assertRollupMatchesRefresh()
+        self.assertEqual(rollup['all_prompt_analysis'], {'提示1': 7, '提示2': 2})
+
+        tasks[2].delete()
+        rollup = self.assertRollupMatchesRefresh()
+        self.assertEqual(rollup['all_keyword_analysis'], {'詞1': 3, '介面': 1})
+
+    def test_course_task_save_keeps_rollup(self):
+        stale = CourseTask.objects.get(id=self.course_task.id)
+        StudentCourseTask.objects.create(
+            student=self.students[0], course=self.course, course_task=self.course_task,
+            **self._analysis(2, '提示', '詞')
+        )
+        # 記憶體中的課程任務載入於彙總更新之前，完整儲存不可覆蓋彙總
+        stale.name = 'renamed'
+        stale.save()
+
+        client = APIClient()
+        client.force_login(self.students[0])
+        response = client.patch(f'/api/course-tasks/{self.course_task.id}/', {
+            'name': 'renamed again', 'all_keyword_analysis': {'偽造': 100}, 'all_assistive_tool_analysis': {}
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['all_keyword_analysis'], {'詞': 3, '介面': 1})
+
+        rollup = self.assertRollupMatchesRefresh()
+        self.assertEqual(self.course_task.name, 'renamed again')
+        self.assertEqual(rollup['all_assistive_tool_analysis'], {'quick_question': 2, 'summarize': 1})
+
+
+class KeywordIndexMaintenanceTests(TestCase):
+    def setUp(self):
+        student_class = StudentClass.objects.create(name='class')
+        course = Course.objects.create(name='course', student_class=student_class)
+        self.course_task = CourseTask.objects.create(name='task', student_class=student_class, course=course)
+        self.tasks = [
+            StudentCourseTask.objects.create(
+                student=Student.objects.create_user(f's{index}', f'student {index}', 'pw', student_class=student_class),
+                course=course, course_task=self.course_task, ocr_content=text
+            )
+            for index, text in enumerate(['使用者介面設計 使用者介面', '介面配色 原型測試'])
+        ]
+
+    def _analyze(self, task):
+        from .utils.analysis_utils import analyze_keywords
+
+        self.assertTrue(analyze_keywords(task)['success'])
+        task.refresh_from_db()
+
+    def assertIndexMatchesKeywordCounts(self):
+        from .models import KeywordPosting
+
+        expected_postings = {}
+        expected_frequencies = {}
+        for task in StudentCourseTask.objects.filter(course_task=self.course_task):
+            for keyword, count in task.keyword_counts.items():
+                expected_postings[(task.id, keyword)] = count
+                expected_frequencies[keyword] = expected_frequencies.get(keyword, 0) + 1
+
+        postings = {
+            (task_id, keyword): count for task_id, keyword, count in KeywordPosting.objects.filter(
+                course_task=self.course_task
+            ).values_list('student_course_task_id', 'keyword', 'count')
+        }
+        self.assertEqual(postings, expected_postings)
+        self.assertEqual(get_document_frequencies(course_task_id=self.course_task.id), expected_frequencies)
+        return expected_frequencies
+
+    def test_index_follows_analysis_updates_and_deletes(self):
+        for task in self.tasks:
+            self._analyze(task)
+        frequencies = self.assertIndexMatchesKeywordCounts()
+        self.assertEqual(frequencies['介面'], 2)
+
+        # 重新分析後不再出現的詞需從索引移除
+        self.tasks[0].ocr_content = '原型測試'
+        self.tasks[0].save()
+        self._analyze(self.tasks[0])
+        frequencies = self.assertIndexMatchesKeywordCounts()
+        self.assertEqual(frequencies['介面'], 1)
+        self.assertNotIn('使用者', frequencies)
+
+        self.tasks[1].delete()
+        frequencies = self.assertIndexMatchesKeywordCounts()
+        self.assertNotIn('介面', frequencies)
+
+    def test_backfill_migration_builds_index_from_keyword_counts(self):
+        import importlib
+
+        from django.apps import apps
+
+        from .models import KeywordPosting
+
+        StudentCourseTask.objects.filter(id=self.tasks[0].id).update(keyword_counts={'介面': 2, '設計': 1})
+        StudentCourseTask.objects.filter(id=self.tasks[1].id).update(keyword_counts={'介面': 1, 'x' * 101: 1})
+        migration = importlib.import_module('backend.migrations.0023_backfill_keyword_index')
+        migration.backfill_keyword_index(apps, None)
+
+        self.assertEqual(get_document_frequencies(course_task_id=self.course_task.id), {'介面': 2, '設計': 1})
+        self.assertEqual(KeywordPosting.objects.filter(course_task=self.course_task).count(), 3)
+
+
+class AnalyzeTaskViewTests(TestCase):
+    def setUp(self):
+        student_class = StudentClass.objects.create(name='class')
+        course = Course.objects.create(name='course', student_class=student_class)
+        course_task = CourseTask.objects.create(name='task', student_class=student_class, course=course)
+        student = Student.objects.create_user('s1', 'student', 'pw', student_class=student_class)
+        self.task = StudentCourseTask.objects.create(student=student, course=course, course_task=course_task)
+        self.client = APIClient()
+        self.client.force_login(student)
+        self.url = f'/api/student-course-tasks/{self.task.id}/analyze_task/'
+
+    def test_analysis_is_dispatched_to_celery(self):
+        with mock.patch('backend.views.student_course_tasks.build_analysis_chain') as build_chain:
+            build_chain.return_value.apply_async.return_value.id = 'chain-id'
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {'celery_task_id': 'chain-id', 'status': 'STARTED'})
+        build_chain.assert_called_once_with(self.task.id)
+
+    def test_polling_reports_progress_and_failure(self):
+        with mock.patch('backend.views.student_course_tasks.AsyncResult') as async_result, \
+                mock.patch('backend.views.student_course_tasks.build_analysis_chain') as build_chain:
+            async_result.return_value.ready.return_value = False
+            async_result.return_value.state = 'PENDING'
+            response = self.client.get(self.url, {'celery_task_id': 'chain-id'})
+            self.assertEqual(response.status_code, 202)
+
+            async_result.return_value.ready.return_value = True
+            async_result.return_value.successful.return_value = True
+            async_result.return_value.result = {'status': 'FAILURE', 'stage': 'ocr', 'message': '該學生課程作業沒有上傳文件'}
+            response = self.client.get(self.url, {'celery_task_id': 'chain-id'})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['detail'], '該學生課程作業沒有上傳文件')
+        build_chain.assert_not_called()
+
+    def test_existing_results_are_returned(self):
+        StudentCourseTask.objects.filter(id=self.task.id).update(
+            keyword_analysis={'top_keywords': {'介面': 1}}, assistive_tool_analysis={'quick_question': 1},
+            prompt_analysis={'prompts': []}, is_analyzed=True
+        )
+        with mock.patch('backend.views.student_course_tasks.build_analysis_chain') as build_chain:
+            response = self.client.get(self.url, {'celery_task_id': 'chain-id'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['assistive_tool_analysis'], {'quick_question': 1})
+        build_chain.assert_not_called()
+
+
+def count_assistive_tools_with_regex(text):
+    """以逐一工具的正規表示式實作相同的比對規則，作為 Aho-Corasick 版本的對照基準"""
+    import re
+
+    from .utils.tool_counter import ASSISTIVE_TOOLS, normalize_text
+
+    normalized, word_starts = normalize_text(text or '')
+    counts = dict.fromkeys(ASSISTIVE_TOOLS, 0)
+    for tool in ASSISTIVE_TOOLS:
+        pattern = normalize_text(tool)[0]
+        # 以前瞻比對計入重疊的出現位置
+        for match in re.finditer(f'(?={re.escape(pattern)})', normalized):
+            start, end = match.start(), match.start() + len(pattern)
+            if word_starts[start] and (end == len(normalized) or word_starts[end]):
+                counts[tool] += 1
+    return counts
+
+
+class ToolCounterTests(SimpleTestCase):
+    def test_separators_case_and_ocr_confusions(self):
+        from .utils.tool_counter import count_assistive_tools
+
+        counts = count_assistive_tools(
+            '我用了 Quick Question 和 quick_question，還有 qu1ck-questi0n；'
+            'SURNRNARIZE 之後 teach me\nabout this。'
+        )
+        self.assertEqual(counts['quick_question'], 3)
+        self.assertEqual(counts['summarize'], 1)
+        self.assertEqual(counts['teach_me_about_this'], 1)
+
+    def test_partial_words_are_not_counted(self):
+        from .utils.tool_counter import count_assistive_tools
+
+        counts = count_assistive_tools('forgive me, customer, ideates, summarized')
+        self.assertEqual({tool: count for tool, count in counts.items() if count}, {})
+
+    def test_matches_regex_baseline(self):
+        import random
+
+        from .utils.tool_counter import ASSISTIVE_TOOLS, count_assistive_tools
+
+        rng = random.Random(0)
+        words = ['give', 'me', 'custom', 'this', 'turn', 'into', 'a', 'ideate', 'forgive', '介面', '設計', '0', 'rn']
+        separators = [' ', '_', '-', '.', '\n', '，', '']
+        for _ in range(300):
+            parts = []
+            for _ in range(rng.randint(0, 30)):
+                if rng.random() < 0.3:
+                    tool = rng.choice(ASSISTIVE_TOOLS)
+                    parts.append(rng.choice(separators[:5]).join(tool.split('_')))
+                else:
+                    parts.append(rng.choice(words))
+                parts.append(rng.choice(separators))
+            text = ''.join(parts)
+            self.assertEqual(count_assistive_tools(text), count_assistive_tools_with_regex(text), text)
+
+
+class KeywordTfidfTests(TestCase):
+    def _reference_scores(self, document, document_frequencies, document_total):
+        import math
+
+        scores = {
+            keyword: (1 + math.log(count)) * math.log((1 + document_total) / (1 + document_frequencies[keyword]))
+            for keyword, count in document.items()
+        }
+        norm = math.sqrt(sum(score * score for score in scores.values()))
+        return {keyword: round(score / norm, 4) for keyword, score in scores.items() if score}
+
+    def test_scores_match_reference_and_rank_distinctive_words_first(self):
+        from .utils.keyword_tfidf import score_documents
+
+        documents = [
+            {'介面': 3, '配色': 4, '設計': 1},
+            {'介面': 1, '原型': 2, '設計': 1},
+            {'設計': 5, '原型': 1},
+        ]
+        frequencies = {'介面': 2, '配色': 1, '設計': 3, '原型': 2}
+        results = score_documents(documents, frequencies, 3)
+        for document, result in zip(documents, results):
+            self.assertEqual(dict(result), self._reference_scores(document, frequencies, 3))
+            self.assertEqual([score for _, score in result], sorted((score for _, score in result), reverse=True))
+        # 出現在每份作業中的「設計」分數為 0，不列入
+        self.assertEqual([keyword for keyword, _ in results[0]], ['配色', '介面'])
+        self.assertEqual(results[2], [('原型', 1.0)])
+
+    def test_top_k_and_ties(self):
+        from .utils.keyword_tfidf import score_documents
+
+        result = score_documents([{'b': 1, 'a': 1, 'c': 1}], {'a': 1, 'b': 1, 'c': 1}, 4, top_k=2)[0]
+        self.assertEqual([keyword for keyword, _ in result], ['a', 'b'])
+        self.assertEqual(score_documents([{}], {}, 0), [[]])
+
+    def test_distinctive_keywords_by_scope(self):
+        from .utils.keyword_tfidf import get_distinctive_keywords, score_course_task
+
+        student_class = StudentClass.objects.create(name='class')
+        course = Course.objects.create(name='course', student_class=student_class)
+        course_tasks = [
+            CourseTask.objects.create(name=f'task {index}', student_class=student_class, course=course)
+            for index in range(2)
+        ]
+        tasks = []
+        for index, (course_task, keyword_counts) in enumerate([
+            (course_tasks[0], {'介面': 2, '配色': 1}),
+            (course_tasks[0], {'介面': 1, '原型': 1}),
+            (course_tasks[1], {'配色': 3, '使用者': 1}),
+        ]):
+            student = Student.objects.create_user(f's{index}', f'student {index}', 'pw', student_class=student_class)
+            task = StudentCourseTask.objects.create(
+                student=student, course=course, course_task=course_task, keyword_counts=keyword_counts
+            )
+            update_document_frequency(course_task.id, {}, keyword_counts)
+            tasks.append(task)
+
+        # 課程任務內「介面」出現在每份作業中；放大到整個課程後「配色」也出現在另一個課程任務而分數降低
+        self.assertEqual([keyword for keyword, _ in get_distinctive_keywords(tasks[0])], ['配色'])
+        self.assertEqual(
+            [keyword for keyword, _ in get_distinctive_keywords(tasks[0], 'course')], ['介面', '配色']
+        )
+        self.assertEqual(score_course_task(course_tasks[0].id)[tasks[0].id], get_distinctive_keywords(tasks[0]))
+        with self.assertRaises(ValueError):
+            get_distinctive_keywords(tasks[0], 'student')
+
+        client = APIClient()
+        client.force_login(tasks[0].student)
+        url = f'/api/student-course-tasks/{tasks[0].id}/distinctive_keywords/'
+        self.assertEqual(client.get(url, {'top_k': 'abc'}).status_code, 400)
+        response = client.get(url, {'scope': 'course', 'top_k': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['keyword'] for item in response.json()['distinctive_keywords']], ['介面'])
+
+
+class RollupSqlAggregationTests(TestCase):
+    def setUp(self):
+        self.student_class = StudentClass.objects.create(name='class')
+        self.course = Course.objects.create(name='course', student_class=self.student_class)
+        self.course_task = CourseTask.objects.create(name='task', student_class=self.student_class, course=self.course)
+        self.student_index = 0
+
+    def _create(self, **analysis):
+        self.student_index += 1
+        student = Student.objects.create(
+            student_id=f's{self.student_index}', name=f'student {self.student_index}',
+            student_class=self.student_class, password='!'
+        )
+        # bulk_create 不經過 save()，避免增量更新影響比較
+        StudentCourseTask.objects.bulk_create([
+            StudentCourseTask(student=student, course=self.course, course_task=self.course_task, **analysis)
+        ])
+
+    def assertSqlMatchesPython(self):
+        from .utils.rollup_sql import aggregate_course_task_rollup, supports_sql_rollup
+        from .utils.rollup_utils import compute_course_task_rollup_in_python
+
+        self.assertTrue(supports_sql_rollup())
+        sql = aggregate_course_task_rollup(self.course_task.id)
+        python = compute_course_task_rollup_in_python(self.course_task.id)
+        self.assertEqual(sql, python)
+        return sql
+
+    def test_random_submissions(self):
+        import random
+
+        from .management.commands.benchmark_rollup_aggregation import generate_analysis
+
+        rng = random.Random(0)
+        vocabulary = [f'詞彙{index}' for index in range(80)]
+        prompts = [f'提示{index}' for index in range(20)]
+        for _ in range(30):
+            self._create(**generate_analysis(rng, vocabulary, prompts))
+        rollup = self.assertSqlMatchesPython()
+        self.assertEqual(rollup['student_tasks_count'], 30)
+        self.assertEqual(set(rollup['all_assistive_tool_analysis']), set(ASSISTIVE_TOOLS))
+
+    def test_unexpected_json_is_skipped_the_same_way(self):
+        self._create(
+            assistive_tool_analysis={'quick_question': 2, 'summarize': True, 'custom': '3', 'give_me': 1.5},
+            prompt_analysis={'prompts': [
+                {'keyword': '配色', 'times': 2}, {'keyword': '配色'}, {'keyword': None, 'times': 1},
+                {'times': 4}, '字體', {'keyword': '字體', 'times': '2'}, {'keyword': 3, 'times': 1},
+            ]},
+            keyword_analysis={'top_keywords': {'介面': 3, '設計': None, '原型': False}, 'total_words': 3},
+        )
+        self._create(assistive_tool_analysis=['quick_question'], prompt_analysis={'prompts': 'none'},
+                     keyword_analysis={'top_keywords': ['介面']})
+        self._create(assistive_tool_analysis=None, prompt_analysis=None, keyword_analysis=None)
+        self._create()
+        rollup = self.assertSqlMatchesPython()
+        self.assertEqual(rollup['student_tasks_count'], 4)
+        self.assertEqual(rollup['all_assistive_tool_analysis'], {'quick_question': 2, 'give_me': 1.5})
+        self.assertEqual(rollup['all_keyword_analysis'], {'介面': 3})
+
+
+class TranscriptChunkTests(SimpleTestCase):
+    def assertChunksCoverText(self, chunks, text, max_tokens):
+        from .utils.transcript_chunks import estimate_text_tokens
+
+        for chunk in chunks:
+            self.assertLessEqual(estimate_text_tokens(chunk), max_tokens, chunk)
+        # 只會在空白處切開或硬切長行，不遺漏、不重複任何內容
+        self.assertEqual(''.join(''.join(chunks).split()), ''.join(text.split()))
+
+    def test_short_text_is_one_chunk(self):
+        from .utils.transcript_chunks import estimate_text_tokens, split_transcript
+
+        self.assertEqual(estimate_text_tokens('介面設計 ui'), 5)
+        self.assertEqual(split_transcript('使用者：請幫我配色', 100), ['使用者：請幫我配色'])
+
+    def test_splits_at_paragraphs_first(self):
+        from .utils.transcript_chunks import split_transcript
+
+        paragraphs = [f'使用者：第{index}個問題\nAI：回答內容{index}' for index in range(6)]
+        text = '\n\n'.join(paragraphs)
+        chunks = split_transcript(text, 40)
+        self.assertChunksCoverText(chunks, text, 40)
+        self.assertGreater(len(chunks), 1)
+        # 每段都由完整的對話段落組成
+        for chunk in chunks:
+            self.assertTrue(chunk.startswith('使用者：'), chunk)
+            self.assertTrue(chunk.rstrip().endswith(tuple(f'回答內容{index}' for index in range(6))), chunk)
+
+    def test_long_paragraphs_and_lines_are_split(self):
+        from .utils.transcript_chunks import split_transcript
+
+        long_paragraph = '\n'.join(f'第{index}行的內容' for index in range(20))
+        long_line = '很長的一行' * 30 + ' english words ' * 20
+        text = f'開頭\n\n{long_paragraph}\n\n{long_line}\n\n結尾'
+        chunks = split_transcript(text, 25)
+        self.assertChunksCoverText(chunks, text, 25)
+
+    def test_merge_sums_counts_and_dedups_topics(self):
+        from .utils.transcript_chunks import merge_analysis_results
+
+        merged = merge_analysis_results([
+            {
+                'assistive_tool_analysis': {'quick_question': 1, 'summarize': 0},
+                'prompt_analysis': {
+                    'discussion_topics': {'topic': '配色', 'description': '討論配色'},
+                    'prompts': [{'keyword': '配色', 'times': 2}, {'keyword': '字體', 'times': 1}],
+                },
+            },
+            {
+                'assistive_tool_analysis': {'quick_question': 2, 'summarize': 1},
+                'prompt_analysis': {
+                    'discussion_topics': {'topic': '配色', 'description': '重複的主題'},
+                    'prompts': [{'keyword': '字體', 'times': 1}, {'keyword': '留白', 'times': 2}, {'keyword': ''}],
+                },
+            },
+            {
+                'assistive_tool_analysis': {'quick_question': 'x'},
+                'prompt_analysis': {'discussion_topics': {'topic': '排版', 'description': '討論排版'}, 'prompts': []},
+            },
+        ])
+        self.assertEqual(merged['assistive_tool_analysis'], {'quick_question': 3, 'summarize': 1})
+        self.assertEqual(merged['prompt_analysis']['discussion_topics'], {'topic': '配色、排版', 'description': '討論配色\n討論排版'})
+        self.assertEqual(merged['prompt_analysis']['prompts'], [
+            {'keyword': '字體', 'times': 2}, {'keyword': '留白', 'times': 2}, {'keyword': '配色', 'times': 2}
+        ])
+
+
+def make_analysis(tool_count=1, prompt='配色'):
+    return {
+        'assistive_tool_analysis': {tool: tool_count if tool == 'quick_question' else 0 for tool in ASSISTIVE_TOOLS},
+        'prompt_analysis': {
+            'discussion_topics': {'topic': '介面', 'description': '說明'},
+            'prompts': [{'keyword': prompt, 'times': 1}],
+        },
+    }
+
+
+class PackedAnalysisTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        student_class = StudentClass.objects.create(name='class')
+        course = Course.objects.create(name='course', student_class=student_class)
+        course_task = CourseTask.objects.create(name='task', student_class=student_class, course=course)
+        self.tasks = [
+            StudentCourseTask.objects.create(
+                student=Student.objects.create(student_id=f's{index}', name=f'student {index}',
+                                               student_class=student_class, password='!'),
+                course=course, course_task=course_task, ocr_content=f'第{index}份作業 quick question'
+            )
+            for index in range(5)
+        ]
+
+    def test_pack_tasks_respects_limits(self):
+        from types import SimpleNamespace
+
+        from .utils.packed_analysis import pack_tasks
+
+        tasks = [SimpleNamespace(ocr_content='x' * size) for size in (4, 4, 4, 9, 1, 1, 1)]
+        packs = pack_tasks(tasks, max_chars=10, max_items=2)
+        self.assertEqual([[len(task.ocr_content) for task in pack] for pack in packs], [[4, 4], [4], [9, 1], [1, 1]])
+
+    def test_parse_packed_response(self):
+        from .utils.packed_analysis import parse_packed_response
+
+        content = json.dumps({'results': [
+            {'id': 1, **make_analysis()}, {'id': '2', **make_analysis(2)}, {'prompt_analysis': {}}, {'id': 3},
+        ]}, ensure_ascii=False)
+        results = parse_packed_response(content)
+        self.assertEqual(set(results), {'1', '2'})
+        self.assertEqual(results['2']['assistive_tool_analysis']['quick_question'], 2)
+
+        # 截斷的回覆保留完整的項目，最後一項即使剛好可以解析也不採用
+        truncated = content[:content.index('"id": "2"') + 40]
+        self.assertEqual(set(parse_packed_response(truncated)), {'1'})
+        self.assertEqual(parse_packed_response('不是 JSON'), {})
+
+    def test_split_and_reassemble_with_single_fallback(self):
+        from .utils.packed_analysis import analyze_assist_tools_and_prompt_packed
+
+        requests = []
+
+        class PackedEngine:
+            def complete_many(self, batch):
+                replies = []
+                for request in batch:
+                    requests.append(request)
+                    content = request['messages'][-1]['content']
+                    ids = [int(match) for match in re.findall(r'<submission id="(\d+)">', content)]
+                    if ids:
+                        # 合併回覆中缺少最後一份作業，需改以單份請求補齊
+                        replies.append(json.dumps({'results': [
+                            {'id': task_id, **make_analysis(task_id, f'提示{task_id}')} for task_id in ids[:-1]
+                        ]}, ensure_ascii=False))
+                    else:
+                        replies.append(json.dumps(make_analysis(99, '單份'), ensure_ascii=False))
+                return replies
+
+        with self.settings(LLM_PACK_MAX_ITEMS=3, ASSIST_TOOLS_COUNTER='llm', LLM_STRUCTURED_OUTPUT=False), \
+                mock.patch('backend.utils.packed_analysis.get_llm_engine', return_value=PackedEngine()):
+            results = analyze_assist_tools_and_prompt_packed(self.tasks)
+
+        self.assertTrue(all(result['success'] for result in results.values()))
+        self.assertEqual(set(results), {task.id for task in self.tasks})
+        packed_requests = [request for request in requests if '<submission' in request['messages'][-1]['content']]
+        self.assertEqual(len(packed_requests), 2)
+        for task in self.tasks:
+            task.refresh_from_db()
+        # 每份作業取回自己的結果，被省略的作業（每組最後一份）改以單份請求分析
+        singles = {self.tasks[2].id, self.tasks[4].id}
+        for task in self.tasks:
+            if task.id in singles:
+                self.assertNotIn('packed', results[task.id])
+                self.assertEqual(task.prompt_analysis['prompts'], [{'keyword': '單份', 'times': 1}])
+            else:
+                self.assertEqual(results[task.id]['packed'], 3 if task.id < self.tasks[3].id else 2)
+                self.assertEqual(task.assistive_tool_analysis['quick_question'], task.id)
+                self.assertEqual(task.prompt_analysis['prompts'], [{'keyword': f'提示{task.id}', 'times': 1}])
+
+
+class OfflineBatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        student_class = StudentClass.objects.create(name='class')
+        course = Course.objects.create(name='course', student_class=student_class)
+        self.course_task = CourseTask.objects.create(name='task', student_class=student_class, course=course)
+        texts = ['短的作業', '\n\n'.join(f'第{index}段對話內容' for index in range(12)), '另一份作業']
+        self.tasks = [
+            StudentCourseTask.objects.create(
+                student=Student.objects.create(student_id=f's{index}', name=f'student {index}',
+                                               student_class=student_class, password='!'),
+                course=course, course_task=self.course_task, ocr_content=text
+            )
+            for index, text in enumerate(texts)
+        ]
+
+    def _output_line(self, custom_id, content=None, error=None):
+        line = {'id': 'req', 'custom_id': custom_id, 'response': None, 'error': error}
+        if content is not None:
+            line['response'] = {
+                'status_code': 200,
+                'body': {'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}}]},
+            }
+        return json.dumps(line, ensure_ascii=False)
+
+    def test_parse_batch_output(self):
+        from .utils.offline_batch import parse_batch_output
+
+        analysis = json.dumps(make_analysis(), ensure_ascii=False)
+        # 回覆在第二個提示詞中間被截斷，修復後仍是有效的部分結果
+        truncated = make_analysis()
+        truncated['prompt_analysis'] = {
+            'prompts': [{'keyword': '配色', 'times': 1}, {'keyword': '字體', 'times': 2}],
+            'discussion_topics': {'topic': '介面', 'description': '說明'},
+        }
+        truncated = json.dumps(truncated, ensure_ascii=False)
+        truncated = truncated[:truncated.index('字體') + 1]
+        output = '\n'.join([
+            self._output_line('task-1', analysis),
+            self._output_line('task-2-0-2', json.dumps(make_analysis(2, '字體'), ensure_ascii=False)),
+            self._output_line('task-2-1-2', truncated),
+            self._output_line('task-3-0-2', analysis),
+            self._output_line('task-4', error={'message': 'rate limited'}),
+            self._output_line('task-5', '完全不是 JSON'),
+        ])
+        results, errors, partial = parse_batch_output(output)
+        self.assertEqual(set(results), {1, 2})
+        self.assertEqual(results[2]['assistive_tool_analysis']['quick_question'], 3)
+        self.assertEqual(partial, {2})
+        self.assertEqual(set(errors), {3, 4, 5})
+        self.assertIn('1/2', errors[3])
+        self.assertIn('rate limited', errors[4])
+
+    def test_local_batch_roundtrip_applies_results(self):
+        from .utils.offline_batch import (
+            LocalBatchBackend, apply_batch_results, parse_batch_output, split_cached, write_batch_file
+        )
+        from .utils.rollup_utils import compute_course_task_rollup, get_course_task_rollup, rollups_match
+
+        with tempfile.TemporaryDirectory() as directory, \
+                self.settings(LLM_BATCH_DIR=directory, LLM_CHUNK_MAX_TOKENS=30, ASSIST_TOOLS_COUNTER='llm'), \
+                mock.patch('backend.utils.offline_batch.get_llm_engine',
+                           return_value=FakeLLMEngine(json.dumps(make_analysis(), ensure_ascii=False))):
+            path = write_batch_file('batch', self.tasks, 'gpt-4o')
+            with open(path, encoding='utf-8') as f:
+                custom_ids = [json.loads(line)['custom_id'] for line in f]
+            # 過長的作業切成多個請求
+            self.assertGreater(len(custom_ids), len(self.tasks))
+            self.assertIn(f'task-{self.tasks[0].id}', custom_ids)
+
+            backend = LocalBatchBackend()
+            status, output = backend.retrieve(backend.submit('batch', path))
+            self.assertEqual(status, 'completed')
+            results, errors, partial = parse_batch_output(output)
+            self.assertEqual(errors, {})
+            applied = apply_batch_results(results, 'gpt-4o', partial={self.tasks[2].id})
+
+        self.assertEqual(sorted(applied), sorted(task.id for task in self.tasks))
+        for task in self.tasks:
+            task.refresh_from_db()
+            self.assertTrue(task.is_analyzed)
+        # 切段的作業合併各段結果
+        chunk_count = sum(custom_id.startswith(f'task-{self.tasks[1].id}-') for custom_id in custom_ids)
+        self.assertEqual(self.tasks[1].assistive_tool_analysis['quick_question'], chunk_count)
+
+        self.course_task.refresh_from_db()
+        self.assertTrue(rollups_match(
+            get_course_task_rollup(self.course_task), compute_course_task_rollup(self.course_task.id)
+        ))
+        # 部分結果不寫入快取，下次仍需送出
+        cached, to_submit = split_cached(self.tasks, 'gpt-4o')
+        self.assertEqual(set(cached), {self.tasks[0].id, self.tasks[1].id})
+        self.assertEqual(to_submit, [self.tasks[2]])
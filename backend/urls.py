@@ -2,6 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
 from backend.views.core import *
+from backend.views.analysis_events import analysis_batch_events
 from backend.views.sync_courses import sync_student_courses
 
 from backend.views.students import StudentViewSet
@@ -10,6 +11,7 @@ from backend.views.courses import CourseViewSet
 from backend.views.course_tasks import CourseTaskViewSet
 from backend.views.student_courses import StudentCourseViewSet
 from backend.views.student_course_tasks import StudentCourseTaskViewSet
+from backend.views.keyword_normalizations import KeywordNormalizationViewSet
 
 API_CORE = [
     path('get_csrf_token', get_csrf_token, name='get_csrf_token'),
@@ -18,6 +20,10 @@ API_CORE = [
     path('user_info', userinfo_view, name='user_info'),
 ]
 
+API_STREAM = [
+    path('student-course-tasks/analysis_events/<str:batch_id>/', analysis_batch_events, name='analysis_batch_events'),
+]
+
 API_ADMIN = [
     path('sync-student-courses', sync_student_courses, name='sync_student_courses'),
 ]
@@ -29,9 +35,11 @@ router.register(r'courses', CourseViewSet)
 router.register(r'course-tasks', CourseTaskViewSet)
 router.register(r'student-courses', StudentCourseViewSet)
 router.register(r'student-course-tasks', StudentCourseTaskViewSet)
+router.register(r'keyword-normalizations', KeywordNormalizationViewSet)
 
 urlpatterns = [
     *API_CORE,
     *API_ADMIN,
+    *API_STREAM,
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,19 +1,38 @@
-import torch
-import re
-import easyocr
-import jieba
-from stopwordsiso import stopwords
+# 本模組會被 web 行程引用（views / tasks），torch、easyocr、jieba、openai 等重量級套件
+# 一律在函式內延遲載入，只有實際執行分析的 Celery worker 才會付出載入成本
 import json
 import os
-import openai
-from collections import Counter
-from PIL import Image
 
-Image.MAX_IMAGE_PIXELS = None  # 移除圖像大小限制
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models.student_course_tasks import StudentCourseTask
+
+from .ocr_cache import file_sha256, get_cached_text, store_text
+from .image_tiling import ocr_image
+from .keyword_analyzer import analyze_texts, get_keyword_analyzer
+from .keyword_index import (
+    apply_document_frequency_deltas, collect_document_frequency_deltas, replace_postings, update_document_frequency
+)
+from .keyword_normalization import get_dictionary_words, get_normalization_map
+from .llm_cache import build_cache_key, get_cached_response, get_prompt_version, store_response
+from .llm_client import LLMError, get_llm_engine
+from .llm_json import (
+    LLMOutputError, build_analysis_schema, build_response_format, normalize_analysis_result, parse_llm_json
+)
+from .ocr_reader import OCR_LANGUAGES
+from .pdf_ocr import is_pdf, ocr_pdf
+from .rollup_utils import apply_rollup_changes
+from .tool_counter import count_assistive_tools
+from .transcript_chunks import merge_analysis_results, split_transcript
 
 
 def extract_text(task, is_from_celery=False):
     """使用 OCR 從作業文件中提取文本"""
+    import torch
+
     try:
         if torch.backends.mps.is_available():
             print("MPS 設備可用，已設置為默認設備")
@@ -33,24 +52,32 @@ def extract_text(task, is_from_celery=False):
                 'message': f'文件不存在: {task.task_file.path}'
             }
 
-        languages = ['ch_tra', 'en']
-        try:
-            reader = easyocr.Reader(languages, gpu=False)
-        except Exception as e:
+        # 相同檔案（重複上傳、清除 OCR 內容後重新分析）直接使用快取結果
+        content_hash = file_sha256(task.task_file)
+        cached_text = get_cached_text(content_hash, OCR_LANGUAGES)
+        if cached_text is not None:
+            task.ocr_content = cached_text
+            task.save()
             return {
-                'success': False,
-                'message': f'無法創建 OCR reader: {str(e)}'
+                'success': True,
+                'data': cached_text,
+                'cached': True
             }
 
         try:
-            results = reader.readtext(task.task_file.path)
-            extracted_text = '\n'.join([text for _, text, _ in results])
+            if is_pdf(task.task_file.path):
+                extracted_text = ocr_pdf(task.task_file.path)
+            else:
+                extracted_text = '\n'.join(ocr_image(task.task_file.path))
         except Exception as e:
             return {
                 'success': False,
-                'message': f'OCR 處理失敗: {str(e)}'
+                'message': f'OCR 處理失敗: {str(e)}',
+                'retryable': True
             }
 
+        store_text(content_hash, OCR_LANGUAGES, extracted_text)
+
         task.ocr_content = extracted_text
         task.save()
 
@@ -62,13 +89,9 @@ def extract_text(task, is_from_celery=False):
     except Exception as e:
         return {
             'success': False,
-            'message': f'OCR 處理失敗: {str(e)}'
+            'message': f'OCR 處理失敗: {str(e)}',
+            'retryable': True
         }
-    finally:
-        if 'reader' in locals():
-            del reader
-        if torch.backends.mps.is_available():
-            torch.mps.empty_cache()
 
 
 def analyze_keywords(task):
@@ -80,44 +103,9 @@ def analyze_keywords(task):
                 'message': '該學生課程作業沒有OCR文本內容'
             }
 
-        text = task.ocr_content.lower()
-
-        words = jieba.cut(text)
-        stop_words = set(stopwords(['zh', 'en']))
-
-        filtered_words = []
-        for word in words:
-            word = word.lower().strip()
-            # 排除：空字串、停用詞、單字符、純數字、純符號
-            if (word and
-                    word not in stop_words and
-                    len(word) > 1 and
-                    not re.match(r'^\d+$', word) and
-                    re.search(r'[a-zA-Z\u4e00-\u9fff]', word)):
-                filtered_words.append(word)
-
-        word_counts = Counter(filtered_words)
-
-        # 手動合併特定的相似詞
-        similar_words = {
-            'api': ['apis', 'ap', 'api'],
-        }
-
-        for main_word, variants in similar_words.items():
-            total_count = sum(word_counts[variant] for variant in variants if variant in word_counts)
-            if total_count > 0:
-                for variant in variants:
-                    if variant != main_word and variant in word_counts:
-                        del word_counts[variant]
-                word_counts[main_word] = total_count
-
-        top_words = word_counts.most_common(50)
-
-        result = {
-            'top_keywords': dict(top_words),
-            'total_words': len(filtered_words),
-            'unique_words': len(word_counts)
-        }
+        result, keyword_counts = get_keyword_analyzer().analyze_counts(
+            task.ocr_content, get_normalization_map(task.course_id), get_dictionary_words(task.course_id)
+        )
 
         # 確保結果可以被 JSON 序列化
         try:
@@ -128,8 +116,16 @@ def analyze_keywords(task):
                 'message': f'分析結果無法序列化為 JSON: {str(e)}'
             }
 
-        task.keyword_analysis = result
-        task.save()
+        with transaction.atomic():
+            # 以資料庫中的舊詞頻計算增量，並發重新分析同一份作業時文件頻率仍保持一致
+            old_counts = StudentCourseTask.objects.select_for_update().filter(
+                id=task.id
+            ).values_list('keyword_counts', flat=True).first()
+            task.keyword_analysis = result
+            task.keyword_counts = keyword_counts
+            task.save()
+            update_document_frequency(task.course_task_id, old_counts, keyword_counts)
+            replace_postings([task])
         return {
             'success': True,
             'data': result
@@ -142,45 +138,126 @@ def analyze_keywords(task):
         }
 
 
-def analyze_assist_tools_and_prompt(task):
-    """分析輔助工具與提示詞"""
+def _bulk_analyze_keywords(queryset, processes=None):
+    """單次查詢載入文本、依課程套用正規化對照表平行斷詞，再以 bulk_update 寫回"""
+    if processes is None:
+        processes = getattr(settings, 'KEYWORD_BULK_PROCESSES', 0) or os.cpu_count() or 1
+
+    tasks = list(
+        queryset.exclude(ocr_content='').exclude(ocr_content__isnull=True).only(
+            'id', 'course_id', 'course_task_id', 'ocr_content'
+        ).order_by('id')
+    )
+    tasks_by_course = {}
+    for task in tasks:
+        tasks_by_course.setdefault(task.course_id, []).append(task)
+
+    now = timezone.now()
+    for course_id, course_tasks in tasks_by_course.items():
+        results = analyze_texts(
+            [task.ocr_content for task in course_tasks], processes, get_normalization_map(course_id),
+            get_dictionary_words(course_id)
+        )
+        for task, (result, keyword_counts) in zip(course_tasks, results):
+            task.keyword_analysis = result
+            task.keyword_counts = keyword_counts
+            # bulk_update 不會觸發 auto_now，需手動更新
+            task.updated_at = now
+
+    with transaction.atomic():
+        # 斷詞需要數秒，期間其他任務可能已寫入同一份作業；鎖定後以資料庫中的舊值計算增量，避免重複套用
+        old_values = {
+            values['id']: values
+            for values in StudentCourseTask.objects.select_for_update().filter(
+                id__in=[task.id for task in tasks]
+            ).order_by('id').values('id', 'keyword_counts', 'keyword_analysis')
+        }
+        # 斷詞期間已刪除的作業不寫回
+        tasks = [task for task in tasks if task.id in old_values]
+        changes = []
+        rollup_changes = []
+        for task in tasks:
+            old = old_values[task.id]
+            changes.append((task.course_task_id, old['keyword_counts'], task.keyword_counts))
+            rollup_changes.append((
+                task.course_task_id, {'keyword_analysis': old['keyword_analysis']},
+                {'keyword_analysis': task.keyword_analysis}
+            ))
+
+        StudentCourseTask.objects.bulk_update(
+            tasks, ['keyword_analysis', 'keyword_counts', 'updated_at'],
+            batch_size=getattr(settings, 'KEYWORD_BULK_BATCH_SIZE', 500)
+        )
+        # 只依詞彙有變動的部分更新文件頻率索引
+        for course_task_id, deltas in collect_document_frequency_deltas(changes).items():
+            apply_document_frequency_deltas(course_task_id, deltas)
+        replace_postings(tasks)
+        # bulk_update 不經過 save()，需自行以增量更新課程任務的彙總
+        apply_rollup_changes(rollup_changes)
+    return tasks
+
+
+def bulk_analyze_keywords(course_task_id, processes=None):
+    """
+    一次分析課程任務下所有已有 OCR 文本的作業關鍵詞：單次查詢載入文本、
+    平行斷詞後以 bulk_update 寫回，不需為每份作業各跑一個 Celery 任務
+    """
     try:
-        if not task.task_file:
+        tasks = _bulk_analyze_keywords(
+            StudentCourseTask.objects.filter(course_task_id=course_task_id), processes
+        )
+        if not tasks:
             return {
                 'success': False,
-                'message': '該學生課程作業沒有上傳文件'
+                'message': '該課程任務沒有任何已有OCR文本內容的作業'
             }
+        return {
+            'success': True,
+            'data': {'analyzed_count': len(tasks)}
+        }
 
-        # 檢查文件是否存在
-        if not os.path.exists(task.task_file.path):
-            return {
-                'success': False,
-                'message': f'文件不存在: {task.task_file.path}'
-            }
+    except Exception as e:
+        return {
+            'success': False,
+            'message': f'批量關鍵詞分析失敗: {str(e)}'
+        }
 
-        # 確保已有OCR內容
-        if not task.ocr_content:
-            ocr_result = extract_text(task)
-            if not ocr_result['success']:
-                return {
-                    'success': False,
-                    'message': f'無法提取文本內容: {ocr_result["message"]}'
-                }
-            task.refresh_from_db()  # 確保獲取最新的OCR內容
 
-        # 檢查 OpenAI API 密鑰
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            return {
-                'success': False,
-                'message': 'OpenAI API 密鑰未設置'
+def reanalyze_keywords_containing(words, course_id=None, processes=None):
+    """
+    正規化對照表變動後只重新分析文本中出現相關詞的作業（不需重新 OCR），
+    回傳受影響的課程任務
+    """
+    words = [word for word in words if word]
+    if not words:
+        return {'success': True, 'data': {'analyzed_count': 0, 'course_task_ids': []}}
+
+    try:
+        condition = Q()
+        for word in words:
+            condition |= Q(ocr_content__icontains=word)
+        queryset = StudentCourseTask.objects.filter(condition)
+        if course_id is not None:
+            queryset = queryset.filter(course_id=course_id)
+
+        tasks = _bulk_analyze_keywords(queryset, processes)
+        return {
+            'success': True,
+            'data': {
+                'analyzed_count': len(tasks),
+                'course_task_ids': sorted({task.course_task_id for task in tasks}),
             }
+        }
+
+    except Exception as e:
+        return {
+            'success': False,
+            'message': f'重新分析關鍵詞失敗: {str(e)}'
+        }
 
-        # 設置 OpenAI API 密鑰
-        openai.api_key = api_key
 
-        # 準備 GPT-4o 的提示詞
-        system_prompt = """
+# GPT-4o 的系統提示詞
+ASSIST_TOOLS_SYSTEM_PROMPT = """
 你是一個專門進行文本內容分析的助手，請根據使用者提供的OCR文本進行以下分析並以指定格式回覆：
 
 工具使用分析：
@@ -233,59 +310,307 @@ Prompt分析：
 }
 嚴格遵守格式，不提供額外文字或解釋，不要使用代碼塊。所有分析結果需基於使用者提供的OCR文本。
 請仔細分析文本中的每一個細節，確保不遺漏任何工具使用和文本內容。
-        """
+"""
 
-        try:
-            response = openai.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"以下是OCR提取的文本內容，請分析：\n\n{task.ocr_content}"}
-                ],
-                temperature=0.1,  # 降低溫度以獲得更確定的結果
-                max_tokens=2000
-            )
-        except Exception as e:
-            return {
+# 輔助工具次數改由本機統計時使用的提示詞，GPT 只負責提示詞與討論主題分析
+PROMPT_ONLY_SYSTEM_PROMPT = """
+你是一個專門進行文本內容分析的助手，請根據使用者提供的OCR文本進行以下分析並以指定格式回覆：
+
+Prompt分析：
+分析文本中的輸入內容，並幫我做關鍵字統整以及其出現次數。
+
+討論主題分析：
+根據文本內容，分析使用過程中的討論主題並提供簡單描述。
+
+回覆格式要求：
+僅回覆純 JSON 格式，不要包含任何代碼塊標記（如 ```json），格式如下：
+{
+  "prompt_analysis": {
+    "discussion_topics": {
+      "topic": "討論主題",
+      "description": "描述"
+    },
+    "prompts": [
+      {"keyword": "關鍵詞1", "times": 次數},
+      {"keyword": "關鍵詞2", "times": 次數},
+      ...
+    ]
+  }
+}
+嚴格遵守格式，不提供額外文字或解釋，不要使用代碼塊。所有分析結果需基於使用者提供的OCR文本。
+請仔細分析文本中的每一個細節，確保不遺漏任何文本內容。
+"""
+
+# 提示詞內容改變時版本隨之改變，舊的 LLM 回應快取不再命中
+ASSIST_TOOLS_PROMPT_VERSION = get_prompt_version(ASSIST_TOOLS_SYSTEM_PROMPT)
+PROMPT_ONLY_PROMPT_VERSION = get_prompt_version(PROMPT_ONLY_SYSTEM_PROMPT)
+ASSIST_TOOLS_TEMPERATURE = 0.1  # 降低溫度以獲得更確定的結果
+
+
+def use_local_tool_counter():
+    """輔助工具次數是否由本機比對統計（ASSIST_TOOLS_COUNTER=local）"""
+    return getattr(settings, 'ASSIST_TOOLS_COUNTER', 'llm') == 'local'
+
+
+def get_system_prompt():
+    return PROMPT_ONLY_SYSTEM_PROMPT if use_local_tool_counter() else ASSIST_TOOLS_SYSTEM_PROMPT
+
+
+def get_analysis_prompt_version():
+    return PROMPT_ONLY_PROMPT_VERSION if use_local_tool_counter() else ASSIST_TOOLS_PROMPT_VERSION
+
+
+def with_local_tool_counts(analysis_result, ocr_content):
+    """本機統計模式下以比對結果作為輔助工具次數，不採用 GPT 的計數"""
+    if not use_local_tool_counter():
+        return analysis_result
+    return {**analysis_result, 'assistive_tool_analysis': count_assistive_tools(ocr_content)}
+
+
+def build_analysis_messages(ocr_content):
+    """組合單份作業送給 LLM 的訊息"""
+    return [
+        {"role": "system", "content": get_system_prompt()},
+        {"role": "user", "content": f"以下是OCR提取的文本內容，請分析：\n\n{ocr_content}"}
+    ]
+
+
+def get_response_format():
+    """以 JSON schema 限制 GPT 的回覆格式（LLM_STRUCTURED_OUTPUT 關閉時回傳 None）"""
+    if not getattr(settings, 'LLM_STRUCTURED_OUTPUT', True):
+        return None
+    return build_response_format(
+        'assist_tools_analysis', build_analysis_schema(include_tools=not use_local_tool_counter())
+    )
+
+
+def build_request(messages, model, max_tokens=2000, response_format=None):
+    """組合送給 LLM 引擎的請求參數"""
+    request = {
+        'messages': messages,
+        'model': model,
+        'temperature': ASSIST_TOOLS_TEMPERATURE,
+        'max_tokens': max_tokens,
+    }
+    if response_format:
+        request['response_format'] = response_format
+    return request
+
+
+def parse_analysis_response(content):
+    """
+    解析並檢查單份分析結果，回傳 (分析結果, 是否為截斷後修復的部分結果)，
+    失敗時拋出 json.JSONDecodeError 或 LLMOutputError
+    """
+    parsed, partial = parse_llm_json(content)
+    return normalize_analysis_result(parsed, include_tools=not use_local_tool_counter()), partial
+
+
+# 修復格式錯誤的回覆時只送出壞掉的輸出，不需重送整份 OCR 文本
+REPAIR_SYSTEM_PROMPT = """
+你是 JSON 修復工具。使用者會提供一段格式錯誤或被截斷的 JSON，請修正為合法且符合下列格式的 JSON。
+保留原有的內容，被截斷的部分直接結束即可，不要補充新的分析，不提供額外文字或解釋，不要使用代碼塊。
+"""
+
+
+def build_repair_messages(content):
+    response_format = get_system_prompt().split('回覆格式要求：', 1)[-1]
+    return [
+        {"role": "system", "content": REPAIR_SYSTEM_PROMPT + response_format},
+        {"role": "user", "content": content}
+    ]
+
+
+def get_analysis_cache_key(ocr_content, model):
+    return build_cache_key(model, get_analysis_prompt_version(), ASSIST_TOOLS_TEMPERATURE, ocr_content)
+
+
+def analyze_chunks(engine, chunks, model):
+    """
+    並行送出各段文本的分析請求並合併結果，整體延遲取決於最長的一段；
+    切段時各段結果也會寫入快取，重試時已成功的段落不需重新分析；
+    有段落的回覆被截斷或經過修復時結果標記為 partial，該段不寫入快取
+    """
+    return analyze_chunks_many(engine, [chunks], model)[0]
+
+
+def analyze_chunks_many(engine, chunk_lists, model):
+    """
+    同 analyze_chunks，但一次分析多份文本（chunk_lists 為各份文本的段落列表），
+    所有段落的請求與修復請求各只呼叫一次 complete_many 並行送出，回傳與 chunk_lists 對應的結果列表
+    """
+    results = [[None] * len(chunks) for chunks in chunk_lists]
+    for chunks, chunk_results in zip(chunk_lists, results):
+        if len(chunks) > 1:
+            for index, chunk in enumerate(chunks):
+                chunk_results[index] = get_cached_response(get_analysis_cache_key(chunk, model))
+
+    pending = [
+        (list_index, index)
+        for list_index, chunk_results in enumerate(results)
+        for index, result in enumerate(chunk_results) if result is None
+    ]
+    response_format = get_response_format()
+    responses = engine.complete_many([
+        build_request(build_analysis_messages(chunk_lists[list_index][index]), model, response_format=response_format)
+        for list_index, index in pending
+    ])
+
+    failures = {}
+    broken = {}
+    partial = set()
+    for (list_index, index), content in zip(pending, responses):
+        if isinstance(content, LLMError):
+            failures.setdefault(list_index, {
                 'success': False,
-                'message': f'OpenAI API 調用失敗: {str(e)}'
-            }
+                'message': str(content),
+                'retryable': content.retryable
+            })
+            continue
+        if isinstance(content, Exception):
+            failures.setdefault(list_index, {
+                'success': False,
+                'message': f'輔助工具與提示詞分析失敗: {str(content)}'
+            })
+            continue
 
-        # 解析 API 回應
+        # 解析 API 回應，無法修復的回覆留待修復請求處理
         try:
-            content = response.choices[0].message.content
-            if content.startswith("```") and "```" in content:
-                content = content.split("```")[1]
-                if content.startswith("json"):
-                    content = content[4:].strip()  # 移除 "json" 標記
+            results[list_index][index], is_partial = parse_analysis_response(content)
+        except (json.JSONDecodeError, LLMOutputError):
+            broken[(list_index, index)] = content
+            continue
+        if is_partial:
+            partial.add((list_index, index))
+
+    # 同一份文本已有段落失敗時不需修復其他段落
+    broken = {key: content for key, content in broken.items() if key[0] not in failures}
+    if broken:
+        # 只送出壞掉的輸出請 GPT 修正格式，比重送整份文本便宜
+        repaired = engine.complete_many([
+            build_request(build_repair_messages(content), model, response_format=response_format)
+            for content in broken.values()
+        ])
+        for ((list_index, index), content), repaired_content in zip(broken.items(), repaired):
+            try:
+                if isinstance(repaired_content, Exception):
+                    raise LLMOutputError(str(repaired_content))
+                results[list_index][index], _ = parse_analysis_response(repaired_content)
+                # 修復請求只會補齊格式，原本被截斷或缺漏的內容不會補回
+                partial.add((list_index, index))
+            except (json.JSONDecodeError, LLMOutputError) as e:
+                failures.setdefault(list_index, {
+                    'success': False,
+                    'message': f'GPT-4o 回應解析失敗: {str(e)}, 原始回應: {content}',
+                    'retryable': True
+                })
+
+    outcomes = []
+    for list_index, (chunks, chunk_results) in enumerate(zip(chunk_lists, results)):
+        if list_index in failures:
+            outcomes.append(failures[list_index])
+            continue
+
+        if len(chunks) > 1:
+            for pending_list_index, index in pending:
+                if pending_list_index == list_index and (list_index, index) not in partial:
+                    store_response(
+                        get_analysis_cache_key(chunks[index], model), model, get_analysis_prompt_version(),
+                        chunk_results[index]
+                    )
+
+        outcome = {
+            'success': True,
+            'data': chunk_results[0] if len(chunk_results) == 1 else merge_analysis_results(chunk_results)
+        }
+        if any(key[0] == list_index for key in partial):
+            outcome['partial'] = True
+        outcomes.append(outcome)
+    return outcomes
+
+
+def save_assist_tools_analysis(task, analysis_result, cached=False, partial=False):
+    """將分析結果保存到任務中"""
+    try:
+        analysis_result = with_local_tool_counts(analysis_result, task.ocr_content)
+        task.assistive_tool_analysis = analysis_result.get("assistive_tool_analysis", {})
+        task.prompt_analysis = analysis_result.get("prompt_analysis", {})
+        task.save()
+    except Exception as e:
+        return {
+            'success': False,
+            'message': f'無法保存分析結果: {str(e)}',
+            'retryable': True
+        }
+
+    result = {
+        'success': True,
+        'data': {
+            'assistive_tool_analysis': task.assistive_tool_analysis,
+            'prompt_analysis': task.prompt_analysis
+        }
+    }
+    if cached:
+        result['cached'] = True
+    if partial:
+        result['partial'] = True
+    return result
 
-            content = content.strip()
-            analysis_result = json.loads(content)
 
-        except json.JSONDecodeError as e:
+def analyze_assist_tools_and_prompt(task):
+    """分析輔助工具與提示詞"""
+    try:
+        if not task.task_file:
             return {
                 'success': False,
-                'message': f'GPT-4o 回應解析失敗: {str(e)}, 原始回應: {response.choices[0].message.content}'
+                'message': '該學生課程作業沒有上傳文件'
             }
 
-        # 將分析結果保存到任務中
-        try:
-            task.assistive_tool_analysis = analysis_result.get("assistive_tool_analysis", {})
-            task.prompt_analysis = analysis_result.get("prompt_analysis", {})
-            task.save()
-        except Exception as e:
+        # 檢查文件是否存在
+        if not os.path.exists(task.task_file.path):
             return {
                 'success': False,
-                'message': f'無法保存分析結果: {str(e)}'
+                'message': f'文件不存在: {task.task_file.path}'
             }
 
-        return {
-            'success': True,
-            'data': {
-                'assistive_tool_analysis': task.assistive_tool_analysis,
-                'prompt_analysis': task.prompt_analysis
+        # 確保已有OCR內容
+        if not task.ocr_content:
+            ocr_result = extract_text(task)
+            if not ocr_result['success']:
+                return {
+                    'success': False,
+                    'message': f'無法提取文本內容: {ocr_result["message"]}'
+                }
+            task.refresh_from_db()  # 確保獲取最新的OCR內容
+
+        # 相同文本、模型與提示詞版本的分析結果直接使用快取，不再呼叫 API
+        model = getattr(settings, 'LLM_MODEL', 'gpt-4o')
+        cache_key = get_analysis_cache_key(task.ocr_content, model)
+        cached_result = get_cached_response(cache_key)
+        if cached_result is not None:
+            return save_assist_tools_analysis(task, cached_result, cached=True)
+
+        # 取得共用的 LLM 引擎（會檢查 OpenAI API 密鑰）
+        try:
+            engine = get_llm_engine()
+        except LLMError as e:
+            return {
+                'success': False,
+                'message': str(e)
             }
-        }
+
+        # 過長的文本切段後並行分析再合併，避免超出 context 或分析被截斷
+        chunks = split_transcript(task.ocr_content, getattr(settings, 'LLM_CHUNK_MAX_TOKENS', 6000))
+        result = analyze_chunks(engine, chunks, model)
+        if not result['success']:
+            return result
+        analysis_result = result['data']
+
+        # 截斷後修復的部分結果不寫入快取，下次分析時重新送出
+        if not result.get('partial'):
+            store_response(cache_key, model, get_analysis_prompt_version(), analysis_result)
+
+        return save_assist_tools_analysis(task, analysis_result, partial=result.get('partial', False))
 
     except Exception as e:
         return {
@@ -0,0 +1,230 @@
+import logging
+import math
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+from .ocr_reader import get_reader_pool
+from .png_strips import PNGRowReader, UnsupportedPNGError
+
+logger = logging.getLogger(__name__)
+
+# PNG 逐段解碼時每次解出的原圖列數
+SOURCE_ROW_BATCH = 256
+
+# 常見螢幕截圖的基準 DPI，Retina / 高 DPI 截圖會先縮回此密度再辨識
+BASE_DPI = 72
+
+
+def _get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _open_image(path):
+    """
+    開啟圖片（只讀取檔頭），回傳 (image, 像素上限)；超過 OCR_MAX_IMAGE_PIXELS 兩倍的超長截圖不直接拒絕，
+    改為回傳像素上限，由呼叫端縮小到上限以內再辨識（0 表示不限制）
+    """
+    from PIL import Image
+
+    max_pixels = _get_setting('OCR_MAX_IMAGE_PIXELS', 300_000_000) or None
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        return Image.open(path), None
+    except Image.DecompressionBombError:
+        pass
+
+    logger.warning(f"圖片像素數超過 OCR_MAX_IMAGE_PIXELS ({max_pixels})，縮小後再辨識: {path}")
+    Image.MAX_IMAGE_PIXELS = None
+    try:
+        return Image.open(path), max_pixels
+    finally:
+        Image.MAX_IMAGE_PIXELS = max_pixels
+
+
+class ImageStrips:
+    """
+    依序提供縮放後座標的灰階條帶，灰階轉換與縮放都只對單一條帶進行。
+    PNG（非交錯、8 位元）以 PNGRowReader 逐段解碼，只保留與上一個條帶重疊的列，峰值記憶體取決於條帶大小；
+    其他格式（及無法逐段解碼的 PNG）由 Pillow 整張解碼一次，JPEG 以 draft 在解碼時直接縮小
+    """
+
+    def __init__(self, path):
+        image, max_pixels = _open_image(path)
+        scale = compute_scale(image.size, image.info.get('dpi'))
+        if max_pixels:
+            # 超過像素上限的圖片再等比縮小，辨識時的記憶體與切塊數量不超過上限對應的大小
+            scale = min(scale, math.sqrt(max_pixels / float(image.width * image.height)))
+
+        self.rows = None
+        if image.format == 'PNG':
+            try:
+                self.rows = PNGRowReader(path)
+            except UnsupportedPNGError:
+                pass
+        if self.rows is None and scale < 1 and image.format == 'JPEG':
+            width = image.width
+            image.draft('L', (max(1, int(image.width * scale)), max(1, int(image.height * scale))))
+            scale = scale * width / float(image.width)
+        if self.rows is not None:
+            image.close()
+            image = None
+
+        self.image = image
+        self.source_width, self.source_height = (self.rows.width, self.rows.height) if image is None else image.size
+        self.scale = scale
+        self.width = max(1, int(self.source_width * scale))
+        self.height = max(1, int(self.source_height * scale))
+        self._cached = None
+
+    def _read_source(self, top, bottom):
+        """原圖 [top, bottom) 列的灰階影像；逐段解碼時需依序讀取，與上一次重疊的列從保留的結果取得"""
+        if self.rows is None:
+            return self.image.crop((0, top, self.source_width, bottom)).convert('L')
+
+        from PIL import Image
+
+        rows = Image.new('L', (self.source_width, bottom - top))
+        if self._cached is not None:
+            cached, cached_top, cached_bottom = self._cached
+            if top < cached_top:
+                raise ValueError('條帶需依由上而下的順序讀取')
+            if top < cached_bottom:
+                rows.paste(cached.crop(
+                    (0, top - cached_top, self.source_width, min(bottom, cached_bottom) - cached_top)
+                ), (0, 0))
+        start = max(top, self.rows.next_row)
+        if start > self.rows.next_row:
+            self.rows.skip_rows(start - self.rows.next_row, SOURCE_ROW_BATCH)
+        # 分批解碼並轉為灰階，暫存的原始色彩資料只有一批的大小
+        while start < bottom:
+            batch = self.rows.read_rows(min(SOURCE_ROW_BATCH, bottom - start))
+            rows.paste(batch.convert('L'), (0, start - top))
+            start += batch.height
+
+        self._cached = (rows, top, bottom)
+        return rows
+
+    def load(self, top, bottom):
+        """縮放後座標 [top, bottom) 的灰階條帶"""
+        from PIL import Image
+
+        source_top = min(self.source_height - 1, int(top / self.scale))
+        source_bottom = max(source_top + 1, min(self.source_height, math.ceil(bottom / self.scale)))
+        strip = self._read_source(source_top, source_bottom)
+        if strip.size != (self.width, bottom - top):
+            strip = strip.resize((self.width, bottom - top), Image.LANCZOS)
+        return strip
+
+    def close(self):
+        self._cached = None
+        if self.rows is not None:
+            self.rows.close()
+        if self.image is not None:
+            self.image.close()
+
+
+def load_image(path):
+    """讀取整張圖片並轉為灰階、依 DPI 與寬度上限縮小，回傳 PIL Image"""
+    strips = ImageStrips(path)
+    try:
+        return strips.load(0, strips.height)
+    finally:
+        strips.close()
+
+
+def compute_scale(size, dpi=None):
+    """計算縮放比例：高 DPI 截圖縮回基準密度，且寬度不超過 OCR_TARGET_WIDTH"""
+    width, _ = size
+    scale = 1.0
+
+    target_dpi = _get_setting('OCR_TARGET_DPI', BASE_DPI * 2)
+    if dpi and dpi[0] and dpi[0] > target_dpi:
+        scale = target_dpi / float(dpi[0])
+
+    target_width = _get_setting('OCR_TARGET_WIDTH', 1600)
+    if width * scale > target_width:
+        scale = target_width / float(width)
+
+    return min(scale, 1.0)
+
+
+def iter_tiles(height, tile_height, overlap):
+    """將高度為 height 的圖片切成重疊的水平條帶，依序產生 (top, bottom, is_last)"""
+    step = max(1, tile_height - overlap)
+    top = 0
+    while True:
+        bottom = min(top + tile_height, height)
+        is_last = bottom >= height
+        yield top, bottom, is_last
+        if is_last:
+            break
+        top += step
+
+
+def _ocr_tile(strip, top, bottom, is_last, overlap):
+    """辨識單一條帶，只保留中心點落在本條帶負責範圍內的文字，避免接縫處重複"""
+    import numpy as np
+
+    tile = np.asarray(strip)
+
+    with get_reader_pool().acquire() as reader:
+        results = reader.readtext(tile)
+
+    owned_top = top + (overlap // 2 if top > 0 else 0)
+    owned_bottom = float('inf') if is_last else bottom - overlap // 2
+
+    lines = []
+    for bbox, text, _ in results:
+        ys = [point[1] for point in bbox]
+        center_y = top + (min(ys) + max(ys)) / 2
+        if owned_top <= center_y < owned_bottom:
+            lines.append((center_y, text))
+    return lines
+
+
+def _stitch(tile_lines, overlap):
+    """依條帶順序合併文字，並移除接縫附近重複辨識出的同一行"""
+    stitched = []
+    for lines in tile_lines:
+        for center_y, text in lines:
+            if stitched:
+                last_y, last_text = stitched[-1]
+                if text == last_text and abs(center_y - last_y) <= overlap:
+                    continue
+            stitched.append((center_y, text))
+    return [text for _, text in stitched]
+
+
+def ocr_image(path):
+    """
+    分塊 OCR：條帶由上而下依序解碼、轉灰階與縮放後辨識，可平行辨識多個條帶；
+    同時保留在記憶體中的條帶數不超過 OCR_TILE_WORKERS，PNG 截圖的峰值記憶體因此取決於條帶大小而非整張圖片
+    """
+    tile_height = _get_setting('OCR_TILE_HEIGHT', 2000)
+    overlap = _get_setting('OCR_TILE_OVERLAP', 200)
+    workers = max(1, _get_setting('OCR_TILE_WORKERS', 1))
+
+    strips = ImageStrips(path)
+    try:
+        tiles = iter_tiles(strips.height, tile_height, overlap)
+        if workers == 1:
+            tile_lines = [
+                _ocr_tile(strips.load(top, bottom), top, bottom, is_last, overlap) for top, bottom, is_last in tiles
+            ]
+        else:
+            # 條帶只能依序解碼，在主執行緒讀取後交給 executor 辨識；辨識中的條帶已達上限時先等待其中一個完成
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = []
+                for top, bottom, is_last in tiles:
+                    running = [future for future in futures if not future.done()]
+                    if len(running) >= workers:
+                        wait(running, return_when=FIRST_COMPLETED)
+                    futures.append(executor.submit(
+                        _ocr_tile, strips.load(top, bottom), top, bottom, is_last, overlap
+                    ))
+                tile_lines = [future.result() for future in futures]
+    finally:
+        strips.close()
+
+    return _stitch(tile_lines, overlap)
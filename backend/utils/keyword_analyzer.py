@@ -0,0 +1,129 @@
+import multiprocessing
+import re
+import threading
+from collections import Counter, OrderedDict
+from functools import partial
+
+from django.conf import settings
+
+# 保留含英文字母或中文的詞（同時排除了純數字與純符號）
+KEYWORD_CHAR_PATTERN = re.compile(r'[a-zA-Z\u4e00-\u9fff]')
+
+TOP_KEYWORDS = 50
+
+
+class KeywordAnalyzer:
+    """
+    每個 worker 行程共用的關鍵詞分析器：jieba 詞典與停用詞只在建立時載入一次，
+    之後每份作業只需斷詞與過濾
+    """
+
+    def __init__(self, stopword_languages=('zh', 'en'), user_dict=None):
+        # 延遲載入，web 行程不會因為引用本模組而載入 jieba
+        import jieba
+        from stopwordsiso import stopwords
+
+        self.tokenizer = jieba.dt
+        self.tokenizer.initialize()
+        if user_dict:
+            self.tokenizer.load_userdict(user_dict)
+        self.stop_words = frozenset(stopwords(list(stopword_languages)))
+        # 加入自訂詞的斷詞器，依詞集合快取（最近最少使用的先淘汰）；共用的 jieba.dt 不加入任何課程的自訂詞
+        self._tokenizers = OrderedDict()
+        self._tokenizers_lock = threading.Lock()
+
+    def get_tokenizer(self, dictionary_words=None):
+        """
+        取得加入 dictionary_words 的斷詞器：複製基本詞典的詞頻後加入自訂詞，
+        各課程的自訂詞因此不會影響其他課程的斷詞；沒有自訂詞時使用共用的 jieba.dt
+        """
+        if not dictionary_words:
+            return self.tokenizer
+        import jieba
+
+        words = frozenset(dictionary_words)
+        with self._tokenizers_lock:
+            tokenizer = self._tokenizers.get(words)
+            if tokenizer is not None:
+                self._tokenizers.move_to_end(words)
+                return tokenizer
+
+            tokenizer = jieba.Tokenizer(self.tokenizer.dictionary)
+            tokenizer.FREQ = dict(self.tokenizer.FREQ)
+            tokenizer.total = self.tokenizer.total
+            tokenizer.initialized = True
+            for word in words:
+                tokenizer.add_word(word)
+
+            self._tokenizers[words] = tokenizer
+            while len(self._tokenizers) > max(1, getattr(settings, 'KEYWORD_TOKENIZER_CACHE_SIZE', 8)):
+                self._tokenizers.popitem(last=False)
+            return tokenizer
+
+    def tokenize(self, text, normalization=None, dictionary_words=None):
+        """
+        斷詞並排除空字串、停用詞、單字符、純數字、純符號；
+        normalization 為 {變體詞: 標準詞}，在過濾前以一次查表合併同義詞，dictionary_words 為斷詞時加入的自訂詞
+        """
+        stop_words = self.stop_words
+        search = KEYWORD_CHAR_PATTERN.search
+        normalize = (normalization or {}).get
+        filtered_words = []
+        for word in self.get_tokenizer(dictionary_words).cut(text.lower()):
+            word = word.strip()
+            word = normalize(word, word)
+            if len(word) > 1 and word not in stop_words and search(word):
+                filtered_words.append(word)
+        return filtered_words
+
+    def analyze_counts(self, text, normalization=None, dictionary_words=None):
+        """回傳 (keyword_analysis, 完整詞頻)，完整詞頻供文件頻率索引使用"""
+        filtered_words = self.tokenize(text, normalization, dictionary_words)
+        word_counts = Counter(filtered_words)
+        analysis = {
+            'top_keywords': dict(word_counts.most_common(TOP_KEYWORDS)),
+            'total_words': len(filtered_words),
+            'unique_words': len(word_counts)
+        }
+        return analysis, dict(word_counts)
+
+    def analyze(self, text, normalization=None, dictionary_words=None):
+        """回傳前 50 個關鍵詞與詞數統計，格式與 StudentCourseTask.keyword_analysis 相同"""
+        return self.analyze_counts(text, normalization, dictionary_words)[0]
+
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+
+def get_keyword_analyzer():
+    """取得行程內共用的關鍵詞分析器，第一次呼叫時載入詞典與停用詞"""
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = KeywordAnalyzer(user_dict=getattr(settings, 'KEYWORD_USER_DICT', '') or None)
+    return _analyzer
+
+
+def _analyze_text(text, normalization=None, dictionary_words=None):
+    return get_keyword_analyzer().analyze_counts(text, normalization, dictionary_words)
+
+
+def analyze_texts(texts, processes=1, normalization=None, dictionary_words=None):
+    """
+    批量分析多份文本，回傳 [(keyword_analysis, 完整詞頻)]；processes > 1 時以 fork 的行程池平行斷詞，
+    父行程先載入詞典並建立加入自訂詞的斷詞器，子行程直接繼承不需重新初始化
+    """
+    texts = list(texts)
+    processes = min(processes, len(texts))
+    analyze = partial(_analyze_text, normalization=normalization, dictionary_words=dictionary_words)
+    get_keyword_analyzer().get_tokenizer(dictionary_words)
+    if processes > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        try:
+            with multiprocessing.get_context('fork').Pool(processes) as pool:
+                return pool.map(analyze, texts, chunksize=max(1, len(texts) // (processes * 4)))
+        except AssertionError:
+            # Celery prefork 的子行程是 daemon，不允許再建立子行程，改為依序處理
+            pass
+    return [analyze(text) for text in texts]
@@ -0,0 +1,204 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from ..models.keyword_document_frequencies import KeywordDocumentFrequency
+from ..models.keyword_postings import KeywordPosting
+from ..models.student_course_tasks import StudentCourseTask
+
+# 與 KeywordDocumentFrequency.keyword 欄位長度相同，過長的詞（多半是 OCR 雜訊）不列入索引
+MAX_KEYWORD_LENGTH = 100
+
+
+def get_vocabulary(keyword_counts):
+    return {keyword for keyword in (keyword_counts or {}) if len(keyword) <= MAX_KEYWORD_LENGTH}
+
+
+def get_vocabulary_delta(old_counts, new_counts):
+    """一份作業重新分析前後的詞彙差異，回傳 {關鍵詞: +1 或 -1}"""
+    old_vocabulary = get_vocabulary(old_counts)
+    new_vocabulary = get_vocabulary(new_counts)
+    delta = dict.fromkeys(new_vocabulary - old_vocabulary, 1)
+    delta.update(dict.fromkeys(old_vocabulary - new_vocabulary, -1))
+    return delta
+
+
+def apply_document_frequency_deltas(course_task_id, deltas):
+    """
+    以增量更新課程任務的文件頻率，成本只與變動的詞數有關、不需重新掃描所有作業；
+    相同增量的詞合併成一個 UPDATE，降到 0 的詞直接刪除
+    """
+    deltas = {keyword: delta for keyword, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    keywords_by_delta = defaultdict(list)
+    for keyword, delta in deltas.items():
+        keywords_by_delta[delta].append(keyword)
+
+    with transaction.atomic():
+        added = [keyword for keyword, delta in deltas.items() if delta > 0]
+        if added:
+            KeywordDocumentFrequency.objects.bulk_create(
+                [KeywordDocumentFrequency(course_task_id=course_task_id, keyword=keyword) for keyword in added],
+                ignore_conflicts=True,
+            )
+        for delta, keywords in keywords_by_delta.items():
+            KeywordDocumentFrequency.objects.filter(
+                course_task_id=course_task_id, keyword__in=keywords
+            ).update(document_count=F('document_count') + delta)
+        removed = [keyword for keyword, delta in deltas.items() if delta < 0]
+        if removed:
+            KeywordDocumentFrequency.objects.filter(
+                course_task_id=course_task_id, keyword__in=removed, document_count__lte=0
+            ).delete()
+
+
+def update_document_frequency(course_task_id, old_counts, new_counts):
+    """單份作業的詞頻變動後更新文件頻率索引"""
+    apply_document_frequency_deltas(course_task_id, get_vocabulary_delta(old_counts, new_counts))
+
+
+def collect_document_frequency_deltas(changes):
+    """合併多份作業的詞彙差異，changes 為 [(課程任務 ID, 舊詞頻, 新詞頻)]，回傳 {課程任務 ID: {關鍵詞: 增量}}"""
+    deltas = defaultdict(Counter)
+    for course_task_id, old_counts, new_counts in changes:
+        deltas[course_task_id].update(get_vocabulary_delta(old_counts, new_counts))
+    return deltas
+
+
+def get_document_frequencies(course_task_id=None, course_id=None, keywords=None):
+    """取得課程任務或課程（各課程任務加總）的文件頻率 {關鍵詞: 作業數}"""
+    queryset = KeywordDocumentFrequency.objects.all()
+    if course_task_id is not None:
+        queryset = queryset.filter(course_task_id=course_task_id)
+    else:
+        queryset = queryset.filter(course_task__course_id=course_id)
+    if keywords is not None:
+        queryset = queryset.filter(keyword__in=list(keywords))
+    return dict(
+        queryset.values('keyword').annotate(total=Sum('document_count')).values_list('keyword', 'total')
+    )
+
+
+def get_document_total(course_task_id=None, course_id=None):
+    """已建立詞頻的作業數（TF-IDF 的文件總數）"""
+    queryset = StudentCourseTask.objects.exclude(keyword_counts={})
+    if course_task_id is not None:
+        return queryset.filter(course_task_id=course_task_id).count()
+    return queryset.filter(course_id=course_id).count()
+
+
+def rebuild_document_frequency(course_task_id):
+    """由作業的詞頻重建課程任務的文件頻率（資料修復用，一般情況由增量更新維護）"""
+    totals = Counter()
+    for keyword_counts in StudentCourseTask.objects.filter(
+        course_task_id=course_task_id
+    ).values_list('keyword_counts', flat=True):
+        totals.update(get_vocabulary(keyword_counts))
+
+    with transaction.atomic():
+        KeywordDocumentFrequency.objects.filter(course_task_id=course_task_id).delete()
+        KeywordDocumentFrequency.objects.bulk_create(
+            [
+                KeywordDocumentFrequency(course_task_id=course_task_id, keyword=keyword, document_count=count)
+                for keyword, count in totals.items()
+            ],
+            batch_size=1000,
+        )
+    return len(totals)
+
+
+def replace_postings(tasks):
+    """以作業目前的完整詞頻取代其反向索引，tasks 需已設定 id、course_task_id 與 keyword_counts"""
+    tasks = list(tasks)
+    if not tasks:
+        return
+    with transaction.atomic():
+        KeywordPosting.objects.filter(student_course_task_id__in=[task.id for task in tasks]).delete()
+        KeywordPosting.objects.bulk_create(
+            [
+                KeywordPosting(
+                    student_course_task_id=task.id, course_task_id=task.course_task_id, keyword=keyword, count=count
+                )
+                for task in tasks
+                for keyword, count in (task.keyword_counts or {}).items()
+                if len(keyword) <= MAX_KEYWORD_LENGTH and count > 0
+            ],
+            batch_size=1000,
+        )
+
+
+def rebuild_postings(course_task_id):
+    """由作業的詞頻重建課程任務的反向索引（資料修復用）"""
+    tasks = list(
+        StudentCourseTask.objects.filter(course_task_id=course_task_id).only('id', 'course_task_id', 'keyword_counts')
+    )
+    replace_postings(tasks)
+    return len(tasks)
+
+
+def search_keyword_postings(course_task_id, keywords, match_all=False):
+    """
+    查詢課程任務中提到指定關鍵詞的作業，回傳 [{作業 ID, 學生, 各詞次數, 總次數}]，依總次數遞減排序；
+    match_all 為 True 時只回傳所有關鍵詞都出現過的作業
+    """
+    keywords = list(dict.fromkeys(keywords))
+    postings = KeywordPosting.objects.filter(
+        course_task_id=course_task_id, keyword__in=keywords
+    ).values_list(
+        'student_course_task_id', 'student_course_task__student_id', 'student_course_task__student__name',
+        'keyword', 'count'
+    )
+
+    results = {}
+    for task_id, student_id, student_name, keyword, count in postings:
+        result = results.setdefault(task_id, {
+            'student_course_task_id': task_id,
+            'student_id': student_id,
+            'student_name': student_name,
+            'keywords': {},
+            'total': 0,
+        })
+        result['keywords'][keyword] = count
+        result['total'] += count
+
+    results = [
+        result for result in results.values()
+        if not match_all or len(result['keywords']) == len(keywords)
+    ]
+    results.sort(key=lambda result: (-result['total'], result['student_course_task_id']))
+    return results
+
+
+def get_top_keywords(course_task_id, top_k=20):
+    """課程任務中最多作業提到的關鍵詞與其總出現次數"""
+    top = list(
+        KeywordDocumentFrequency.objects.filter(
+            course_task_id=course_task_id, document_count__gt=0
+        ).order_by('-document_count', 'keyword').values_list('keyword', 'document_count')[:top_k]
+    )
+    totals = dict(
+        KeywordPosting.objects.filter(
+            course_task_id=course_task_id, keyword__in=[keyword for keyword, _ in top]
+        ).values('keyword').annotate(total=Sum('count')).values_list('keyword', 'total')
+    )
+    return [
+        {'keyword': keyword, 'documents': documents, 'total': totals.get(keyword, 0)}
+        for keyword, documents in top
+    ]
+
+
+def get_cooccurring_keywords(course_task_id, keyword, top_k=20):
+    """與指定關鍵詞出現在同一份作業中次數最多的關鍵詞"""
+    task_ids = KeywordPosting.objects.filter(
+        course_task_id=course_task_id, keyword=keyword
+    ).values('student_course_task_id')
+    return list(
+        KeywordPosting.objects.filter(
+            course_task_id=course_task_id, student_course_task_id__in=task_ids
+        ).exclude(keyword=keyword).values('keyword').annotate(
+            documents=Count('id'), total=Sum('count')
+        ).order_by('-documents', '-total', 'keyword')[:top_k]
+    )
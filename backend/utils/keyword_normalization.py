@@ -0,0 +1,131 @@
+import os
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+
+from ..models.keyword_normalizations import KeywordNormalization
+
+# 對照鏈（a -> b -> c）最多展開的層數，避免設定成環狀時無限循環
+MAX_CHAIN_DEPTH = 10
+
+_lock = threading.Lock()
+_state = {'version': None, 'file_entries': [], 'maps': {}, 'dictionaries': {}}
+# 對照表版本存於共用快取，web 與 worker 行程不需每次斷詞都查詢資料庫；
+# 對照表變動時由 signals 清除，TTL 作為未經過 signals 的變動（例如 QuerySet.update）的保險
+VERSION_CACHE_KEY = 'keyword_normalization_version'
+
+
+def get_normalization_file():
+    return getattr(settings, 'KEYWORD_NORMALIZATION_FILE', '') or ''
+
+
+def load_file_entries(path):
+    """讀取「變體詞<TAB>標準詞」格式的對照檔，回傳 [(變體詞, 標準詞)]"""
+    entries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split('\t')
+            if len(parts) != 2 or not parts[0].strip() or not parts[1].strip():
+                continue
+            entries.append((parts[0].strip().lower(), parts[1].strip().lower()))
+    return entries
+
+
+def compile_normalization(entries):
+    """將依優先順序排列的 [(變體詞, 標準詞)] 編譯為單一查詢表，並展開對照鏈"""
+    mapping = {}
+    for variant, canonical in entries:
+        mapping[variant] = canonical
+
+    compiled = {}
+    for variant, canonical in mapping.items():
+        for _ in range(MAX_CHAIN_DEPTH):
+            if canonical not in mapping or mapping[canonical] == canonical:
+                break
+            canonical = mapping[canonical]
+        if canonical != variant:
+            compiled[variant] = canonical
+    return compiled
+
+
+def _get_version():
+    path = get_normalization_file()
+    file_mtime = os.path.getmtime(path) if path and os.path.exists(path) else None
+    stats = cache.get(VERSION_CACHE_KEY)
+    if stats is None:
+        stats = KeywordNormalization.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+        cache.set(VERSION_CACHE_KEY, stats, getattr(settings, 'KEYWORD_NORMALIZATION_VERSION_TTL', 60))
+    return file_mtime, stats['count'], stats['latest']
+
+
+def invalidate_version():
+    """對照表變動後清除快取的版本，各行程下次取得查詢表時重新編譯"""
+    cache.delete(VERSION_CACHE_KEY)
+
+
+def _refresh(version):
+    # 對照表有變動時重新讀取檔案並清除已編譯的查詢表
+    path = get_normalization_file()
+    _state['file_entries'] = load_file_entries(path) if version[0] is not None else []
+    _state['maps'] = {}
+    _state['dictionaries'] = {}
+    _state['version'] = version
+
+
+def get_dictionary_words(course_id=None):
+    """
+    課程斷詞時加入 jieba 的自訂詞（全域與該課程設定 add_to_dictionary 的變體詞與標準詞），
+    每個行程依 (課程, 對照表版本) 快取，交給 KeywordAnalyzer 建立該課程專用的斷詞器
+    """
+    version = _get_version()
+    with _lock:
+        if _state['version'] != version:
+            _refresh(version)
+        words = _state['dictionaries'].get(course_id)
+        if words is None:
+            scope = Q(course__isnull=True)
+            if course_id is not None:
+                scope |= Q(course_id=course_id)
+            words = set()
+            for variant, canonical in KeywordNormalization.objects.filter(
+                scope, add_to_dictionary=True
+            ).values_list('variant', 'canonical'):
+                words.update((variant, canonical))
+            words = frozenset(words)
+            _state['dictionaries'][course_id] = words
+        return words
+
+
+def get_normalization_map(course_id=None):
+    """
+    取得課程適用的關鍵詞正規化查詢表 {變體詞: 標準詞}，優先順序為 課程設定 > 全域設定 > 對照檔；
+    每個行程快取編譯結果，對照表變動（筆數、最後修改時間、檔案修改時間）時自動重新編譯。
+    只查表不斷詞，web 行程的搜尋也可使用而不會載入 jieba
+    """
+    version = _get_version()
+    with _lock:
+        if _state['version'] != version:
+            _refresh(version)
+        mapping = _state['maps'].get(course_id)
+        if mapping is None:
+            entries = list(_state['file_entries'])
+            rows = KeywordNormalization.objects.filter(course__isnull=True).values_list('variant', 'canonical')
+            entries.extend(rows)
+            if course_id is not None:
+                entries.extend(
+                    KeywordNormalization.objects.filter(course_id=course_id).values_list('variant', 'canonical')
+                )
+            mapping = compile_normalization(entries)
+            _state['maps'][course_id] = mapping
+        return mapping
+
+
+def normalize_keyword(keyword, course_id=None):
+    """將查詢的關鍵詞轉為索引中使用的標準詞"""
+    keyword = keyword.strip().lower()
+    return get_normalization_map(course_id).get(keyword, keyword)
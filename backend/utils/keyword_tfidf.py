@@ -0,0 +1,92 @@
+from ..models.student_course_tasks import StudentCourseTask
+from .keyword_index import get_document_frequencies, get_document_total
+
+SCOPE_COURSE_TASK = 'course_task'
+SCOPE_COURSE = 'course'
+SCOPES = (SCOPE_COURSE_TASK, SCOPE_COURSE)
+
+
+def score_documents(documents, document_frequencies, document_total, top_k=20):
+    """
+    以稀疏矩陣一次計算多份作業的 TF-IDF，回傳每份作業前 top_k 個具代表性的關鍵詞 [(關鍵詞, 分數)]；
+    tf 取 1 + log(次數)，idf 取 log((1 + N) / (1 + df))，出現在每份作業中的詞分數為 0 而不列入，每列再做 L2 正規化
+    """
+    # 延遲載入，web 行程只在實際查詢時才載入 numpy / scipy
+    import numpy as np
+    from scipy import sparse
+
+    vocabulary = {}
+    rows = []
+    columns = []
+    values = []
+    for row, keyword_counts in enumerate(documents):
+        for keyword, count in (keyword_counts or {}).items():
+            if count > 0:
+                rows.append(row)
+                columns.append(vocabulary.setdefault(keyword, len(vocabulary)))
+                values.append(count)
+    if not vocabulary:
+        return [[] for _ in documents]
+
+    keywords = np.array(list(vocabulary), dtype=object)
+    matrix = sparse.csr_matrix(
+        (np.log(np.asarray(values, dtype=np.float64)) + 1.0, (rows, columns)),
+        shape=(len(documents), len(vocabulary)),
+    )
+    # 文件頻率索引尚未包含的詞（例如還沒寫入的新作業）至少算出現在一份作業中
+    frequencies = np.array([max(document_frequencies.get(keyword, 0), 1) for keyword in keywords], dtype=np.float64)
+    total = max(document_total, frequencies.max())
+    idf = np.log((1.0 + total) / (1.0 + frequencies))
+
+    matrix = matrix.multiply(idf).tocsr()
+    matrix.eliminate_zeros()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    matrix = sparse.diags(1.0 / norms) @ matrix
+
+    results = []
+    for row in range(matrix.shape[0]):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        scores = matrix.data[start:end]
+        indices = matrix.indices[start:end]
+        if 0 < top_k < len(scores):
+            # 保留所有不低於第 top_k 名分數的詞，與第 top_k 名同分的詞才能依關鍵詞決定取捨
+            threshold = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+            selected = np.flatnonzero(scores >= threshold)
+        else:
+            selected = np.arange(len(scores))
+        # 分數相同時依關鍵詞排序，結果不受稀疏矩陣內部順序影響
+        ordered = sorted(selected, key=lambda index: (-scores[index], keywords[indices[index]]))[:top_k]
+        results.append([(keywords[indices[index]], round(float(scores[index]), 4)) for index in ordered])
+    return results
+
+
+def _get_scope_filter(task, scope):
+    if scope == SCOPE_COURSE:
+        return {'course_id': task.course_id}
+    return {'course_task_id': task.course_task_id}
+
+
+def get_distinctive_keywords(task, scope=SCOPE_COURSE_TASK, top_k=20):
+    """單份作業相對於課程任務（或整個課程）最具代表性的關鍵詞，只查詢該作業用到的詞的文件頻率"""
+    if scope not in SCOPES:
+        raise ValueError(f'不支援的範圍: {scope}')
+    scope_filter = _get_scope_filter(task, scope)
+    document_frequencies = get_document_frequencies(keywords=task.keyword_counts.keys(), **scope_filter)
+    return score_documents(
+        [task.keyword_counts], document_frequencies, get_document_total(**scope_filter), top_k
+    )[0]
+
+
+def score_course_task(course_task_id, top_k=20):
+    """一次計算課程任務所有作業的代表性關鍵詞，回傳 {作業 ID: [(關鍵詞, 分數)]}"""
+    tasks = list(
+        StudentCourseTask.objects.filter(course_task_id=course_task_id)
+        .exclude(keyword_counts={}).order_by('id').values_list('id', 'keyword_counts')
+    )
+    document_frequencies = get_document_frequencies(course_task_id=course_task_id)
+    results = score_documents(
+        [keyword_counts for _, keyword_counts in tasks], document_frequencies,
+        get_document_total(course_task_id=course_task_id), top_k
+    )
+    return {task_id: result for (task_id, _), result in zip(tasks, results)}
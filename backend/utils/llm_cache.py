@@ -0,0 +1,113 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from ..models.llm_cache_entries import LLMCacheEntry
+
+
+def get_prompt_version(system_prompt):
+    """提示詞版本由提示詞內容的雜湊產生，修改提示詞後舊快取自動失效"""
+    return hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()[:16]
+
+
+def build_cache_key(model, prompt_version, temperature, content):
+    """快取鍵：模型、提示詞版本、溫度與輸入文本的 SHA-256"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([model, prompt_version, temperature], ensure_ascii=False).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(content.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _get_ttl_cutoff():
+    ttl_days = getattr(settings, 'LLM_CACHE_TTL_DAYS', 30)
+    if not ttl_days:
+        return None
+    return timezone.now() - timedelta(days=ttl_days)
+
+
+def get_cached_response(cache_key):
+    """查詢 LLM 回應快取，命中時更新最後使用時間並回傳分析結果，未命中或已過期回傳 None"""
+    if not getattr(settings, 'LLM_CACHE_ENABLED', True):
+        return None
+
+    entries = LLMCacheEntry.objects.filter(cache_key=cache_key)
+    cutoff = _get_ttl_cutoff()
+    if cutoff is not None:
+        entries = entries.filter(created_at__gte=cutoff)
+
+    response = entries.values_list('response', flat=True).first()
+    if response is None:
+        return None
+
+    entries.update(last_used_at=timezone.now(), hit_count=F('hit_count') + 1)
+    return response
+
+
+def store_response(cache_key, model, prompt_version, response):
+    """寫入 LLM 回應快取（僅存放解析成功的結果），超過容量上限時淘汰最久未使用的項目"""
+    if not getattr(settings, 'LLM_CACHE_ENABLED', True):
+        return
+
+    try:
+        LLMCacheEntry.objects.update_or_create(
+            cache_key=cache_key,
+            defaults={
+                'model': model,
+                'prompt_version': prompt_version,
+                'response': response,
+                'response_size': len(json.dumps(response, ensure_ascii=False).encode('utf-8')),
+                'last_used_at': timezone.now(),
+                'created_at': timezone.now(),
+            },
+        )
+    except IntegrityError:
+        # 其他 worker 同時寫入了相同內容的結果
+        return
+
+    prune_llm_cache(
+        max_entries=getattr(settings, 'LLM_CACHE_MAX_ENTRIES', 5000),
+        max_bytes=getattr(settings, 'LLM_CACHE_MAX_BYTES', 50 * 1024 * 1024),
+    )
+
+
+def invalidate_prompt_versions(keep_versions):
+    """刪除非目前提示詞版本的快取，回傳刪除的筆數"""
+    return LLMCacheEntry.objects.exclude(prompt_version__in=keep_versions).delete()[0]
+
+
+def prune_llm_cache(max_entries=None, max_bytes=None, expired=False, keep_prompt_versions=None):
+    """淘汰過期、舊提示詞版本及超出容量的快取項目（依 LRU 順序），回傳刪除的筆數"""
+    deleted = 0
+
+    if keep_prompt_versions is not None:
+        deleted += invalidate_prompt_versions(keep_prompt_versions)
+
+    if expired:
+        cutoff = _get_ttl_cutoff()
+        if cutoff is not None:
+            deleted += LLMCacheEntry.objects.filter(created_at__lt=cutoff).delete()[0]
+
+    if max_entries is not None:
+        excess = LLMCacheEntry.objects.count() - max_entries
+        if excess > 0:
+            ids = list(LLMCacheEntry.objects.order_by('last_used_at').values_list('id', flat=True)[:excess])
+            deleted += LLMCacheEntry.objects.filter(id__in=ids).delete()[0]
+
+    if max_bytes is not None:
+        total = LLMCacheEntry.objects.aggregate(total=Sum('response_size'))['total'] or 0
+        if total > max_bytes:
+            ids = []
+            for entry_id, size in LLMCacheEntry.objects.order_by('last_used_at').values_list('id', 'response_size'):
+                if total <= max_bytes:
+                    break
+                ids.append(entry_id)
+                total -= size
+            deleted += LLMCacheEntry.objects.filter(id__in=ids).delete()[0]
+
+    return deleted
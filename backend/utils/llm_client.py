@@ -0,0 +1,200 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+
+from .transcript_chunks import estimate_text_tokens
+
+
+class LLMError(Exception):
+    """LLM 呼叫失敗，retryable 表示交給 Celery 重試是否有意義"""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class TokenBudget:
+    """每分鐘 token 預算（token bucket），避免觸發 OpenAI 的 TPM 限制"""
+
+    def __init__(self, tokens_per_minute):
+        self.capacity = tokens_per_minute
+        self.tokens = float(tokens_per_minute)
+        self.refill_rate = tokens_per_minute / 60.0
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    async def acquire(self, tokens):
+        if self.capacity <= 0:
+            return
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.refill_rate)
+
+
+def estimate_tokens(messages, max_tokens):
+    # 輸入估計加上輸出上限，與 OpenAI 計算 TPM 的方式相同
+    return sum(estimate_text_tokens(message['content']) for message in messages) + max_tokens
+
+
+def parse_retry_after(headers):
+    """解析 Retry-After（秒數或 HTTP 日期）與 OpenAI 的 retry-after-ms，回傳秒數"""
+    if headers is None:
+        return None
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get('retry-after')
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMEngine:
+    """
+    共用的非同步 chat completions 引擎：
+    單一連線池的 HTTP client、semaphore 限制並行數、TPM 預算，以及 429/5xx 的 jitter 指數退避重試。
+    事件迴圈跑在背景執行緒，同步程式（Celery threads worker）透過 complete() 呼叫，
+    同一行程內的所有請求共用並行與 token 限制。
+    """
+
+    def __init__(self, api_key, base_url=None, max_concurrency=8, tokens_per_minute=0,
+                 max_retries=5, timeout=120, backoff_base=1.0, backoff_max=60.0):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='llm-engine', daemon=True)
+        self._thread.start()
+        self._client = None
+        self._semaphore = None
+        self._budget = None
+
+    def _ensure_client(self):
+        # 在事件迴圈內建立，確保 client 與 semaphore 綁定同一個迴圈
+        if self._client is None:
+            import httpx
+            import openai
+
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+                timeout=self.timeout,
+            )
+            self._client = openai.AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                max_retries=0,  # 重試由引擎處理，才能套用 Retry-After 與 TPM 預算
+                http_client=http_client,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._budget = TokenBudget(self.tokens_per_minute)
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            # 遵守伺服器指定的等待時間，再加一點 jitter 避免同時重送
+            return retry_after + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def acomplete(self, messages, model, temperature=0.1, max_tokens=2000, **params):
+        """送出單一 chat completion 請求並回傳回覆內容"""
+        import openai
+
+        self._ensure_client()
+        attempt = 0
+        while True:
+            await self._budget.acquire(estimate_tokens(messages, max_tokens))
+            try:
+                async with self._semaphore:
+                    response = await self._client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        **params
+                    )
+                return response.choices[0].message.content
+            except openai.APIStatusError as e:
+                retryable = e.status_code == 429 or e.status_code >= 500
+                if not retryable or attempt >= self.max_retries:
+                    raise LLMError(f'OpenAI API 調用失敗 ({e.status_code}): {e.message}', retryable=retryable)
+                delay = self._backoff(attempt, parse_retry_after(e.response.headers))
+            except (openai.APIConnectionError, openai.APITimeoutError) as e:
+                if attempt >= self.max_retries:
+                    raise LLMError(f'OpenAI API 連線失敗: {str(e)}')
+                delay = self._backoff(attempt)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def acomplete_many(self, requests):
+        """並行送出多個請求，依輸入順序回傳回覆內容或 LLMError"""
+        return await asyncio.gather(
+            *(self.acomplete(**request) for request in requests),
+            return_exceptions=True
+        )
+
+    def complete(self, messages, model, **params):
+        """同步介面：提交到引擎的事件迴圈並等待結果"""
+        future = asyncio.run_coroutine_threadsafe(self.acomplete(messages, model, **params), self._loop)
+        return future.result()
+
+    def complete_many(self, requests):
+        future = asyncio.run_coroutine_threadsafe(self.acomplete_many(requests), self._loop)
+        return future.result()
+
+
+_engine = None
+_engine_pid = None
+_engine_lock = threading.Lock()
+
+
+def get_llm_engine():
+    """取得行程內共用的 LLM 引擎（fork 後的子行程會重新建立）"""
+    global _engine, _engine_pid
+    with _engine_lock:
+        if _engine is None or _engine_pid != os.getpid():
+            api_key = os.environ.get("OPENAI_API_KEY")
+            if not api_key:
+                raise LLMError('OpenAI API 密鑰未設置', retryable=False)
+            _engine = LLMEngine(
+                api_key=api_key,
+                base_url=getattr(settings, 'OPENAI_BASE_URL', None),
+                max_concurrency=getattr(settings, 'LLM_MAX_CONCURRENCY', 8),
+                tokens_per_minute=getattr(settings, 'LLM_TOKENS_PER_MINUTE', 0),
+                max_retries=getattr(settings, 'LLM_MAX_RETRIES', 5),
+                timeout=getattr(settings, 'LLM_REQUEST_TIMEOUT', 120),
+            )
+            _engine_pid = os.getpid()
+        return _engine
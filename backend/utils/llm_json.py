@@ -0,0 +1,209 @@
+import json
+import re
+
+from .tool_counter import ASSISTIVE_TOOLS
+
+FENCE_PATTERN = re.compile(r'```(?:json)?\s*(.*?)(?:```|$)', re.S)
+TRAILING_COMMA_PATTERN = re.compile(r',\s*([}\]])')
+# 截斷修復時最多往回嘗試的逗號數，避免病態輸入造成大量重試
+MAX_REPAIR_ATTEMPTS = 50
+
+
+class LLMOutputError(ValueError):
+    """LLM 回覆無法解析或不符合分析結果格式"""
+
+
+def build_analysis_schema(include_tools=True):
+    """分析結果的 JSON schema（OpenAI structured outputs 的 strict 模式要求所有欄位必填且不允許額外欄位）"""
+    prompt_analysis = {
+        'type': 'object',
+        'properties': {
+            'discussion_topics': {
+                'type': 'object',
+                'properties': {
+                    'topic': {'type': 'string'},
+                    'description': {'type': 'string'},
+                },
+                'required': ['topic', 'description'],
+                'additionalProperties': False,
+            },
+            'prompts': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'keyword': {'type': 'string'},
+                        'times': {'type': 'integer'},
+                    },
+                    'required': ['keyword', 'times'],
+                    'additionalProperties': False,
+                },
+            },
+        },
+        'required': ['discussion_topics', 'prompts'],
+        'additionalProperties': False,
+    }
+    properties = {'prompt_analysis': prompt_analysis}
+    if include_tools:
+        properties = {
+            'assistive_tool_analysis': {
+                'type': 'object',
+                'properties': {tool: {'type': 'integer'} for tool in ASSISTIVE_TOOLS},
+                'required': list(ASSISTIVE_TOOLS),
+                'additionalProperties': False,
+            },
+            **properties,
+        }
+    return {
+        'type': 'object',
+        'properties': properties,
+        'required': list(properties),
+        'additionalProperties': False,
+    }
+
+
+def build_packed_schema(include_tools=True):
+    item = build_analysis_schema(include_tools)
+    item = {
+        **item,
+        'properties': {'id': {'type': 'string'}, **item['properties']},
+        'required': ['id', *item['required']],
+    }
+    return {
+        'type': 'object',
+        'properties': {'results': {'type': 'array', 'items': item}},
+        'required': ['results'],
+        'additionalProperties': False,
+    }
+
+
+def build_response_format(name, schema):
+    return {
+        'type': 'json_schema',
+        'json_schema': {'name': name, 'strict': True, 'schema': schema},
+    }
+
+
+def _extract_json_text(content):
+    # 移除代碼塊標記與 JSON 前後的說明文字
+    match = FENCE_PATTERN.search(content)
+    if match:
+        content = match.group(1)
+    starts = [index for index in (content.find('{'), content.find('[')) if index != -1]
+    if not starts:
+        return content.strip()
+    return content[min(starts):].strip()
+
+
+def _scan(text):
+    """
+    逐字掃描 JSON 文字，回傳 (文字, 結尾時未關閉的括號, 是否停在字串中, 各逗號位置與當時的括號)；
+    第一個最外層物件結束時停止，忽略之後多餘的文字
+    """
+    stack = []
+    in_string = False
+    escape = False
+    commas = []
+    for index, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+        elif char in '}]':
+            if stack:
+                stack.pop()
+            if not stack:
+                return text[:index + 1], [], False, commas
+        elif char == ',':
+            commas.append((index, list(stack)))
+    return text, stack, in_string, commas
+
+
+def repair_json(text):
+    """
+    修復常見的截斷與格式問題：補上未關閉的字串與括號、移除多餘的逗號；
+    截斷在鍵值對中間時退回到上一個完整的項目，回傳 (解析後的物件, 是否因截斷而內容不完整)
+    """
+    text, stack, in_string, commas = _scan(text)
+    truncated = bool(stack) or in_string
+    candidates = [text + ('"' if in_string else '') + ''.join(reversed(stack))]
+    for index, comma_stack in reversed(commas[-MAX_REPAIR_ATTEMPTS:]):
+        candidates.append(text[:index] + ''.join(reversed(comma_stack)))
+
+    error = None
+    for attempt, candidate in enumerate(candidates):
+        try:
+            # 退回到上一個逗號時一定捨棄了部分內容
+            return json.loads(TRAILING_COMMA_PATTERN.sub(r'\1', candidate)), truncated or attempt > 0
+        except json.JSONDecodeError as e:
+            error = error or e
+    raise error
+
+
+def parse_llm_json(content):
+    """
+    解析 LLM 回覆的 JSON，容許代碼塊標記、前後說明文字、被截斷的輸出；
+    回傳 (解析後的物件, 是否為截斷後修復的部分結果)，部分結果不應寫入快取
+    """
+    text = _extract_json_text(content or '')
+    try:
+        return json.loads(text), False
+    except json.JSONDecodeError:
+        return repair_json(text)
+
+
+def _as_count(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value.strip())
+    return None
+
+
+def normalize_analysis_result(result, include_tools=True):
+    """檢查分析結果的結構並整理型別（次數轉為整數、略過無效的關鍵詞），不符合時拋出 LLMOutputError"""
+    if not isinstance(result, dict):
+        raise LLMOutputError('回應不是 JSON 物件')
+
+    prompt_analysis = result.get('prompt_analysis')
+    if not isinstance(prompt_analysis, dict):
+        raise LLMOutputError('缺少 prompt_analysis')
+    prompts = prompt_analysis.get('prompts')
+    if not isinstance(prompts, list):
+        raise LLMOutputError('缺少 prompt_analysis.prompts')
+    discussion_topics = prompt_analysis.get('discussion_topics')
+    if not isinstance(discussion_topics, dict):
+        discussion_topics = {}
+
+    normalized = {}
+    if include_tools:
+        tools = result.get('assistive_tool_analysis')
+        if not isinstance(tools, dict):
+            raise LLMOutputError('缺少 assistive_tool_analysis')
+        normalized['assistive_tool_analysis'] = {
+            tool: count for tool, count in ((tool, _as_count(value)) for tool, value in tools.items())
+            if count is not None
+        }
+    elif 'assistive_tool_analysis' in result:
+        normalized['assistive_tool_analysis'] = result['assistive_tool_analysis']
+
+    normalized['prompt_analysis'] = {
+        **prompt_analysis,
+        'discussion_topics': discussion_topics,
+        'prompts': [
+            {'keyword': item['keyword'], 'times': _as_count(item.get('times')) or 0}
+            for item in prompts
+            if isinstance(item, dict) and isinstance(item.get('keyword'), str) and item['keyword']
+        ],
+    }
+    return normalized
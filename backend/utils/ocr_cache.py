@@ -0,0 +1,110 @@
+import hashlib
+from datetime import timedelta
+from importlib import metadata
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from ..models.ocr_cache_entries import OCRCacheEntry
+
+# OCR 前處理流程版本，流程改變（會影響輸出文字）時需遞增，讓舊快取自動失效
+OCR_PIPELINE_VERSION = '2'
+
+
+def get_engine_version():
+    """OCR 引擎版本，由 easyocr 套件版本與前處理流程版本組成"""
+    try:
+        easyocr_version = metadata.version('easyocr')
+    except metadata.PackageNotFoundError:
+        easyocr_version = 'unknown'
+    return f'easyocr-{easyocr_version}+p{OCR_PIPELINE_VERSION}'
+
+
+def get_languages_key(languages):
+    return ','.join(sorted(languages))
+
+
+def file_sha256(file_field, chunk_size=1024 * 1024):
+    """以串流方式計算上傳檔案的 SHA-256，避免把整個檔案讀進記憶體"""
+    digest = hashlib.sha256()
+    with open(file_field.path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_cached_text(content_hash, languages):
+    """查詢 OCR 快取，命中時更新最後使用時間（LRU）並回傳文本，未命中回傳 None"""
+    if not getattr(settings, 'OCR_CACHE_ENABLED', True):
+        return None
+
+    entries = OCRCacheEntry.objects.filter(
+        content_hash=content_hash,
+        languages=get_languages_key(languages),
+        engine_version=get_engine_version(),
+    )
+    text = entries.values_list('text', flat=True).first()
+    if text is None:
+        return None
+
+    entries.update(last_used_at=timezone.now(), hit_count=F('hit_count') + 1)
+    return text
+
+
+def store_text(content_hash, languages, text):
+    """寫入 OCR 快取，超過容量上限時淘汰最久未使用的項目"""
+    if not getattr(settings, 'OCR_CACHE_ENABLED', True):
+        return
+
+    try:
+        OCRCacheEntry.objects.update_or_create(
+            content_hash=content_hash,
+            languages=get_languages_key(languages),
+            engine_version=get_engine_version(),
+            defaults={
+                'text': text,
+                'text_size': len(text.encode('utf-8')),
+                'last_used_at': timezone.now(),
+            },
+        )
+    except IntegrityError:
+        # 其他 worker 同時寫入了相同檔案的結果
+        return
+
+    prune_ocr_cache(
+        max_entries=getattr(settings, 'OCR_CACHE_MAX_ENTRIES', 5000),
+        max_bytes=getattr(settings, 'OCR_CACHE_MAX_BYTES', 200 * 1024 * 1024),
+    )
+
+
+def prune_ocr_cache(max_entries=None, max_bytes=None, max_age_days=None, stale_engine=False):
+    """依 LRU 順序淘汰快取項目，回傳刪除的筆數"""
+    deleted = 0
+
+    if stale_engine:
+        deleted += OCRCacheEntry.objects.exclude(engine_version=get_engine_version()).delete()[0]
+
+    if max_age_days is not None:
+        cutoff = timezone.now() - timedelta(days=max_age_days)
+        deleted += OCRCacheEntry.objects.filter(last_used_at__lt=cutoff).delete()[0]
+
+    if max_entries is not None:
+        excess = OCRCacheEntry.objects.count() - max_entries
+        if excess > 0:
+            ids = list(OCRCacheEntry.objects.order_by('last_used_at').values_list('id', flat=True)[:excess])
+            deleted += OCRCacheEntry.objects.filter(id__in=ids).delete()[0]
+
+    if max_bytes is not None:
+        total = OCRCacheEntry.objects.aggregate(total=Sum('text_size'))['total'] or 0
+        if total > max_bytes:
+            ids = []
+            for entry_id, size in OCRCacheEntry.objects.order_by('last_used_at').values_list('id', 'text_size'):
+                if total <= max_bytes:
+                    break
+                ids.append(entry_id)
+                total -= size
+            deleted += OCRCacheEntry.objects.filter(id__in=ids).delete()[0]
+
+    return deleted
@@ -0,0 +1,133 @@
+import gc
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+OCR_LANGUAGES = ['ch_tra', 'en']
+
+
+class OCRReaderPool:
+    """同一個 worker 行程內共用的 EasyOCR reader 池，避免每份作業都重新載入模型權重"""
+
+    def __init__(self, languages, size=1, idle_timeout=600):
+        self.languages = list(languages)
+        self.size = max(1, size)
+        self.idle_timeout = idle_timeout
+        self._idle = []  # [(reader, 最後使用時間)]
+        self._created = 0
+        self._condition = threading.Condition()
+        self._reaper = None
+
+    def _create_reader(self):
+        # 延遲載入，web 行程不會因為引用本模組而載入 torch / easyocr
+        import easyocr
+
+        return easyocr.Reader(self.languages, gpu=False)
+
+    def warm_up(self):
+        """預先載入 reader 直到池滿，供 worker 行程啟動時呼叫"""
+        while True:
+            with self._condition:
+                if self._created >= self.size:
+                    break
+                self._created += 1
+            try:
+                reader = self._create_reader()
+            except Exception:
+                with self._condition:
+                    self._created -= 1
+                raise
+            self._release(reader)
+
+    @contextmanager
+    def acquire(self):
+        """取得一個 reader，使用完畢後自動歸還到池中"""
+        reader = None
+        with self._condition:
+            while not self._idle and self._created >= self.size:
+                self._condition.wait()
+            if self._idle:
+                reader, _ = self._idle.pop()
+            else:
+                self._created += 1
+
+        if reader is None:
+            try:
+                reader = self._create_reader()
+            except Exception:
+                with self._condition:
+                    self._created -= 1
+                    self._condition.notify()
+                raise
+
+        try:
+            yield reader
+        finally:
+            self._release(reader)
+
+    def _release(self, reader):
+        with self._condition:
+            self._idle.append((reader, time.monotonic()))
+            self._condition.notify()
+            self._start_reaper()
+
+    def _start_reaper(self):
+        if self.idle_timeout <= 0:
+            return
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+        self._reaper = threading.Thread(target=self._reap_loop, name='ocr-reader-reaper', daemon=True)
+        self._reaper.start()
+
+    def _reap_loop(self):
+        interval = min(self.idle_timeout, 60)
+        while True:
+            time.sleep(interval)
+            self.evict_idle()
+            with self._condition:
+                if self._created == 0:
+                    self._reaper = None
+                    return
+
+    def evict_idle(self, force=False):
+        """釋放閒置超過 idle_timeout 的 reader，回收模型佔用的記憶體"""
+        now = time.monotonic()
+        with self._condition:
+            keep = []
+            evicted = 0
+            for reader, last_used in self._idle:
+                if force or now - last_used >= self.idle_timeout:
+                    evicted += 1
+                else:
+                    keep.append((reader, last_used))
+            self._idle = keep
+            self._created -= evicted
+
+        if evicted:
+            import torch
+
+            gc.collect()
+            if torch.backends.mps.is_available():
+                torch.mps.empty_cache()
+        return evicted
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_reader_pool(languages=None):
+    """依語言組合取得行程內共用的 reader 池"""
+    languages = tuple(languages or OCR_LANGUAGES)
+    with _pools_lock:
+        pool = _pools.get(languages)
+        if pool is None:
+            pool = OCRReaderPool(
+                languages,
+                size=getattr(settings, 'OCR_READER_POOL_SIZE', 1),
+                idle_timeout=getattr(settings, 'OCR_READER_IDLE_TIMEOUT', 600),
+            )
+            _pools[languages] = pool
+        return pool
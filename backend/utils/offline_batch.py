@@ -0,0 +1,253 @@
+import json
+import os
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models.student_course_tasks import StudentCourseTask
+from .analysis_utils import (
+    build_analysis_messages,
+    build_request,
+    get_analysis_cache_key,
+    get_analysis_prompt_version,
+    get_response_format,
+    parse_analysis_response,
+    with_local_tool_counts,
+)
+from .llm_cache import get_cached_response, store_response
+from .llm_client import LLMError, get_llm_engine
+from .llm_json import LLMOutputError
+from .rollup_utils import apply_rollup_changes
+from .transcript_chunks import merge_analysis_results, split_transcript
+
+# OpenAI Batch 的終止狀態，其餘狀態（validating、in_progress、finalizing...）需繼續輪詢
+TERMINAL_STATUSES = {'completed', 'failed', 'expired', 'cancelled'}
+CHAT_COMPLETIONS_URL = '/v1/chat/completions'
+
+
+def get_custom_id(task_id, chunk_index=0, chunk_count=1):
+    if chunk_count == 1:
+        return f'task-{task_id}'
+    return f'task-{task_id}-{chunk_index}-{chunk_count}'
+
+
+def parse_custom_id(custom_id):
+    """回傳 (作業 ID, 段落序號, 段落總數)"""
+    parts = custom_id.split('-')
+    if len(parts) == 2:
+        return int(parts[1]), 0, 1
+    return int(parts[1]), int(parts[2]), int(parts[3])
+
+
+def get_batch_dir():
+    # JSONL 內含學生的 OCR 全文，需放在 MEDIA_ROOT 以外、不會被 nginx 公開的目錄
+    batch_dir = settings.LLM_BATCH_DIR
+    os.makedirs(batch_dir, mode=0o700, exist_ok=True)
+    return batch_dir
+
+
+def delete_batch_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def write_batch_file(batch_id, tasks, model):
+    """將每份作業的請求寫成 Batch API 的 JSONL 輸入檔（過長的文本切成多個請求），回傳檔案路徑"""
+    path = os.path.join(get_batch_dir(), f'{batch_id}.jsonl')
+    max_tokens = getattr(settings, 'LLM_CHUNK_MAX_TOKENS', 6000)
+    response_format = get_response_format()
+    with open(path, 'w', encoding='utf-8') as f:
+        for task in tasks:
+            chunks = split_transcript(task.ocr_content, max_tokens)
+            for index, chunk in enumerate(chunks):
+                f.write(json.dumps({
+                    'custom_id': get_custom_id(task.id, index, len(chunks)),
+                    'method': 'POST',
+                    'url': CHAT_COMPLETIONS_URL,
+                    'body': build_request(build_analysis_messages(chunk), model, response_format=response_format),
+                }, ensure_ascii=False) + '\n')
+    return path
+
+
+class OpenAIBatchBackend:
+    """透過 OpenAI Batch API 送出（24 小時內完成，費用較即時請求低）"""
+
+    def _get_client(self):
+        import openai
+
+        api_key = os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            raise LLMError('OpenAI API 密鑰未設置', retryable=False)
+        return openai.OpenAI(api_key=api_key, base_url=getattr(settings, 'OPENAI_BASE_URL', None))
+
+    def submit(self, batch_id, path):
+        client = self._get_client()
+        with open(path, 'rb') as f:
+            input_file = client.files.create(file=f, purpose='batch')
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=CHAT_COMPLETIONS_URL,
+            completion_window='24h',
+            metadata={'analysis_batch_id': batch_id},
+        )
+        return batch.id
+
+    def retrieve(self, external_batch_id):
+        """回傳 (狀態, 輸出 JSONL 文字)，尚未結束時輸出為 None"""
+        client = self._get_client()
+        batch = client.batches.retrieve(external_batch_id)
+        if batch.status not in TERMINAL_STATUSES:
+            return batch.status, None
+        output = ''
+        if batch.output_file_id:
+            output = client.files.content(batch.output_file_id).text
+        return batch.status, output
+
+    def discard(self, external_batch_id):
+        """刪除 OpenAI 端保存的輸入與輸出檔"""
+        client = self._get_client()
+        batch = client.batches.retrieve(external_batch_id)
+        for file_id in (batch.input_file_id, batch.output_file_id, batch.error_file_id):
+            if file_id:
+                client.files.delete(file_id)
+
+
+class LocalBatchBackend:
+    """
+    本機替代實作：送出時以 LLM 引擎並行處理 JSONL 中的請求，
+    並寫出與 Batch API 相同格式的輸出檔，可搭配 stub server 測試離線流程
+    """
+
+    def _get_output_path(self, external_batch_id):
+        return os.path.join(get_batch_dir(), f'{external_batch_id}.output.jsonl')
+
+    def submit(self, batch_id, path):
+        with open(path, encoding='utf-8') as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+
+        engine = get_llm_engine()
+        responses = engine.complete_many([request['body'] for request in requests])
+
+        external_batch_id = f'local_batch_{uuid.uuid4().hex}'
+        with open(self._get_output_path(external_batch_id), 'w', encoding='utf-8') as f:
+            for request, response in zip(requests, responses):
+                line = {'id': f'local_req_{uuid.uuid4().hex}', 'custom_id': request['custom_id']}
+                if isinstance(response, Exception):
+                    line.update(response=None, error={'message': str(response)})
+                else:
+                    line.update(response={
+                        'status_code': 200,
+                        'body': {'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': response}}]},
+                    }, error=None)
+                f.write(json.dumps(line, ensure_ascii=False) + '\n')
+        return external_batch_id
+
+    def retrieve(self, external_batch_id):
+        with open(self._get_output_path(external_batch_id), encoding='utf-8') as f:
+            return 'completed', f.read()
+
+    def discard(self, external_batch_id):
+        delete_batch_file(self._get_output_path(external_batch_id))
+
+
+def get_batch_backend():
+    if getattr(settings, 'LLM_BATCH_BACKEND', 'openai') == 'local':
+        return LocalBatchBackend()
+    return OpenAIBatchBackend()
+
+
+def parse_batch_output(output):
+    """
+    解析 Batch 輸出檔，回傳 ({作業 ID: 分析結果}, {作業 ID: 錯誤訊息}, 截斷後修復的作業 ID)；
+    切段的作業全部段落成功才合併，任一段落被截斷時整份作業視為部分結果
+    """
+    chunk_results = {}
+    chunk_counts = {}
+    errors = {}
+    partial = set()
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        task_id, chunk_index, chunk_count = parse_custom_id(item['custom_id'])
+        chunk_counts[task_id] = chunk_count
+        response = item.get('response')
+        if item.get('error') or not response or response.get('status_code') != 200:
+            error = item.get('error') or (response or {}).get('body', {}).get('error') or {}
+            errors.setdefault(task_id, f"Batch 請求失敗: {error.get('message', '未知錯誤')}")
+            continue
+        content = response['body']['choices'][0]['message']['content']
+        try:
+            analysis_result, is_partial = parse_analysis_response(content)
+        except (json.JSONDecodeError, LLMOutputError) as e:
+            errors.setdefault(task_id, f'GPT-4o 回應解析失敗: {str(e)}, 原始回應: {content}')
+            continue
+        if is_partial:
+            partial.add(task_id)
+        chunk_results.setdefault(task_id, {})[chunk_index] = analysis_result
+
+    results = {}
+    for task_id, chunks in chunk_results.items():
+        if task_id in errors:
+            continue
+        if len(chunks) < chunk_counts[task_id]:
+            errors[task_id] = f'Batch 輸出缺少部分段落 ({len(chunks)}/{chunk_counts[task_id]})'
+            continue
+        ordered = [chunks[index] for index in range(chunk_counts[task_id])]
+        results[task_id] = ordered[0] if len(ordered) == 1 else merge_analysis_results(ordered)
+    return results, errors, partial & set(results)
+
+
+def apply_batch_results(results, model, cache_results=True, partial=()):
+    """
+    以 bulk_update 一次寫回所有作業的分析結果並標記為已分析，回傳寫入的作業 ID；
+    partial 中的作業為截斷後修復的部分結果，不寫入快取
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # 鎖定作業列，讓彙總增量以寫入前的值計算
+        tasks = list(StudentCourseTask.objects.select_for_update().filter(id__in=results))
+        rollup_changes = []
+        for task in tasks:
+            analysis_result = with_local_tool_counts(results[task.id], task.ocr_content)
+            old_values = {
+                'assistive_tool_analysis': task.assistive_tool_analysis, 'prompt_analysis': task.prompt_analysis
+            }
+            task.assistive_tool_analysis = analysis_result.get("assistive_tool_analysis", {})
+            task.prompt_analysis = analysis_result.get("prompt_analysis", {})
+            task.is_analyzed = True
+            task.updated_at = now  # bulk_update 不會觸發 auto_now
+            rollup_changes.append((task.course_task_id, old_values, {
+                'assistive_tool_analysis': task.assistive_tool_analysis, 'prompt_analysis': task.prompt_analysis
+            }))
+        StudentCourseTask.objects.bulk_update(
+            tasks, ['assistive_tool_analysis', 'prompt_analysis', 'is_analyzed', 'updated_at'], batch_size=200
+        )
+        # bulk_update 不經過 save()，需自行以增量更新課程任務的彙總
+        apply_rollup_changes(rollup_changes)
+
+    if cache_results:
+        for task in tasks:
+            if task.ocr_content and task.id not in partial:
+                store_response(
+                    get_analysis_cache_key(task.ocr_content, model), model,
+                    get_analysis_prompt_version(), results[task.id]
+                )
+    return [task.id for task in tasks]
+
+
+def split_cached(tasks, model):
+    """分出命中 LLM 快取的作業，回傳 ({作業 ID: 快取結果}, 需送出的作業)"""
+    cached = {}
+    to_submit = []
+    for task in tasks:
+        cached_result = get_cached_response(get_analysis_cache_key(task.ocr_content, model))
+        if cached_result is not None:
+            cached[task.id] = cached_result
+        else:
+            to_submit.append(task)
+    return cached, to_submit
@@ -0,0 +1,209 @@
+import json
+
+from django.conf import settings
+
+from .analysis_utils import (
+    analyze_assist_tools_and_prompt,
+    analyze_chunks_many,
+    build_request,
+    get_analysis_cache_key,
+    get_analysis_prompt_version,
+    get_system_prompt,
+    save_assist_tools_analysis,
+    use_local_tool_counter,
+)
+from .llm_cache import get_cached_response, store_response
+from .llm_client import LLMError, get_llm_engine
+from .llm_json import (
+    LLMOutputError, build_packed_schema, build_response_format, normalize_analysis_result, parse_llm_json
+)
+from .transcript_chunks import split_transcript
+
+# 多份作業合併成一個請求時附加的說明，系統提示詞只需送一次
+PACKED_PROMPT_SUFFIX = """
+本次會一次提供多份學生作業的OCR文本，每份文本以 <submission id="編號"> 與 </submission> 標記。
+請對每份文本分別依上述規則獨立分析，不可混用不同文本的內容，並改以下列格式回覆：
+{
+  "results": [
+    {"id": "編號", ...上述格式中的各欄位},
+    ...
+  ]
+}
+每份文本都必須有一筆對應 id 的結果，各欄位的格式與上述相同。
+"""
+
+
+def get_packed_system_prompt():
+    return get_system_prompt() + PACKED_PROMPT_SUFFIX
+
+
+def build_packed_messages(tasks):
+    """將多份作業的 OCR 文本以 id 標記後組合成單一請求"""
+    submissions = '\n\n'.join(
+        f'<submission id="{task.id}">\n{task.ocr_content}\n</submission>' for task in tasks
+    )
+    return [
+        {"role": "system", "content": get_packed_system_prompt()},
+        {"role": "user", "content": f"以下是 {len(tasks)} 份OCR提取的文本內容，請分別分析：\n\n{submissions}"}
+    ]
+
+
+def pack_tasks(tasks, max_chars, max_items):
+    """依文本長度貪婪地將作業分組，每組總長度不超過 max_chars 且不超過 max_items 份"""
+    packs = []
+    current = []
+    current_chars = 0
+    for task in tasks:
+        size = len(task.ocr_content)
+        if current and (current_chars + size > max_chars or len(current) >= max_items):
+            packs.append(current)
+            current = []
+            current_chars = 0
+        current.append(task)
+        current_chars += size
+    if current:
+        packs.append(current)
+    return packs
+
+
+def get_packed_response_format():
+    if not getattr(settings, 'LLM_STRUCTURED_OUTPUT', True):
+        return None
+    return build_response_format(
+        'packed_assist_tools_analysis', build_packed_schema(include_tools=not use_local_tool_counter())
+    )
+
+
+def parse_packed_response(content):
+    """
+    解析合併請求的回覆，回傳 {作業 ID 字串: 分析結果}；格式不符的項目不列入，
+    回覆被截斷時仍保留已完整的項目，最後一項可能只剩部分內容也不採用，其餘作業改以單份請求分析
+    """
+    try:
+        parsed, partial = parse_llm_json(content)
+    except json.JSONDecodeError:
+        return {}
+    items = parsed.get('results') if isinstance(parsed, dict) else None
+    if not isinstance(items, list):
+        return {}
+    if partial:
+        items = items[:-1]
+
+    results = {}
+    for item in items:
+        if not isinstance(item, dict) or 'id' not in item:
+            continue
+        try:
+            # 本機統計輔助工具次數時提示詞不要求 assistive_tool_analysis
+            results[str(item['id'])] = normalize_analysis_result(item, include_tools=not use_local_tool_counter())
+        except LLMOutputError:
+            continue
+    return results
+
+
+def analyze_assist_tools_and_prompt_packed(tasks):
+    """
+    將多份較短的作業合併成少數幾個 LLM 請求進行分析，回傳 {作業 ID: 分析結果}。
+    命中快取的作業不送出；過長的作業、合併回覆中缺少或格式錯誤的作業改以單份請求並行分析。
+    """
+    model = getattr(settings, 'LLM_MODEL', 'gpt-4o')
+    item_max_chars = getattr(settings, 'LLM_PACK_ITEM_MAX_CHARS', 3000)
+    results = {}
+    packable = []
+    singles = []
+
+    for task in tasks:
+        if not task.ocr_content:
+            # 尚無 OCR 內容，由單份分析流程先進行 OCR
+            singles.append(task)
+            continue
+        cached_result = get_cached_response(get_analysis_cache_key(task.ocr_content, model))
+        if cached_result is not None:
+            results[task.id] = save_assist_tools_analysis(task, cached_result, cached=True)
+        elif len(task.ocr_content) > item_max_chars:
+            singles.append(task)
+        else:
+            packable.append(task)
+
+    packs = pack_tasks(
+        packable,
+        max_chars=getattr(settings, 'LLM_PACK_MAX_CHARS', 12000),
+        max_items=getattr(settings, 'LLM_PACK_MAX_ITEMS', 8),
+    )
+    singles += [pack[0] for pack in packs if len(pack) == 1]
+    packs = [pack for pack in packs if len(pack) > 1]
+
+    if packs:
+        try:
+            engine = get_llm_engine()
+        except LLMError as e:
+            for task in [task for pack in packs for task in pack]:
+                results[task.id] = {'success': False, 'message': str(e)}
+            packs = []
+
+    if packs:
+        output_tokens = getattr(settings, 'LLM_PACK_OUTPUT_TOKENS_PER_ITEM', 800)
+        response_format = get_packed_response_format()
+        responses = engine.complete_many([
+            build_request(
+                build_packed_messages(pack), model,
+                max_tokens=output_tokens * len(pack), response_format=response_format
+            )
+            for pack in packs
+        ])
+
+        for pack, response in zip(packs, responses):
+            items = {} if isinstance(response, Exception) else parse_packed_response(response)
+            for task in pack:
+                analysis_result = items.get(str(task.id))
+                if analysis_result is None:
+                    singles.append(task)
+                    continue
+                store_response(
+                    get_analysis_cache_key(task.ocr_content, model), model,
+                    get_analysis_prompt_version(), analysis_result
+                )
+                result = save_assist_tools_analysis(task, analysis_result)
+                if result['success']:
+                    result['packed'] = len(pack)
+                results[task.id] = result
+
+    results.update(analyze_singles(singles, model))
+    return results
+
+
+def analyze_singles(tasks, model):
+    """
+    以單份請求分析過長、或合併回覆中缺少與格式錯誤的作業；已有 OCR 內容的作業（含切段）一次並行送出，
+    不在 chord callback 中逐份等待回應，尚無 OCR 內容的作業仍走完整的單份分析流程
+    """
+    results = {}
+    ready = []
+    for task in tasks:
+        if task.ocr_content:
+            ready.append(task)
+        else:
+            results[task.id] = analyze_assist_tools_and_prompt(task)
+    if not ready:
+        return results
+
+    try:
+        engine = get_llm_engine()
+    except LLMError as e:
+        for task in ready:
+            results[task.id] = {'success': False, 'message': str(e)}
+        return results
+
+    max_tokens = getattr(settings, 'LLM_CHUNK_MAX_TOKENS', 6000)
+    outcomes = analyze_chunks_many(engine, [split_transcript(task.ocr_content, max_tokens) for task in ready], model)
+    for task, outcome in zip(ready, outcomes):
+        if not outcome['success']:
+            results[task.id] = outcome
+            continue
+        # 截斷後修復的部分結果不寫入快取
+        if not outcome.get('partial'):
+            store_response(
+                get_analysis_cache_key(task.ocr_content, model), model, get_analysis_prompt_version(), outcome['data']
+            )
+        results[task.id] = save_assist_tools_analysis(task, outcome['data'], partial=outcome.get('partial', False))
+    return results
@@ -0,0 +1,117 @@
+import multiprocessing
+import os
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+
+from django.conf import settings
+
+# 使用 poppler-utils（Dockerfile 已安裝）處理 PDF：pdftotext 取文字層、pdftoppm 逐頁轉圖
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def is_pdf(path):
+    with open(path, 'rb') as f:
+        return f.read(5) == b'%PDF-'
+
+
+def get_page_count(path):
+    output = subprocess.run(
+        ['pdfinfo', path], capture_output=True, text=True, check=True
+    ).stdout
+    for line in output.splitlines():
+        if line.startswith('Pages:'):
+            return int(line.split(':', 1)[1])
+    return 0
+
+
+def extract_text_layer(path):
+    """取出 PDF 內嵌文字層，回傳每頁的文字（依頁碼順序）"""
+    output = subprocess.run(
+        ['pdftotext', '-layout', '-enc', 'UTF-8', path, '-'],
+        capture_output=True, text=True, check=True
+    ).stdout
+    # pdftotext 以換頁字元分隔各頁，最後一頁後也會有一個
+    pages = output.split('\f')
+    if pages and not pages[-1].strip():
+        pages = pages[:-1]
+    return pages
+
+
+def has_text(page_text):
+    min_chars = getattr(settings, 'OCR_PDF_MIN_TEXT_CHARS', 20)
+    return len(''.join(page_text.split())) >= min_chars
+
+
+def ocr_page(path, page_number, dpi):
+    """將單一頁面轉成圖片後進行 OCR，於子行程中執行"""
+    from .image_tiling import ocr_image
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prefix = os.path.join(tmp_dir, 'page')
+        subprocess.run(
+            ['pdftoppm', '-f', str(page_number), '-l', str(page_number),
+             '-r', str(dpi), '-gray', '-png', '-singlefile', path, prefix],
+            capture_output=True, check=True
+        )
+        return '\n'.join(ocr_image(f'{prefix}.png'))
+
+
+def _init_worker():
+    # spawn 出來的子行程需要重新初始化 Django 才能讀取設定
+    import django
+
+    django.setup()
+
+
+def _get_executor():
+    """行程內共用的頁面 OCR 行程池，子行程的 OCR reader 會在多份作業之間重複使用"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # 使用 spawn 避免 fork 已載入 torch 的 worker 行程
+            _executor = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'OCR_PDF_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def ocr_pdf(path):
+    """PDF 文字擷取：有文字層的頁面直接使用，其餘頁面逐頁轉圖並平行 OCR，結果依頁碼排序合併"""
+    dpi = getattr(settings, 'OCR_PDF_DPI', 200)
+    page_count = get_page_count(path)
+    page_texts = extract_text_layer(path)
+    page_texts += [''] * (page_count - len(page_texts))
+
+    pending = [number for number, text in enumerate(page_texts, start=1) if not has_text(text)]
+    if not pending:
+        return '\n'.join(text.strip() for text in page_texts)
+
+    if getattr(settings, 'OCR_PDF_WORKERS', 2) > 1 and len(pending) > 1:
+        try:
+            executor = _get_executor()
+            futures = {number: executor.submit(ocr_page, path, number, dpi) for number in pending}
+            for number, future in futures.items():
+                page_texts[number - 1] = future.result()
+                pending.remove(number)
+        except (OSError, AssertionError, BrokenExecutor):
+            # 無法建立子行程（例如在 daemon 行程內）或行程池損壞時改為在本行程逐頁處理
+            _reset_executor()
+
+    for number in pending:
+        page_texts[number - 1] = ocr_page(path, number, dpi)
+
+    return '\n'.join(text.strip() for text in page_texts)
@@ -0,0 +1,115 @@
+import io
+import struct
+import zlib
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# 各色彩類型的通道數與對應的 Pillow 模式，只支援每通道 8 位元（螢幕截圖的常見格式）
+COLOR_TYPES = {0: (1, 'L'), 2: (3, 'RGB'), 3: (1, 'P'), 4: (2, 'LA'), 6: (4, 'RGBA')}
+# 解碼條帶時需一併帶入的輔助區塊（調色盤與透明色）
+COPIED_CHUNKS = (b'PLTE', b'tRNS')
+
+
+class UnsupportedPNGError(ValueError):
+    """無法逐條帶解碼的 PNG（交錯式、非 8 位元等），改為整張解碼"""
+
+
+def _chunk(chunk_type, data):
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+
+class PNGRowReader:
+    """
+    依序解碼 PNG 的掃描列，記憶體只與每次讀取的列數有關。
+    壓縮資料以 zlib 串流解壓；過濾器的還原交給 Pillow：每次讀取的列前面加上已還原的上一列（過濾類型 0），
+    組成只含這些列的小 PNG 再解碼，結果與整張解碼相同
+    """
+
+    def __init__(self, path):
+        self.fp = open(path, 'rb')
+        try:
+            self._read_header()
+        except Exception:
+            self.fp.close()
+            raise
+
+    def _read_header(self):
+        if self.fp.read(8) != PNG_SIGNATURE:
+            raise UnsupportedPNGError('不是 PNG 檔案')
+        chunk_type, data = self._read_chunk()
+        if chunk_type != b'IHDR':
+            raise UnsupportedPNGError('缺少 IHDR')
+        self.width, self.height, bit_depth, self.color_type, _, _, interlace = struct.unpack('>IIBBBBB', data)
+        if bit_depth != 8 or interlace or self.color_type not in COLOR_TYPES:
+            raise UnsupportedPNGError('只支援非交錯式、每通道 8 位元的 PNG')
+        channels, self.mode = COLOR_TYPES[self.color_type]
+        self.row_bytes = self.width * channels
+
+        self.extra_chunks = b''
+        while True:
+            chunk_type, data = self._read_chunk()
+            if chunk_type == b'IDAT':
+                break
+            if chunk_type == b'IEND':
+                raise UnsupportedPNGError('缺少影像資料')
+            if chunk_type in COPIED_CHUNKS:
+                self.extra_chunks += _chunk(chunk_type, data)
+
+        self._input = data
+        self._decompressor = zlib.decompressobj()
+        # 第一列的「上一列」依規格視為全 0
+        self._previous_row = bytes(self.row_bytes)
+        self.next_row = 0
+
+    def _read_chunk(self):
+        header = self.fp.read(8)
+        if len(header) < 8:
+            raise UnsupportedPNGError('PNG 資料不完整')
+        length, chunk_type = struct.unpack('>I4s', header)
+        data = self.fp.read(length)
+        self.fp.read(4)  # CRC
+        return chunk_type, data
+
+    def _read_filtered(self, count):
+        """解壓 count 列尚未還原過濾器的掃描列（每列開頭一個過濾類型位元組）"""
+        remaining = count * (self.row_bytes + 1)
+        parts = []
+        while remaining:
+            if not self._input:
+                chunk_type, self._input = self._read_chunk()
+                if chunk_type == b'IEND':
+                    raise UnsupportedPNGError('PNG 資料不完整')
+                if chunk_type != b'IDAT':
+                    self._input = b''
+                    continue
+            output = self._decompressor.decompress(self._input, remaining)
+            self._input = self._decompressor.unconsumed_tail
+            parts.append(output)
+            remaining -= len(output)
+        return b''.join(parts)
+
+    def read_rows(self, count):
+        """讀取接下來的 count 列，回傳 Pillow Image（PNG 原本的色彩模式）"""
+        from PIL import Image
+
+        count = min(count, self.height - self.next_row)
+        if count <= 0:
+            raise ValueError('已讀完所有列')
+        data = b'\x00' + self._previous_row + self._read_filtered(count)
+        header = struct.pack('>IIBBBBB', self.width, count + 1, 8, self.color_type, 0, 0, 0)
+        png = (
+            PNG_SIGNATURE + _chunk(b'IHDR', header) + self.extra_chunks
+            + _chunk(b'IDAT', zlib.compress(data, 0)) + _chunk(b'IEND', b'')
+        )
+        with Image.open(io.BytesIO(png)) as strip:
+            rows = strip.crop((0, 1, self.width, count + 1))
+
+        self._previous_row = rows.crop((0, count - 1, self.width, count)).tobytes()
+        self.next_row += count
+        return rows
+
+    def skip_rows(self, count, batch=1000):
+        while count > 0:
+            count -= self.read_rows(min(count, batch)).height
+
+    def close(self):
+        self.fp.close()
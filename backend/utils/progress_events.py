@@ -0,0 +1,103 @@
+import json
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Celery 各階段完成時發佈到 Redis pub/sub，SSE 端點訂閱後即時轉送給前端
+EVENT_OCR_DONE = 'ocr_done'
+EVENT_KEYWORDS_DONE = 'keywords_done'
+EVENT_LLM_DONE = 'llm_done'
+EVENT_FAILED = 'failed'
+EVENT_COMPLETED = 'completed'
+
+_redis_client = None
+
+
+def get_channel(batch_id):
+    return f'analysis-batch:{batch_id}'
+
+
+def _get_redis_url():
+    return getattr(settings, 'ANALYSIS_EVENTS_REDIS_URL', settings.CELERY_BROKER_URL)
+
+
+def _get_redis():
+    global _redis_client
+    if _redis_client is None:
+        import redis
+
+        _redis_client = redis.Redis.from_url(_get_redis_url())
+    return _redis_client
+
+
+def events_enabled():
+    return getattr(settings, 'ANALYSIS_EVENTS_ENABLED', True)
+
+
+def publish_event(batch_id, event, **data):
+    """發佈分析進度事件，事件僅供即時顯示，發佈失敗不影響分析流程"""
+    if not batch_id or not events_enabled():
+        return
+    try:
+        _get_redis().publish(get_channel(batch_id), json.dumps({'event': event, **data}))
+    except Exception as e:
+        logger.warning(f"分析進度事件發佈失敗，批次 ID: {batch_id}，錯誤: {str(e)}")
+
+
+def _format_sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+async def stream_batch_events(batch_id):
+    """
+    以 Server-Sent Events 格式逐筆產生批次的進度事件，批次結束、被刪除或超過 ANALYSIS_EVENTS_MAX_DURATION 後結束；
+    超過上限而關閉時前端的 EventSource 會觸發 onerror，改以輪詢取得進度
+    """
+    import redis.asyncio as aioredis
+
+    from .progress_utils import get_batch_progress
+
+    heartbeat = getattr(settings, 'ANALYSIS_EVENTS_HEARTBEAT', 15)
+    deadline = time.monotonic() + getattr(settings, 'ANALYSIS_EVENTS_MAX_DURATION', 60 * 60)
+    client = aioredis.Redis.from_url(_get_redis_url())
+    pubsub = client.pubsub()
+    try:
+        # 先訂閱再讀取目前進度，避免兩者之間發生的事件遺失
+        await pubsub.subscribe(get_channel(batch_id))
+        progress = await sync_to_async(get_batch_progress)(batch_id)
+        if progress is None:
+            return
+        yield _format_sse('progress', progress)
+        if progress['status'] != 'RUNNING':
+            yield _format_sse(EVENT_COMPLETED, progress)
+            return
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=min(heartbeat, remaining))
+            if message is None:
+                # 完成事件可能因發佈失敗而遺失，無事件時重新確認批次狀態
+                progress = await sync_to_async(get_batch_progress)(batch_id)
+                if progress is None:
+                    return
+                if progress['status'] != 'RUNNING':
+                    yield _format_sse(EVENT_COMPLETED, progress)
+                    return
+                # 保持連線，避免被代理伺服器關閉
+                yield ': keep-alive\n\n'
+                continue
+
+            data = json.loads(message['data'])
+            yield _format_sse(data['event'], data)
+            if data['event'] == EVENT_COMPLETED:
+                return
+    finally:
+        await pubsub.unsubscribe(get_channel(batch_id))
+        await pubsub.close()
+        await client.close()
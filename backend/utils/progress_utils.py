@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models.analysis_batch_marks import AnalysisBatchMark
+from ..models.analysis_batches import AnalysisBatch
+from .progress_events import EVENT_COMPLETED, EVENT_FAILED, events_enabled, publish_event
+
+# 分析階段對應的進度欄位
+STAGE_FIELDS = {
+    'ocr': 'ocr_done',
+    'keywords': 'keywords_done',
+    'llm': 'llm_done',
+}
+
+
+def _publish(batch_id, event, **data):
+    # 事件附上最新進度，前端不需再輪詢
+    if events_enabled():
+        publish_event(batch_id, event, progress=get_batch_progress(batch_id), **data)
+
+
+def create_batch(batch_id, course_task_id, total, mode=AnalysisBatch.MODE_INTERACTIVE):
+    status = AnalysisBatch.STATUS_RUNNING if total else AnalysisBatch.STATUS_SUCCESS
+    return AnalysisBatch.objects.create(
+        id=batch_id,
+        course_task_id=course_task_id,
+        total=total,
+        mode=mode,
+        status=status,
+        finished_at=None if total else timezone.now(),
+    )
+
+
+def _increment_once(batch_id, task_id, stage, field):
+    """每份作業的每個階段只累加一次：標記與計數在同一個交易中寫入，重新投遞的任務找到既有標記時不再累加"""
+    with transaction.atomic():
+        _, created = AnalysisBatchMark.objects.get_or_create(batch_id=batch_id, task_id=task_id, stage=stage)
+        if created:
+            AnalysisBatch.objects.filter(id=batch_id).update(**{field: F(field) + 1})
+    return created
+
+
+def record_stage_done(batch_id, stage, task_id=None):
+    """以單一 UPDATE 原子地累加階段完成數，不需要先讀取"""
+    if not batch_id:
+        return
+    if _increment_once(batch_id, task_id, stage, STAGE_FIELDS[stage]):
+        _publish(batch_id, f'{stage}_done', task_id=task_id)
+
+
+def record_task_finished(batch_id, success, task_id=None, stage=None, message=None):
+    if not batch_id:
+        return
+    field = 'completed' if success else 'failed'
+    if _increment_once(batch_id, task_id, AnalysisBatchMark.STAGE_FINISHED, field) and not success:
+        _publish(batch_id, EVENT_FAILED, task_id=task_id, stage=stage, message=message)
+
+
+def finish_batch(batch_id, status=AnalysisBatch.STATUS_SUCCESS):
+    """結束批次；FAILURE 表示 chord 未能正常完成（例如作業任務逾時或重試用盡），進度不會再更新"""
+    updated = AnalysisBatch.objects.filter(id=batch_id, status=AnalysisBatch.STATUS_RUNNING).update(
+        status=status,
+        finished_at=timezone.now(),
+    )
+    if updated:
+        _publish(batch_id, EVENT_COMPLETED)
+
+
+def get_batch_progress(batch_id):
+    """讀取單筆進度紀錄，查詢成本與批次大小無關"""
+    batch = AnalysisBatch.objects.filter(id=batch_id).first()
+    if batch is None:
+        return None
+
+    return {
+        'task_id': batch.id,
+        'status': batch.status,
+        'mode': batch.mode,
+        'total': batch.total,
+        'completed': batch.completed,
+        'failed': batch.failed,
+        'percentage': batch.percentage,
+        'stages': {stage: getattr(batch, field) for stage, field in STAGE_FIELDS.items()},
+    }
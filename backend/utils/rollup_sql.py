@@ -0,0 +1,111 @@
+from decimal import Decimal
+
+from django.db import connections
+
+# 各資料庫的彙總查詢，以 UNION ALL 一次取回作業數與三種分析的加總，篩選條件與 rollup_utils.get_rollup_contribution 相同：
+# 只加總數值（不含布林），提示詞需有 keyword、times 缺少時視為 0，非預期的 JSON 結構直接略過
+POSTGRESQL_ROLLUP_SQL = """
+SELECT 'count', NULL, COUNT(*)
+FROM student_course_tasks s
+WHERE s.course_task_id = %s
+UNION ALL
+SELECT 'assistive', t.key, SUM((t.value)::numeric)
+FROM student_course_tasks s
+CROSS JOIN LATERAL jsonb_each(
+    CASE WHEN jsonb_typeof(s.assistive_tool_analysis) = 'object' THEN s.assistive_tool_analysis ELSE '{}'::jsonb END
+) t
+WHERE s.course_task_id = %s AND jsonb_typeof(t.value) = 'number'
+GROUP BY t.key
+UNION ALL
+SELECT 'prompts', p.value ->> 'keyword', SUM(COALESCE((p.value -> 'times')::numeric, 0))
+FROM student_course_tasks s
+CROSS JOIN LATERAL jsonb_array_elements(
+    CASE WHEN jsonb_typeof(s.prompt_analysis -> 'prompts') = 'array' THEN s.prompt_analysis -> 'prompts' ELSE '[]'::jsonb END
+) p
+WHERE s.course_task_id = %s
+    AND jsonb_typeof(p.value) = 'object'
+    AND COALESCE(jsonb_typeof(p.value -> 'keyword'), 'null') <> 'null'
+    AND (p.value -> 'times' IS NULL OR jsonb_typeof(p.value -> 'times') = 'number')
+GROUP BY p.value ->> 'keyword'
+UNION ALL
+SELECT 'keywords', k.key, SUM((k.value)::numeric)
+FROM student_course_tasks s
+CROSS JOIN LATERAL jsonb_each(
+    CASE WHEN jsonb_typeof(s.keyword_analysis -> 'top_keywords') = 'object'
+        THEN s.keyword_analysis -> 'top_keywords' ELSE '{}'::jsonb END
+) k
+WHERE s.course_task_id = %s AND jsonb_typeof(k.value) = 'number'
+GROUP BY k.key
+"""
+
+SQLITE_ROLLUP_SQL = """
+SELECT 'count', NULL, COUNT(*)
+FROM student_course_tasks s
+WHERE s.course_task_id = %s
+UNION ALL
+SELECT 'assistive', t.key, SUM(t.value)
+FROM student_course_tasks s, json_each(
+    CASE WHEN json_type(s.assistive_tool_analysis) = 'object' THEN s.assistive_tool_analysis ELSE '{}' END
+) t
+WHERE s.course_task_id = %s AND t.type IN ('integer', 'real')
+GROUP BY t.key
+UNION ALL
+SELECT 'prompts', json_extract(p.value, '$.keyword'), SUM(COALESCE(json_extract(p.value, '$.times'), 0))
+FROM student_course_tasks s, json_each(
+    CASE WHEN json_type(s.prompt_analysis, '$.prompts') = 'array'
+        THEN json_extract(s.prompt_analysis, '$.prompts') ELSE '[]' END
+) p
+WHERE s.course_task_id = %s
+    AND p.type = 'object'
+    AND COALESCE(json_type(p.value, '$.keyword'), 'null') <> 'null'
+    AND COALESCE(json_type(p.value, '$.times'), 'integer') IN ('integer', 'real')
+GROUP BY json_extract(p.value, '$.keyword')
+UNION ALL
+SELECT 'keywords', k.key, SUM(k.value)
+FROM student_course_tasks s, json_each(
+    CASE WHEN json_type(s.keyword_analysis, '$.top_keywords') = 'object'
+        THEN json_extract(s.keyword_analysis, '$.top_keywords') ELSE '{}' END
+) k
+WHERE s.course_task_id = %s AND k.type IN ('integer', 'real')
+GROUP BY k.key
+"""
+
+ROLLUP_SQL = {
+    'postgresql': POSTGRESQL_ROLLUP_SQL,
+    'sqlite': SQLITE_ROLLUP_SQL,
+}
+
+PARTS = {
+    'assistive': 'all_assistive_tool_analysis',
+    'prompts': 'all_prompt_analysis',
+    'keywords': 'all_keyword_analysis',
+}
+
+
+def supports_sql_rollup(using='default'):
+    return connections[using].vendor in ROLLUP_SQL
+
+
+def _to_number(value):
+    # PostgreSQL 的 numeric 加總回傳 Decimal，轉回與 Python 加總相同的 int / float
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+def aggregate_course_task_rollup(course_task_id, using='default'):
+    """在資料庫端以 JSON 函式彙總課程任務下所有作業的分析結果，回傳格式與 compute_course_task_rollup 相同"""
+    connection = connections[using]
+    sql = ROLLUP_SQL.get(connection.vendor)
+    if sql is None:
+        raise NotImplementedError(f'不支援以 SQL 彙總的資料庫: {connection.vendor}')
+
+    rollup = {'student_tasks_count': 0, **{field: {} for field in PARTS.values()}}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [course_task_id] * sql.count('%s'))
+        for part, key, total in cursor.fetchall():
+            if part == 'count':
+                rollup['student_tasks_count'] = total
+            else:
+                rollup[PARTS[part]][key] = _to_number(total)
+    return rollup
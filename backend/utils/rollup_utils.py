@@ -0,0 +1,320 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from ..models.course_tasks import CourseTask
+from ..models.courses import Course
+from ..models.student_course_tasks import ROLLUP_FIELDS, StudentCourseTask
+from .rollup_sql import aggregate_course_task_rollup, supports_sql_rollup
+
+# 課程彙總重建排入後，等待 worker 開始執行的最長時間(秒)
+COURSE_ROLLUP_PENDING_TIMEOUT = 10 * 60
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def get_rollup_contribution(values):
+    """
+    一份作業對課程任務彙總的貢獻，values 為 {欄位: 分析結果}（可只含部分欄位），
+    回傳 {'assistive': {工具: 次數}, 'prompts': {提示詞: 次數}, 'keywords': {關鍵詞: 次數}}
+    """
+    contribution = {'assistive': {}, 'prompts': {}, 'keywords': {}}
+
+    # 處理輔助工具分析數據
+    assistive_data = values.get('assistive_tool_analysis')
+    if isinstance(assistive_data, dict):
+        for tool, value in assistive_data.items():
+            if _is_number(value):
+                contribution['assistive'][tool] = contribution['assistive'].get(tool, 0) + value
+
+    # 處理提示詞分析數據
+    prompt_data = values.get('prompt_analysis')
+    if isinstance(prompt_data, dict) and isinstance(prompt_data.get('prompts'), list):
+        for prompt_item in prompt_data['prompts']:
+            if not isinstance(prompt_item, dict):
+                continue
+            keyword = prompt_item.get('keyword')
+            times = prompt_item.get('times', 0)
+            if keyword is not None and _is_number(times):
+                contribution['prompts'][keyword] = contribution['prompts'].get(keyword, 0) + times
+
+    # 處理關鍵詞分析數據
+    keyword_data = values.get('keyword_analysis')
+    if isinstance(keyword_data, dict) and isinstance(keyword_data.get('top_keywords'), dict):
+        for keyword, count in keyword_data['top_keywords'].items():
+            if _is_number(count):
+                contribution['keywords'][keyword] = contribution['keywords'].get(keyword, 0) + count
+
+    return contribution
+
+
+def get_rollup_delta(old_values, new_values):
+    """作業的分析結果變動時對彙總的增量（新貢獻減去舊貢獻），只計算 new_values 中有的欄位"""
+    old_values = {field: (old_values or {}).get(field) for field in new_values}
+    old_contribution = get_rollup_contribution(old_values)
+    delta = get_rollup_contribution(new_values)
+    for part, counts in old_contribution.items():
+        for key, value in counts.items():
+            delta[part][key] = delta[part].get(key, 0) - value
+    return delta
+
+
+def compute_course_task_rollup(course_task_id):
+    """
+    彙總課程任務下所有學生作業的輔助工具、提示詞與關鍵詞分析（完整重新計算，供核對與修復使用）；
+    PostgreSQL / SQLite 在資料庫端以一個聚合查詢完成，其他資料庫逐份作業在 Python 中加總
+    """
+    if settings.ROLLUP_SQL_AGGREGATION and supports_sql_rollup():
+        return aggregate_course_task_rollup(course_task_id)
+    return compute_course_task_rollup_in_python(course_task_id)
+
+
+def compute_course_task_rollup_in_python(course_task_id):
+    """逐份讀取作業的分析結果在 Python 中加總"""
+    student_course_tasks = StudentCourseTask.objects.filter(
+        course_task_id=course_task_id
+    ).values(*ROLLUP_FIELDS)
+
+    totals = {'assistive': {}, 'prompts': {}, 'keywords': {}}
+    student_tasks_count = 0
+    for values in student_course_tasks:
+        student_tasks_count += 1
+        for part, counts in get_rollup_contribution(values).items():
+            for key, value in counts.items():
+                totals[part][key] = totals[part].get(key, 0) + value
+
+    return {
+        'student_tasks_count': student_tasks_count,
+        'all_assistive_tool_analysis': totals['assistive'],
+        'all_prompt_analysis': totals['prompts'],
+        'all_keyword_analysis': totals['keywords'],
+    }
+
+
+def _prompt_list_to_dict(prompt_analysis):
+    # CourseTask.all_prompt_analysis 以 [{"keyword", "times"}] 儲存
+    if isinstance(prompt_analysis, dict):
+        return dict(prompt_analysis)
+    return {
+        item['keyword']: item.get('times', 0)
+        for item in prompt_analysis or [] if isinstance(item, dict) and 'keyword' in item
+    }
+
+
+def _merge_counts(counts, delta, keep_zero=False):
+    merged = dict(counts or {})
+    for key, value in delta.items():
+        if not value:
+            continue
+        merged[key] = merged.get(key, 0) + value
+        # 輔助工具固定列出所有工具，提示詞與關鍵詞歸零時移除
+        if not keep_zero and merged[key] <= 0:
+            del merged[key]
+    return merged
+
+
+def apply_rollup_changes(changes):
+    """
+    以增量更新課程任務的彙總：changes 為 [(課程任務 ID, 舊分析結果, 新分析結果)]，
+    減去舊的貢獻並加上新的貢獻，不需重新掃描課程任務的所有作業。
+    須與作業本身的寫入在同一個交易中呼叫，彙總列以 select_for_update 鎖定避免並發更新互相覆蓋
+    """
+    deltas = {}
+    for course_task_id, old_values, new_values in changes:
+        total = deltas.setdefault(course_task_id, {'assistive': {}, 'prompts': {}, 'keywords': {}})
+        for part, counts in get_rollup_delta(old_values, new_values).items():
+            for key, value in counts.items():
+                total[part][key] = total[part].get(key, 0) + value
+
+    now = timezone.now()
+    course_ids = set()
+    for course_task_id, delta in deltas.items():
+        if not any(value for counts in delta.values() for value in counts.values()):
+            continue
+        current = CourseTask.objects.select_for_update().filter(id=course_task_id).values(
+            'course_id', 'all_assistive_tool_analysis', 'all_prompt_analysis', 'all_keyword_analysis'
+        ).first()
+        if current is None:
+            continue
+        course_ids.add(current['course_id'])
+        prompts = _merge_counts(_prompt_list_to_dict(current['all_prompt_analysis']), delta['prompts'])
+        CourseTask.objects.filter(id=course_task_id).update(
+            all_assistive_tool_analysis=_merge_counts(
+                current['all_assistive_tool_analysis'], delta['assistive'], keep_zero=True
+            ),
+            all_prompt_analysis=[{"keyword": keyword, "times": times} for keyword, times in prompts.items()],
+            all_keyword_analysis=_merge_counts(current['all_keyword_analysis'], delta['keywords']),
+            updated_at=now,
+        )
+    enqueue_course_rollup_refresh(course_ids)
+
+
+def get_course_task_rollup(course_task):
+    """讀取增量維護的課程任務彙總，格式與 compute_course_task_rollup 相同"""
+    return {
+        'student_tasks_count': StudentCourseTask.objects.filter(course_task_id=course_task.id).count(),
+        'all_assistive_tool_analysis': course_task.all_assistive_tool_analysis or {},
+        'all_prompt_analysis': _prompt_list_to_dict(course_task.all_prompt_analysis),
+        'all_keyword_analysis': course_task.all_keyword_analysis or {},
+    }
+
+
+def rollups_match(stored, computed):
+    """比較增量維護的彙總與完整重新計算的結果，忽略次數為 0 的項目與順序"""
+    for field in ('all_assistive_tool_analysis', 'all_prompt_analysis', 'all_keyword_analysis'):
+        stored_counts = {key: value for key, value in stored[field].items() if value}
+        computed_counts = {key: value for key, value in computed[field].items() if value}
+        if stored_counts != computed_counts:
+            return False
+    return True
+
+
+def save_course_task_rollup(course_task_id, rollup, refresh_course=True):
+    """將彙總結果寫回課程任務，refresh_course 為 False 時不排入課程彙總的重建（由呼叫端自行重建）"""
+    formatted_prompt_analysis = [
+        {"keyword": keyword, "times": times} for keyword, times in rollup['all_prompt_analysis'].items()
+    ]
+    CourseTask.objects.filter(id=course_task_id).update(
+        all_assistive_tool_analysis=rollup['all_assistive_tool_analysis'],
+        all_prompt_analysis=formatted_prompt_analysis,
+        all_keyword_analysis=rollup['all_keyword_analysis'],
+        updated_at=timezone.now(),
+    )
+    if refresh_course:
+        enqueue_course_rollup_refresh(
+            CourseTask.objects.filter(id=course_task_id).values_list('course_id', flat=True)
+        )
+
+
+def refresh_course_task_rollup(course_task_id, refresh_course=True):
+    rollup = compute_course_task_rollup(course_task_id)
+    save_course_task_rollup(course_task_id, rollup, refresh_course)
+    return rollup
+
+
+def get_course_rollup_pending_key(course_id):
+    return f'course_rollup_pending:{course_id}'
+
+
+def enqueue_course_rollup_refresh(course_ids):
+    """課程任務的彙總變動後，於交易提交時排入重建課程層級彙總的背景任務"""
+    for course_id in set(course_ids):
+        transaction.on_commit(lambda course_id=course_id: _schedule_course_rollup_refresh(course_id))
+
+
+def _schedule_course_rollup_refresh(course_id):
+    """
+    延遲 COURSE_ROLLUP_REFRESH_DELAY 秒後重建課程彙總；已有尚未開始的重建時不再重複排入，
+    批量分析中每份作業的儲存因此合併為一次重建（重建開始時才清除快取鍵，之後的變動會排入下一次）
+    """
+    # 延遲載入，避免 utils 與 tasks 循環引用
+    from ..tasks import rebuild_course_rollup
+
+    delay = settings.COURSE_ROLLUP_REFRESH_DELAY
+    # 快取鍵設有期限，worker 中途失效而未執行重建時，之後的變動仍能重新排入
+    if not cache.add(get_course_rollup_pending_key(course_id), True, timeout=delay + COURSE_ROLLUP_PENDING_TIMEOUT):
+        return
+    rebuild_course_rollup.apply_async((course_id,), countdown=delay)
+
+
+def _add_counts(totals, counts, keep_zero=False):
+    for key, value in (counts or {}).items():
+        if _is_number(value) and (value or keep_zero):
+            totals[key] = totals.get(key, 0) + value
+
+
+def compute_course_rollup(course_id):
+    """由課程下各課程任務的彙總加總出課程層級的彙總，只讀取課程任務、不掃描學生作業"""
+    totals = {'all_assistive_tool_analysis': {}, 'all_prompt_analysis': {}, 'all_keyword_analysis': {}}
+    course_tasks_count = 0
+    for values in CourseTask.objects.filter(course_id=course_id).values(
+        'all_assistive_tool_analysis', 'all_prompt_analysis', 'all_keyword_analysis'
+    ):
+        course_tasks_count += 1
+        _add_counts(totals['all_assistive_tool_analysis'], values['all_assistive_tool_analysis'], keep_zero=True)
+        _add_counts(totals['all_prompt_analysis'], _prompt_list_to_dict(values['all_prompt_analysis']))
+        _add_counts(totals['all_keyword_analysis'], values['all_keyword_analysis'])
+    return {'course_tasks_count': course_tasks_count, **totals}
+
+
+def save_course_rollup(course_id, rollup):
+    """將課程層級的彙總寫回課程"""
+    Course.objects.filter(id=course_id).update(
+        all_assistive_tool_analysis=rollup['all_assistive_tool_analysis'],
+        all_prompt_analysis=[
+            {"keyword": keyword, "times": times} for keyword, times in rollup['all_prompt_analysis'].items()
+        ],
+        all_keyword_analysis=rollup['all_keyword_analysis'],
+        rollup_updated_at=timezone.now(),
+    )
+
+
+def refresh_course_rollup(course_id):
+    rollup = compute_course_rollup(course_id)
+    save_course_rollup(course_id, rollup)
+    return rollup
+
+
+def get_course_rollup(course):
+    """讀取課程層級的彙總，格式與 compute_course_rollup 相同（不含課程任務數）"""
+    return {
+        'all_assistive_tool_analysis': course.all_assistive_tool_analysis or {},
+        'all_prompt_analysis': _prompt_list_to_dict(course.all_prompt_analysis),
+        'all_keyword_analysis': course.all_keyword_analysis or {},
+    }
+
+
+def _top_keys(counts, top_k):
+    return [key for key, _ in sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:top_k]]
+
+
+def get_course_trends(course, top_k=20):
+    """
+    課程各單元（課程任務，依建立時間排序）的分析趨勢：課程層級彙總中前 top_k 名的提示詞與關鍵詞、
+    以及所有輔助工具在每個單元的次數；只讀取課程、其課程任務的彙總與各單元的作業數
+    """
+    course_rollup = get_course_rollup(course)
+    units = list(
+        CourseTask.objects.filter(course_id=course.id).order_by('created_at', 'id').values(
+            'id', 'name', 'created_at', 'all_assistive_tool_analysis', 'all_prompt_analysis', 'all_keyword_analysis'
+        )
+    )
+    submission_counts = dict(
+        StudentCourseTask.objects.filter(course_id=course.id).values('course_task_id').annotate(
+            total=Count('id')
+        ).values_list('course_task_id', 'total')
+    )
+
+    tools = sorted(course_rollup['all_assistive_tool_analysis'])
+    prompts = _top_keys(course_rollup['all_prompt_analysis'], top_k)
+    keywords = _top_keys(course_rollup['all_keyword_analysis'], top_k)
+    series = {
+        'assistive_tools': {tool: [] for tool in tools},
+        'prompts': {prompt: [] for prompt in prompts},
+        'keywords': {keyword: [] for keyword in keywords},
+    }
+    for unit in units:
+        unit_prompts = _prompt_list_to_dict(unit['all_prompt_analysis'])
+        for tool in tools:
+            series['assistive_tools'][tool].append((unit['all_assistive_tool_analysis'] or {}).get(tool, 0))
+        for prompt in prompts:
+            series['prompts'][prompt].append(unit_prompts.get(prompt, 0))
+        for keyword in keywords:
+            series['keywords'][keyword].append((unit['all_keyword_analysis'] or {}).get(keyword, 0))
+
+    return {
+        'units': [
+            {
+                'course_task_id': unit['id'],
+                'name': unit['name'],
+                'created_at': unit['created_at'],
+                'student_tasks_count': submission_counts.get(unit['id'], 0),
+            }
+            for unit in units
+        ],
+        'series': series,
+    }
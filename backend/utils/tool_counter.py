@@ -0,0 +1,139 @@
+from collections import deque
+
+# 介面上的輔助工具名稱，順序與 GPT 提示詞中的回覆格式相同
+ASSISTIVE_TOOLS = [
+    'quick_question',
+    'rabbit_hole',
+    'rewrite_this',
+    'turn_this_into_a',
+    'Ideate',
+    'teach_me_about_this',
+    'give_me',
+    'similar_stuff',
+    'summarize',
+    'code_this_up',
+    'custom',
+]
+
+# 工具名稱中的單字分隔符號（介面顯示為空白，OCR 常讀成底線、連字號或句點）
+WORD_SEPARATORS = set(' \t\r\n_-.·・')
+
+# OCR 常見的字元混淆，文本與工具名稱都套用相同的對應，比對時視為同一個字
+OCR_CONFUSIONS = {
+    '0': 'o',
+    '1': 'l',
+    'i': 'l',
+    '5': 's',
+}
+# 兩個字元被讀成一個字（或相反）的混淆，於逐字對應前先替換
+OCR_DIGRAPHS = [
+    ('rn', 'm'),
+    ('vv', 'w'),
+]
+
+# 不屬於任何工具名稱的字元，作為段落邊界
+BOUNDARY = '\0'
+
+
+def _normalize_word(word):
+    word = word.lower()
+    for source, target in OCR_DIGRAPHS:
+        word = word.replace(source, target)
+    return ''.join(OCR_CONFUSIONS.get(char, char) for char in word)
+
+
+def normalize_text(text):
+    """
+    將 OCR 文本正規化為只含英數字的字串，並回傳每個位置是否為單字開頭；
+    分隔符號被移除（工具名稱可跨越空白、底線或換行），其他字元（中文、標點）變成邊界
+    """
+    chars = []
+    word_starts = []
+    word = []
+
+    def flush_word():
+        normalized = _normalize_word(''.join(word))
+        for index, char in enumerate(normalized):
+            chars.append(char)
+            word_starts.append(index == 0)
+        word.clear()
+
+    for char in text:
+        if char.isascii() and (char.isalnum() or char in OCR_CONFUSIONS):
+            word.append(char)
+        elif char in WORD_SEPARATORS:
+            flush_word()
+        else:
+            flush_word()
+            chars.append(BOUNDARY)
+            word_starts.append(True)
+    flush_word()
+    return ''.join(chars), word_starts
+
+
+class AhoCorasick:
+    """多字串比對自動機，一次掃描文本即可找出所有工具名稱的出現位置"""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+
+        for key, pattern in patterns.items():
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.outputs[state].append((key, len(pattern)))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.goto[fail].get(char, 0)
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+
+    def iter_matches(self, text):
+        """逐一產生 (名稱, 起始位置, 結束位置)"""
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for key, length in self.outputs[state]:
+                yield key, index - length + 1, index + 1
+
+
+_matcher = None
+
+
+def get_matcher():
+    global _matcher
+    if _matcher is None:
+        _matcher = AhoCorasick({
+            tool: normalize_text(tool)[0] for tool in ASSISTIVE_TOOLS
+        })
+    return _matcher
+
+
+def count_assistive_tools(text):
+    """在本機統計 OCR 文本中各輔助工具名稱出現的次數，只計算完整單字的比對結果"""
+    counts = dict.fromkeys(ASSISTIVE_TOOLS, 0)
+    if not text:
+        return counts
+
+    normalized, word_starts = normalize_text(text)
+    length = len(normalized)
+    for tool, start, end in get_matcher().iter_matches(normalized):
+        # 前後都必須是單字邊界，避免 forgive me 被算成 give me
+        if word_starts[start] and (end == length or word_starts[end]):
+            counts[tool] += 1
+    return counts
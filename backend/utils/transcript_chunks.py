@@ -0,0 +1,118 @@
+import re
+
+# 中日韓文字約一字一個 token，其餘文字（英文、數字、符號）約四個字元一個 token
+CJK_PATTERN = re.compile(r'[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]')
+
+
+def estimate_text_tokens(text):
+    """不依賴 tokenizer 的 token 數粗估，用於切段與 TPM 預算"""
+    cjk_count = len(CJK_PATTERN.findall(text))
+    return cjk_count + (len(text) - cjk_count + 3) // 4
+
+
+def _split_long_line(line, max_tokens):
+    # 單行就超過上限時依估計的 token 數硬切
+    pieces = []
+    start = 0
+    tokens = 0.0
+    for index, char in enumerate(line):
+        cost = 1 if CJK_PATTERN.match(char) else 0.25
+        if tokens + cost > max_tokens and index > start:
+            pieces.append(line[start:index])
+            start = index
+            tokens = 0.0
+        tokens += cost
+    pieces.append(line[start:])
+    return pieces
+
+
+def split_transcript(text, max_tokens):
+    """
+    依行切分 OCR 文本，每段不超過 max_tokens；優先在空行（對話段落之間）切開，
+    段落本身過長時才在行與行之間切開
+    """
+    if estimate_text_tokens(text) <= max_tokens:
+        return [text]
+
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append('\n'.join(current).strip('\n'))
+            current = []
+            current_tokens = 0
+
+    for block in re.split(r'\n\s*\n', text):
+        block_tokens = estimate_text_tokens(block)
+        if current_tokens + block_tokens <= max_tokens:
+            current.append(block + '\n')
+            current_tokens += block_tokens
+            continue
+
+        flush()
+        if block_tokens <= max_tokens:
+            current.append(block + '\n')
+            current_tokens = block_tokens
+            continue
+
+        for line in block.split('\n'):
+            line_tokens = estimate_text_tokens(line)
+            if line_tokens > max_tokens:
+                flush()
+                chunks.extend(_split_long_line(line, max_tokens))
+                continue
+            if current_tokens + line_tokens > max_tokens:
+                flush()
+            current.append(line)
+            current_tokens += line_tokens
+        flush()
+
+    flush()
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def merge_analysis_results(results):
+    """
+    合併各段的分析結果：工具次數與關鍵詞次數相加，討論主題依段落順序去重後串接；
+    關鍵詞依次數遞減、名稱遞增排序，相同輸入一定得到相同輸出
+    """
+    tool_counts = {}
+    keyword_counts = {}
+    topics = []
+    descriptions = []
+
+    for result in results:
+        for tool, count in (result.get('assistive_tool_analysis') or {}).items():
+            if isinstance(count, (int, float)):
+                tool_counts[tool] = tool_counts.get(tool, 0) + count
+
+        prompt_analysis = result.get('prompt_analysis') or {}
+        for prompt_item in prompt_analysis.get('prompts') or []:
+            keyword = prompt_item.get('keyword')
+            times = prompt_item.get('times', 0)
+            if keyword and isinstance(times, (int, float)):
+                keyword_counts[keyword] = keyword_counts.get(keyword, 0) + times
+
+        discussion_topics = prompt_analysis.get('discussion_topics') or {}
+        topic = discussion_topics.get('topic')
+        if topic and topic not in topics:
+            topics.append(topic)
+            if discussion_topics.get('description'):
+                descriptions.append(discussion_topics['description'])
+
+    return {
+        'assistive_tool_analysis': tool_counts,
+        'prompt_analysis': {
+            'discussion_topics': {
+                'topic': '、'.join(topics),
+                'description': '\n'.join(descriptions),
+            },
+            'prompts': [
+                {'keyword': keyword, 'times': times}
+                for keyword, times in sorted(keyword_counts.items(), key=lambda item: (-item[1], item[0]))
+            ],
+        },
+    }
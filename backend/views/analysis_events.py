@@ -0,0 +1,22 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import status
+
+from ..models.analysis_batches import AnalysisBatch
+from ..utils.progress_events import stream_batch_events
+
+
+async def analysis_batch_events(request, batch_id):
+    """以 Server-Sent Events 串流批量分析的各作業階段進度（需以 ASGI 部署）"""
+    exists = await sync_to_async(AnalysisBatch.objects.filter(id=batch_id).exists)()
+    if not exists:
+        return JsonResponse(
+            {'detail': f'找不到 ID 為 {batch_id} 的批量分析任務'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    response = StreamingHttpResponse(stream_batch_events(batch_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # 關閉 nginx 緩衝，事件才能即時送達
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,12 +1,16 @@
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from ..models.course_tasks import CourseTask
 from ..models.student_course_tasks import StudentCourseTask
 from ..serializers.course_task_serializer import CourseTaskSerializer
+from ..utils.keyword_index import get_cooccurring_keywords, get_top_keywords, search_keyword_postings
+from ..utils.keyword_normalization import normalize_keyword
+from .mixins import EagerLoadingViewSetMixin, TopKQueryMixin
 
 
-class CourseTaskViewSet(viewsets.ModelViewSet):
+class CourseTaskViewSet(EagerLoadingViewSetMixin, TopKQueryMixin, viewsets.ModelViewSet):
     queryset = CourseTask.objects.all()
     serializer_class = CourseTaskSerializer
     permission_classes = [IsAuthenticated]
@@ -35,3 +39,72 @@ class CourseTaskViewSet(viewsets.ModelViewSet):
 
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    @action(detail=True, methods=['get'])
+    def keyword_search(self, request, pk=None):
+        """
+        查詢哪些學生的作業提到指定關鍵詞（keyword 可用逗號分隔多個，match=all 時需全部提到），
+        透過關鍵詞反向索引查詢，不需讀取每份作業的分析結果
+        """
+        course_task = self.get_object()
+        keywords = [
+            normalize_keyword(keyword, course_task.course_id)
+            for keyword in request.query_params.get('keyword', '').split(',') if keyword.strip()
+        ]
+        if not keywords:
+            return Response(
+                {'detail': '請提供關鍵詞'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = search_keyword_postings(
+            course_task.id, keywords, match_all=request.query_params.get('match') == 'all'
+        )
+        return Response({
+            'course_task_id': course_task.id,
+            'keywords': keywords,
+            'count': len(results),
+            'results': results
+        })
+
+    @action(detail=True, methods=['get'])
+    def top_keywords(self, request, pk=None):
+        """課程任務中最多作業提到的關鍵詞"""
+        course_task = self.get_object()
+        try:
+            top_k = self.get_top_k(request)
+        except ValueError as e:
+            return Response(
+                {'detail': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({
+            'course_task_id': course_task.id,
+            'keywords': get_top_keywords(course_task.id, top_k)
+        })
+
+    @action(detail=True, methods=['get'])
+    def keyword_cooccurrence(self, request, pk=None):
+        """與指定關鍵詞出現在同一份作業中最多次的關鍵詞"""
+        course_task = self.get_object()
+        keyword = request.query_params.get('keyword', '')
+        try:
+            top_k = self.get_top_k(request)
+        except ValueError as e:
+            return Response(
+                {'detail': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not keyword.strip():
+            return Response(
+                {'detail': '請提供關鍵詞'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        keyword = normalize_keyword(keyword, course_task.course_id)
+        return Response({
+            'course_task_id': course_task.id,
+            'keyword': keyword,
+            'keywords': get_cooccurring_keywords(course_task.id, keyword, top_k)
+        })
@@ -13,6 +13,8 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import rest_framework as django_filters
 
 from ..serializers.course_task_serializer import CourseTaskSerializer
+from ..utils.rollup_utils import get_course_rollup, get_course_trends
+from .mixins import EagerLoadingViewSetMixin, TopKQueryMixin
 
 
 class CourseFilter(django_filters.FilterSet):
@@ -25,7 +27,7 @@ class CourseFilter(django_filters.FilterSet):
         fields = ['student_class', 'is_active', 'name']
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(EagerLoadingViewSetMixin, TopKQueryMixin, viewsets.ModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     permission_classes = [IsAuthenticated]
@@ -76,6 +78,30 @@ class CourseViewSet(viewsets.ModelViewSet):
     def course_tasks(self, request, pk=None):
         """獲取屬於該課程的所有課程任務"""
         course = self.get_object()
-        course_tasks = CourseTask.objects.filter(course=course)
+        course_tasks = CourseTaskSerializer.setup_eager_loading(CourseTask.objects.filter(course=course))
         serializer = CourseTaskSerializer(course_tasks, many=True)
         return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def analytics_trend(self, request, pk=None):
+        """課程層級的分析彙總與各單元（課程任務）的趨勢，只讀取課程與其課程任務的彙總"""
+        course = self.get_object()
+        try:
+            top_k = self.get_top_k(request)
+        except ValueError as e:
+            return Response(
+                {'detail': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rollup = get_course_rollup(course)
+        return Response({
+            'course_id': course.id,
+            'rollup_updated_at': course.rollup_updated_at,
+            'all_assistive_tool_analysis': rollup['all_assistive_tool_analysis'],
+            'all_prompt_analysis': [
+                {"keyword": keyword, "times": times} for keyword, times in rollup['all_prompt_analysis'].items()
+            ],
+            'all_keyword_analysis': rollup['all_keyword_analysis'],
+            **get_course_trends(course, top_k)
+        })
@@ -0,0 +1,35 @@
+from rest_framework import viewsets
+from rest_framework.permissions import SAFE_METHODS, IsAdminUser, IsAuthenticated
+
+from django_filters.rest_framework import DjangoFilterBackend
+from django_filters import rest_framework as django_filters
+
+from ..models.keyword_normalizations import KeywordNormalization
+from ..serializers.keyword_normalization_serializer import KeywordNormalizationSerializer
+
+
+class KeywordNormalizationFilter(django_filters.FilterSet):
+    course = django_filters.NumberFilter(field_name="course")
+    is_global = django_filters.BooleanFilter(field_name="course", lookup_expr="isnull")
+
+    class Meta:
+        model = KeywordNormalization
+        fields = ['course', 'is_global']
+
+
+class KeywordNormalizationViewSet(viewsets.ModelViewSet):
+    """
+    關鍵詞正規化對照表，教師可自行新增同義詞或繁簡變體；
+    變動後只重新分析含有相關詞的作業（見 backend/signals.py）
+    """
+    queryset = KeywordNormalization.objects.all().order_by('id')
+    serializer_class = KeywordNormalizationSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = KeywordNormalizationFilter
+
+    def get_permissions(self):
+        # 對照表變動會重新分析各課程的作業，只有教師可以修改，學生僅能查詢
+        if self.request.method in SAFE_METHODS:
+            return [IsAuthenticated()]
+        return [IsAdminUser()]
@@ -0,0 +1,20 @@
+class EagerLoadingViewSetMixin:
+    """依 viewset 目前使用的序列化器套用其關聯載入設定（見 serializers/eager_loading.py）"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'setup_eager_loading'):
+            queryset = serializer_class.setup_eager_loading(queryset)
+        return queryset
+
+
+class TopKQueryMixin:
+    """解析排行類端點的 top_k 查詢參數：必須為正整數，超過 max_top_k 時以上限計算"""
+    max_top_k = 200
+
+    def get_top_k(self, request, default=20):
+        top_k = int(request.query_params.get('top_k', default))
+        if top_k <= 0:
+            raise ValueError('top_k 必須為正整數')
+        return min(top_k, self.max_top_k)
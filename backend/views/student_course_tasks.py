@@ -2,19 +2,23 @@ from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db import IntegrityError
 from celery.result import AsyncResult
+from django.db import IntegrityError
 import json
 
 from ..models.course_tasks import CourseTask  # 引入 CourseTask 模型
 from ..models.student_course_tasks import StudentCourseTask
 from ..serializers.student_course_task_serializer import StudentCourseTaskSerializer
-from ..tasks import batch_analyze_tasks
-from ..utils.analysis_utils import extract_text, analyze_keywords, analyze_assist_tools_and_prompt
+from ..tasks import build_analysis_chain, bulk_keyword_analysis, start_batch_analysis
+from ..utils.keyword_tfidf import SCOPE_COURSE_TASK, get_distinctive_keywords
+from ..utils.progress_utils import get_batch_progress
+from ..utils.rollup_utils import get_course_task_rollup, refresh_course_task_rollup
+from .mixins import EagerLoadingViewSetMixin, TopKQueryMixin
 
 
-class StudentCourseTaskViewSet(viewsets.ModelViewSet):
-    queryset = StudentCourseTask.objects.all()
+class StudentCourseTaskViewSet(EagerLoadingViewSetMixin, TopKQueryMixin, viewsets.ModelViewSet):
+    # 完整的關鍵詞次數（keyword_counts）可能很大且序列化器未使用，只有 distinctive_keywords 需要時才載入
+    queryset = StudentCourseTask.objects.defer('keyword_counts')
     serializer_class = StudentCourseTaskSerializer
     permission_classes = [IsAuthenticated]
 
@@ -46,7 +50,11 @@ class StudentCourseTaskViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def analyze_task(self, request, pk=None):
-        """分析作業內容，包括OCR、關鍵詞、輔助工具與提示詞分析"""
+        """
+        分析作業內容，包括OCR、關鍵詞、輔助工具與提示詞分析；
+        OCR 與 GPT 分析排入 Celery 執行（web 行程不載入 torch / easyocr），回傳 202 與 celery_task_id，
+        前端帶著 celery_task_id 再次呼叫本端點輪詢，完成後回傳分析結果
+        """
         try:
             task = self.get_object()
 
@@ -66,48 +74,28 @@ class StudentCourseTaskViewSet(viewsets.ModelViewSet):
                     'is_analyzed': task.is_analyzed
                 })
 
-            # 如果沒有分析結果，進行分析
-
-            # 1. 提取文本
-            if not task.ocr_content:
-                ocr_result = extract_text(task)
-                if not ocr_result['success']:
-                    return Response(
-                        {'detail': ocr_result['message']},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-            # 2. 分析關鍵詞
-            if not task.keyword_analysis:
-                keywords_result = analyze_keywords(task)
-                if not keywords_result['success']:
-                    return Response(
-                        {'detail': keywords_result['message']},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-            # 3. 分析輔助工具與提示詞
-            analysis_result = analyze_assist_tools_and_prompt(task)
-            if not analysis_result['success']:
+            celery_task_id = request.query_params.get('celery_task_id')
+            if celery_task_id:
+                # 輪詢：chain 的最後一個階段回傳各階段的結果，失敗時帶有失敗的階段與原因
+                result = AsyncResult(celery_task_id)
+                if result.ready():
+                    payload = result.result if result.successful() else {'message': str(result.result)}
+                    if not isinstance(payload, dict) or payload.get('status') != 'SUCCESS':
+                        return Response(
+                            {'detail': (payload or {}).get('message') or '作業分析失敗'},
+                            status=status.HTTP_400_BAD_REQUEST
+                        )
                 return Response(
-                    {'detail': analysis_result['message']},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                    {'celery_task_id': celery_task_id, 'status': result.state},
+                    status=status.HTTP_202_ACCEPTED
                 )
 
-            # 4. 更新分析狀態
-            task.is_analyzed = True
-            task.save()
-
-            # 刷新資料
-            task.refresh_from_db()
-
-            # 返回所有分析結果
-            return Response({
-                'keyword_analysis': task.keyword_analysis,
-                'assistive_tool_analysis': task.assistive_tool_analysis,
-                'prompt_analysis': task.prompt_analysis,
-                'is_analyzed': task.is_analyzed
-            })
+            # 如果沒有分析結果，排入分析 chain（OCR -> 關鍵詞 -> 輔助工具與提示詞）
+            result = build_analysis_chain(task.id).apply_async()
+            return Response(
+                {'celery_task_id': result.id, 'status': 'STARTED'},
+                status=status.HTTP_202_ACCEPTED
+            )
 
         except Exception as e:
             return Response(
@@ -117,28 +105,80 @@ class StudentCourseTaskViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def patch_analyze_task(self, request, pk=None):
-        """批量分析指定課程任務的所有學生作業"""
+        """批量分析指定課程任務的所有學生作業（pk 為課程任務 ID）"""
         try:
-            # 獲取當前的學生課程任務
-            task = self.get_object()
-            course_id = request.query_params.get('course_id')
-            course_task_id = task.course_task.id
+            course_task = CourseTask.objects.get(id=pk)
+            course_id = request.query_params.get('course_id') or course_task.course_id
 
-            # 啟動批量處理 Celery 任務
-            batch_task = batch_analyze_tasks.delay(course_id, course_task_id)
+            # 以 chord 啟動所有作業的分析，全部完成後自動彙總課程任務
+            # mode=packed 時將多份較短的作業合併成一個 GPT 請求，mode=offline 時透過 Batch API 離線分析
+            batch = start_batch_analysis(course_id, course_task.id, request.query_params.get('mode'))
 
-            # 返回任務 ID 和狀態
+            # 返回可輪詢的 GroupResult ID
             return Response({
-                'batch_task_id': batch_task.id,
-                'message': f'批量分析任務已啟動'
+                'batch_task_id': batch['group_id'],
+                'status': batch['status'],
+                'total_tasks': batch['total_tasks'],
+                'message': batch['message']
             })
 
+        except CourseTask.DoesNotExist:
+            return Response(
+                {'detail': f'找不到 ID 為 {pk} 的課程任務'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except ValueError as e:
+            return Response(
+                {'detail': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {'detail': f'批量分析啟動失敗: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=True, methods=['get'])
+    def patch_analyze_keywords(self, request, pk=None):
+        """重新分析指定課程任務所有作業的關鍵詞（pk 為課程任務 ID），以單一 Celery 任務批量處理"""
+        try:
+            course_task = CourseTask.objects.get(id=pk)
+            result = bulk_keyword_analysis.delay(course_task.id)
+            return Response({
+                'celery_task_id': result.id,
+                'status': 'STARTED',
+                'message': '已啟動批量關鍵詞分析'
+            })
+
+        except CourseTask.DoesNotExist:
+            return Response(
+                {'detail': f'找不到 ID 為 {pk} 的課程任務'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            return Response(
+                {'detail': f'批量關鍵詞分析啟動失敗: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=True, methods=['get'])
+    def distinctive_keywords(self, request, pk=None):
+        """以 TF-IDF 取得作業相對於課程任務（scope=course_task）或整個課程（scope=course）最具代表性的關鍵詞"""
+        task = self.get_object()
+        try:
+            top_k = self.get_top_k(request)
+            keywords = get_distinctive_keywords(task, request.query_params.get('scope', SCOPE_COURSE_TASK), top_k)
+        except ValueError as e:
+            return Response(
+                {'detail': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({
+            'task_id': task.id,
+            'distinctive_keywords': [{'keyword': keyword, 'score': score} for keyword, score in keywords]
+        })
+
     # 添加檢查任務狀態的端點
     @action(detail=False, methods=['get'])
     def check_task_status(self, request):
@@ -151,29 +191,14 @@ class StudentCourseTaskViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        result = AsyncResult(task_id)
-
-        response_data = {
-            'task_id': task_id,
-            'status': 'PENDING',
-        }
-
-        if result.status == "SUCCESS" and result.result:
-            if isinstance(result.result, dict):
-                child_task = result.result.get('task_details')
-                all_completed = True
-
-                for task in child_task:
-                    if 'celery_task_id' in task:
-                        child_result = AsyncResult(task['celery_task_id'])
-                        task['status'] = child_result.status
-                        if child_result.status != 'SUCCESS':
-                            all_completed = False
-                            break
-                if all_completed:
-                    response_data['status'] = 'SUCCESS'
+        progress = get_batch_progress(task_id)
+        if progress is None:
+            return Response(
+                {'detail': f'找不到 ID 為 {task_id} 的批量分析任務'},
+                status=status.HTTP_404_NOT_FOUND
+            )
 
-        return Response(response_data)
+        return Response(progress)
 
     @action(detail=False, methods=['get'])
     def analyze_all_student_course_tasks(self, request):
@@ -181,76 +206,27 @@ class StudentCourseTaskViewSet(viewsets.ModelViewSet):
         course_task_id = request.query_params.get('courseTaskId')
 
         course_task = CourseTask.objects.get(id=course_task_id)
-        student_course_tasks = StudentCourseTask.objects.filter(
-            course_task_id=course_task_id
-        )
-
-        if not student_course_tasks.exists():
+        if request.query_params.get('recompute', '').lower() == 'true':
+            # 以資料庫端的聚合查詢重新計算並覆寫彙總
+            rollup = refresh_course_task_rollup(course_task.id)
+        else:
+            # 彙總隨各作業的分析結果增量維護，直接讀取不需掃描所有作業
+            rollup = get_course_task_rollup(course_task)
+
+        if not rollup['student_tasks_count']:
             return Response(
                 {'detail': f'沒有找到與課程任務ID {course_task_id} 相關的學生課程任務'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        all_assistive_tool_analysis = {}
-        all_prompt_analysis = {}
-        all_keyword_analysis = {}
-
-        for task in student_course_tasks:
-            # 處理輔助工具分析數據
-            if task.assistive_tool_analysis:
-                try:
-                    assistive_data = task.assistive_tool_analysis
-                    for tool, value in assistive_data.items():
-                        if tool in all_assistive_tool_analysis:
-                            all_assistive_tool_analysis[tool] += value
-                        else:
-                            all_assistive_tool_analysis[tool] = value
-                except Exception as e:
-                    print(f"處理輔助工具分析數據時出錯: {str(e)}")
-
-            # 處理提示詞分析數據
-            if task.prompt_analysis:
-                try:
-                    prompt_data = task.prompt_analysis
-                    if 'prompts' in prompt_data:
-                        for prompt_item in prompt_data['prompts']:
-                            keyword = prompt_item.get('keyword')
-                            times = prompt_item.get('times', 0)
-
-                            if keyword in all_prompt_analysis:
-                                all_prompt_analysis[keyword] += times
-                            else:
-                                all_prompt_analysis[keyword] = times
-                except Exception as e:
-                    print(f"處理提示詞分析數據時出錯: {str(e)}")
-
-            # 處理關鍵詞分析數據
-            if task.keyword_analysis:
-                try:
-                    keyword_data = task.keyword_analysis
-                    if 'top_keywords' in keyword_data:
-                        top_keywords = keyword_data['top_keywords']
-                        for keyword, count in top_keywords.items():
-                            if keyword in all_keyword_analysis:
-                                all_keyword_analysis[keyword] += count
-                            else:
-                                all_keyword_analysis[keyword] = count
-                except Exception as e:
-                    print(f"處理關鍵詞分析數據時出錯: {str(e)}")
-
-        formatted_prompt_analysis = [{"keyword": keyword, "times": times} for keyword, times in all_prompt_analysis.items()]
-
-
-        # 更新課程任務的匯總分析數據
-        course_task.all_assistive_tool_analysis = all_assistive_tool_analysis
-        course_task.all_prompt_analysis = formatted_prompt_analysis
-        course_task.all_keyword_analysis = all_keyword_analysis
-        course_task.save()
+        all_assistive_tool_analysis = rollup['all_assistive_tool_analysis']
+        all_prompt_analysis = rollup['all_prompt_analysis']
+        all_keyword_analysis = rollup['all_keyword_analysis']
 
         return Response({
             "message": "課程任務分析數據匯總成功",
             "course_task_id": course_task_id,
-            "student_tasks_count": student_course_tasks.count(),
+            "student_tasks_count": rollup['student_tasks_count'],
             "all_assistive_tool_analysis": all_assistive_tool_analysis,
             "all_prompt_analysis": [all_prompt_analysis],
             "all_keyword_analysis": all_keyword_analysis
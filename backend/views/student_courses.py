@@ -11,6 +11,7 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import rest_framework as django_filters
 
 from ..serializers.student_course_task_serializer import StudentCourseTaskSerializer
+from .mixins import EagerLoadingViewSetMixin
 
 
 class StudentCourseFilter(django_filters.FilterSet):
@@ -22,7 +23,7 @@ class StudentCourseFilter(django_filters.FilterSet):
         fields = ['student', 'course']
 
 
-class StudentCourseViewSet(viewsets.ModelViewSet):
+class StudentCourseViewSet(EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     queryset = StudentCourse.objects.all()
     serializer_class = StudentCourseSerializer
     permission_classes = [IsAuthenticated]
@@ -33,9 +34,11 @@ class StudentCourseViewSet(viewsets.ModelViewSet):
     def student_course_tasks(self, request, pk=None):
         """獲取特定學生課程的所有學生課程任務"""
         student_course = self.get_object()
-        student_course_tasks = StudentCourseTask.objects.filter(
-            student=student_course.student,
-            course=student_course.course
+        student_course_tasks = StudentCourseTaskSerializer.setup_eager_loading(
+            StudentCourseTask.objects.filter(
+                student_id=student_course.student_id,
+                course_id=student_course.course_id
+            )
         )
 
         serializer = StudentCourseTaskSerializer(student_course_tasks, many=True)
@@ -20,6 +20,14 @@ import {useAlertLoading} from "../../../store/hooks/useAlertLoading";
 import {StudentCourseService} from "../../../utils/services/studentCourseService";
 
 import {Assignment as CourseTask} from "../../../store/hooks/useStudentClass";
+import {AnalysisStageEvent, Req_checkPatchStatus, Res_analysisEvent} from "../../../utils/API/interface";
+
+const ANALYSIS_STAGE_LABELS: Record<AnalysisStageEvent, string> = {
+  ocr_done: 'OCR 完成',
+  keywords_done: '關鍵詞完成',
+  llm_done: '已分析',
+  failed: '分析失敗',
+};
 
 interface Student {
   name: string;
@@ -61,6 +69,10 @@ const SubmissionComponent: React.FC<SubmissionComponentProps> = ({
   const [showSubmissionDetail, setShowSubmissionDetail] = useState(false);
   const [selectedSubmission, setSelectedSubmission] = useState<StudentSubmission | null>(null);
 
+  // 批量分析進行中各作業的最新階段
+  const [analysisStages, setAnalysisStages] = useState<Record<number, AnalysisStageEvent>>({});
+  const [isBatchRunning, setIsBatchRunning] = useState(false);
+
   const {setAlertLog, setLoadingOpen} = useAlertLoading();
 
   // 格式化日期
@@ -106,27 +118,93 @@ const SubmissionComponent: React.FC<SubmissionComponentProps> = ({
     setShowSubmissionDetail(false);
   };
 
+  const handleAnalyzeFinished = (progress?: Req_checkPatchStatus) => {
+    setIsBatchRunning(false)
+    setLoadingOpen(false)
+    if (progress?.status === 'FAILURE') {
+      setAlertLog('FAILURE', `分析未能完成，成功 ${progress.completed} 份，失敗 ${progress.failed} 份，請稍後重新分析`);
+    } else {
+      setAlertLog('SUCCESS', progress
+        ? `分析完成，成功 ${progress.completed} 份，失敗 ${progress.failed} 份`
+        : '分析完成');
+    }
+    onEndOfAnalytic()
+  }
+
+  // 無法建立事件串流時改為輪詢進度
+  const pollAnalyzeStatus = (batchId: string) => {
+    setLoadingOpen(true)
+    const checkStatusInterval = setInterval(() => {
+      StudentCourseService.checkPatchAnalyzeStatus(batchId).then(res => {
+        console.log(`${res.status} ${res.percentage}% (${res.completed + res.failed}/${res.total})`)
+        if (res.status !== 'RUNNING') {
+          clearInterval(checkStatusInterval);
+          handleAnalyzeFinished(res)
+        }
+      })
+    }, 1000)
+  }
+
+  // 以 SSE 接收各作業的分析階段，即時更新表格中的分析狀態
+  const subscribeAnalyzeEvents = (batchId: string) => {
+    const eventSource = StudentCourseService.openAnalysisEvents(batchId)
+    let finished = false
+
+    const stageEvents: AnalysisStageEvent[] = ['ocr_done', 'keywords_done', 'llm_done', 'failed']
+    stageEvents.forEach(eventName => {
+      eventSource.addEventListener(eventName, (e) => {
+        const data: Res_analysisEvent = JSON.parse((e as MessageEvent).data)
+        if (data.task_id) {
+          setAnalysisStages(prev => ({...prev, [data.task_id as number]: eventName}))
+        }
+      })
+    })
+
+    eventSource.addEventListener('completed', (e) => {
+      finished = true
+      eventSource.close()
+      const data: Res_analysisEvent | Req_checkPatchStatus = JSON.parse((e as MessageEvent).data)
+      handleAnalyzeFinished('progress' in data ? data.progress : data as Req_checkPatchStatus)
+    })
+
+    eventSource.onerror = () => {
+      if (finished) return
+      eventSource.close()
+      pollAnalyzeStatus(batchId)
+    }
+  }
+
   const handleOneShotAnalyze = () => {
     StudentCourseService.patchAnalyzeStudentCourseTask(courseId, assignmentId).then(res => {
       setAlertLog(res.status, res.message + 'Work ID: ' + res.batch_task_id);
-      setLoadingOpen(true)
-
-      const checkStatusInterval = setInterval(() => {
-        if (res.batch_task_id) {
-          StudentCourseService.checkPatchAnalyzeStatus(res.batch_task_id).then(res => {
-            console.log(res.status)
-            if (res.status === 'SUCCESS') {
-              clearInterval(checkStatusInterval);
-              setLoadingOpen(false)
-              setAlertLog(res.status, '分析完成');
-              onEndOfAnalytic()
-            }
-          })
-        }
-      }, 1000)
+      if (res.batch_task_id) {
+        setIsBatchRunning(true)
+        setAnalysisStages({})
+        subscribeAnalyzeEvents(res.batch_task_id)
+      }
     })
   }
 
+  const renderAnalysisStatus = (submission: StudentSubmission) => {
+    const stage = submission.id ? analysisStages[submission.id] : undefined
+    if (stage && !submission.is_analyzed) {
+      return <Chip value={ANALYSIS_STAGE_LABELS[stage]} color={stage === 'failed' ? 'red' : 'blue'} size="sm"/>
+    }
+    return submission.is_analyzed ? (
+      <Chip
+        value="已分析"
+        color="green"
+        size="sm"
+      />
+    ) : (
+      <Chip
+        value="未分析"
+        color="amber"
+        size="sm"
+      />
+    )
+  }
+
 
   // 如果不是開啟狀態，不渲染任何內容
   if (!open) return null;
@@ -220,19 +298,7 @@ const SubmissionComponent: React.FC<SubmissionComponentProps> = ({
                                 )}
                               </td>
                               <td className="py-2 px-4 text-center">
-                                {submission.is_analyzed ? (
-                                  <Chip
-                                    value="已分析"
-                                    color="green"
-                                    size="sm"
-                                  />
-                                ) : (
-                                  <Chip
-                                    value="未分析"
-                                    color="amber"
-                                    size="sm"
-                                  />
-                                )}
+                                {renderAnalysisStatus(submission)}
                               </td>
                               <td className="py-2 px-4">{formatDate(submission.created_at || '')}</td>
                               <td className="py-2 px-4 text-center">
@@ -307,8 +373,9 @@ const SubmissionComponent: React.FC<SubmissionComponentProps> = ({
               variant="filled"
               color="blue"
               onClick={handleOneShotAnalyze}
+              disabled={isBatchRunning}
               placeholder={undefined}>
-              一鍵分析
+              {isBatchRunning ? '分析中...' : '一鍵分析'}
             </Button>
             <Button
               variant="text"
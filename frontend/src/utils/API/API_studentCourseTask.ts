@@ -1,5 +1,5 @@
 import {API_POST, API_GET, API_PUT, API_DELETE} from './config'
-import {Req_submitMark, Req_createAndUpdateStudentCourseTask} from "./interface";
+import {Req_submitMark, Req_createAndUpdateStudentCourseTask, Req_pollAnalyzeTask} from "./interface";
 
 /**
  * 獲取所有學生課程任務列表
@@ -77,10 +77,14 @@ export const API_submitMark = (taskId: string | number, markData: Req_submitMark
 /**
  * 分析學生課程任務內容
  * @param taskId 學生課程任務ID
- * @returns Promise 返回分析結果，包括OCR、關鍵詞、輔助工具與提示詞分析
+ * @param celeryTaskId 輪詢時帶入第一次呼叫回傳的 Celery 任務ID
+ * @returns Promise 已有結果時返回分析結果（包括關鍵詞、輔助工具與提示詞分析），分析中返回 202 與 celery_task_id
  */
-export const API_analyzeStudentCourseTask = (taskId: string | number) => {
-    return new API_GET(`${import.meta.env.VITE_APP_API_STUDENT_COURSE_TASKS}${taskId}/analyze_task/`).sendRequest()
+export const API_analyzeStudentCourseTask = (taskId: string | number, celeryTaskId?: string) => {
+    return new API_GET(
+        `${import.meta.env.VITE_APP_API_STUDENT_COURSE_TASKS}${taskId}/analyze_task/`,
+        celeryTaskId ? {celery_task_id: celeryTaskId} as Req_pollAnalyzeTask : undefined
+    ).sendRequest()
 }
 
 /**
@@ -102,3 +106,15 @@ export const API_patchAnalyzeStudentCourseTask = (courseId: string | number, cou
 export const API_checkPatchStatus = (taskId: string) => {
     return new API_GET(`${import.meta.env.VITE_APP_API_STUDENT_COURSE_TASKS}check_task_status/?task_id=${taskId}`).sendRequest()
 }
+
+/**
+ * 批量分析進度事件串流 (Server-Sent Events)
+ * @param batchId 批量分析任務ID
+ * @returns EventSource 逐筆接收各作業的分析階段事件
+ */
+export const API_openAnalysisEvents = (batchId: string) => {
+    return new EventSource(
+        `${import.meta.env.VITE_APP_API_STUDENT_COURSE_TASKS}analysis_events/${batchId}/`,
+        {withCredentials: true}
+    )
+}
@@ -152,15 +152,39 @@ export interface Req_submitMark extends RequestParams {
   teacher_mark: any;
 }
 
+export interface Req_pollAnalyzeTask extends RequestParams {
+  celery_task_id: string;
+}
+
 export interface Req_analyzeStudentCourseTask extends RequestParams {
   batch_task_id: string;
   status: string;
   message: string;
 }
 
+export type AnalysisStageEvent = "ocr_done" | "keywords_done" | "llm_done" | "failed";
+
+export interface Res_analysisEvent {
+  event: AnalysisStageEvent | "completed";
+  task_id?: number;
+  stage?: string;
+  message?: string;
+  progress?: Req_checkPatchStatus;
+}
+
 export interface Req_checkPatchStatus extends RequestParams {
   task_id: string;
-  status: "SUCCESS" | "PROGRESS";
+  status: "SUCCESS" | "RUNNING" | "FAILURE";
+  mode: "interactive" | "packed" | "offline";
+  total: number;
+  completed: number;
+  failed: number;
+  percentage: number;
+  stages: {
+    ocr: number;
+    keywords: number;
+    llm: number;
+  };
 }
 
 //--------------------------------------------------------
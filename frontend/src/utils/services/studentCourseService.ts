@@ -15,7 +15,11 @@ import {
     Req_analyzeStudentCourseTask, Req_checkPatchStatus,
     Req_createAndUpdateStudentCourse
 } from "../API/interface";
-import {API_checkPatchStatus, API_patchAnalyzeStudentCourseTask} from "../API/API_studentCourseTask";
+import {
+    API_checkPatchStatus,
+    API_openAnalysisEvents,
+    API_patchAnalyzeStudentCourseTask
+} from "../API/API_studentCourseTask";
 
 export class StudentCourseService {
     static async getAllStudentCourses() {
@@ -78,6 +82,10 @@ export class StudentCourseService {
         return resData
     }
 
+    static openAnalysisEvents(patchId: string) {
+        return API_openAnalysisEvents(patchId)
+    }
+
     static async analyzeAllStudentCourseTasks(studentCourseId: string | number) {
         const response = await API_analyzeAllStudentCourseTasksByCourse(studentCourseId)
         // const resData: Req_analyzeStudentCourseTask = response.data
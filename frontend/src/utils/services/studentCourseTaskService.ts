@@ -15,6 +15,10 @@ import {
   Req_createAndUpdateStudentCourseTask
 } from "../API/interface";
 
+// 單份作業分析的輪詢間隔與上限（OCR 與 GPT 分析通常在一分鐘內完成）
+const ANALYZE_POLL_INTERVAL_MS = 3000
+const ANALYZE_POLL_TIMEOUT_MS = 10 * 60 * 1000
+
 export class StudentCourseTaskService {
   static async getAllStudentCourseTasks() {
     const response = await API_getAllStudentCourseTasks()
@@ -65,7 +69,16 @@ export class StudentCourseTaskService {
   }
 
   static async analyzeStudentCourseTask(taskId: string | number) {
-    const response = await API_analyzeStudentCourseTask(taskId)
+    // 分析在 Celery 中執行，後端回傳 202 時帶著 celery_task_id 輪詢直到完成或失敗
+    let response = await API_analyzeStudentCourseTask(taskId)
+    const deadline = Date.now() + ANALYZE_POLL_TIMEOUT_MS
+    while (response.status === 202 && Date.now() < deadline) {
+      await new Promise(resolve => setTimeout(resolve, ANALYZE_POLL_INTERVAL_MS))
+      response = await API_analyzeStudentCourseTask(taskId, response.data.celery_task_id)
+    }
+    if (response.status !== 200) {
+      throw new Error(response.message || '作業分析未完成')
+    }
     return response.data
   }
 
@@ -40,6 +40,79 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Taipei'
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 分鐘超時限制
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1  # 單一作業耗時長，避免 worker 預先搶走其他作業
+# 各分析階段分流到不同佇列，依資源特性調整各 worker 的並行數
+CELERY_TASK_ROUTES = {
+    'backend.tasks.ocr_stage': {'queue': 'ocr'},  # CPU 密集，低並行
+    'backend.tasks.keyword_stage': {'queue': 'keywords'},
+    'backend.tasks.bulk_keyword_analysis': {'queue': 'keywords'},
+    'backend.tasks.reanalyze_normalized_keywords': {'queue': 'keywords'},
+    'backend.tasks.llm_stage': {'queue': 'llm'},  # 等待 OpenAI 回應，使用 threads 高並行
+    'backend.tasks.packed_llm_stage': {'queue': 'llm'},
+    'backend.tasks.submit_offline_batch': {'queue': 'llm'},
+    'backend.tasks.poll_offline_batch': {'queue': 'llm'},
+}
+# worker 子行程啟動時會預先載入 OCR 模型，需放寬啟動逾時
+CELERY_WORKER_PROC_ALIVE_TIMEOUT = int(os.getenv('CELERY_WORKER_PROC_ALIVE_TIMEOUT', '120'))
+
+# 批量分析進度事件（Redis pub/sub -> SSE）
+ANALYSIS_EVENTS_ENABLED = os.getenv('ANALYSIS_EVENTS_ENABLED', 'True').lower() == 'true'
+ANALYSIS_EVENTS_REDIS_URL = os.getenv('ANALYSIS_EVENTS_REDIS_URL', CELERY_BROKER_URL)
+ANALYSIS_EVENTS_HEARTBEAT = int(os.getenv('ANALYSIS_EVENTS_HEARTBEAT', '15'))  # 無事件時的保持連線間隔(秒)
+ANALYSIS_EVENTS_MAX_DURATION = int(os.getenv('ANALYSIS_EVENTS_MAX_DURATION', '3600'))  # 單一串流連線的最長時間(秒)，超過後前端改為輪詢
+
+# LLM 分析設定
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL') or None  # 可指向本機 stub server 進行測試
+LLM_MODEL = os.getenv('LLM_MODEL', 'gpt-4o')
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))  # 每個行程同時送出的請求數
+LLM_TOKENS_PER_MINUTE = int(os.getenv('LLM_TOKENS_PER_MINUTE', '0'))  # 每個行程的 TPM 預算，0 表示不限制
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '5'))  # 429/5xx 的重試次數
+LLM_REQUEST_TIMEOUT = float(os.getenv('LLM_REQUEST_TIMEOUT', '120'))  # 單一請求逾時(秒)
+LLM_CHUNK_MAX_TOKENS = int(os.getenv('LLM_CHUNK_MAX_TOKENS', '6000'))  # 超過此估計 token 數的文本切段分析後合併
+LLM_STRUCTURED_OUTPUT = os.getenv('LLM_STRUCTURED_OUTPUT', 'True').lower() == 'true'  # 以 JSON schema（structured outputs）限制回覆格式
+ASSIST_TOOLS_COUNTER = os.getenv('ASSIST_TOOLS_COUNTER', 'llm')  # 輔助工具次數由 llm（GPT）或 local（本機比對）統計
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'True').lower() == 'true'  # 以文本與提示詞版本快取分析結果
+LLM_CACHE_TTL_DAYS = int(os.getenv('LLM_CACHE_TTL_DAYS', '30'))  # 快取有效天數，0 表示不過期
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000'))
+LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', str(50 * 1024 * 1024)))
+ANALYSIS_BATCH_MODE = os.getenv('ANALYSIS_BATCH_MODE', 'interactive')  # interactive、packed（多份作業合併成一個請求）或 offline（Batch API）
+LLM_PACK_MAX_ITEMS = int(os.getenv('LLM_PACK_MAX_ITEMS', '8'))  # 每個合併請求最多的作業數
+LLM_PACK_MAX_CHARS = int(os.getenv('LLM_PACK_MAX_CHARS', '12000'))  # 每個合併請求的文本總字數上限
+LLM_PACK_ITEM_MAX_CHARS = int(os.getenv('LLM_PACK_ITEM_MAX_CHARS', '3000'))  # 超過此字數的作業單獨送出
+LLM_PACK_OUTPUT_TOKENS_PER_ITEM = int(os.getenv('LLM_PACK_OUTPUT_TOKENS_PER_ITEM', '800'))
+LLM_BATCH_BACKEND = os.getenv('LLM_BATCH_BACKEND', 'openai')  # 離線模式使用 openai（Batch API）或 local（本機替代實作）
+LLM_BATCH_POLL_INTERVAL = int(os.getenv('LLM_BATCH_POLL_INTERVAL', '300'))  # 離線批次輪詢間隔(秒)
+# 離線批次的 JSONL 檔（含學生 OCR 全文）存放目錄，需在 MEDIA_ROOT 以外避免被公開
+LLM_BATCH_DIR = os.getenv('LLM_BATCH_DIR', os.path.join(BASE_DIR, 'private', 'llm_batches'))
+
+# OCR 設定
+OCR_READER_POOL_SIZE = int(os.getenv('OCR_READER_POOL_SIZE', '1'))  # 每個 worker 行程保留的 reader 數量
+OCR_READER_IDLE_TIMEOUT = int(os.getenv('OCR_READER_IDLE_TIMEOUT', '600'))  # reader 閒置多久(秒)後釋放，0 表示不釋放
+OCR_READER_PREWARM = os.getenv('OCR_READER_PREWARM', 'True').lower() == 'true'
+KEYWORD_BULK_PROCESSES = int(os.getenv('KEYWORD_BULK_PROCESSES', '0'))  # 批量關鍵詞分析的平行行程數，0 表示使用 CPU 核心數
+KEYWORD_BULK_BATCH_SIZE = int(os.getenv('KEYWORD_BULK_BATCH_SIZE', '500'))  # bulk_update 每批寫回的作業數
+ROLLUP_SQL_AGGREGATION = os.getenv('ROLLUP_SQL_AGGREGATION', 'True').lower() == 'true'  # 重新計算彙總時在資料庫端以 JSON 函式加總（PostgreSQL / SQLite）
+COURSE_ROLLUP_REFRESH_DELAY = int(os.getenv('COURSE_ROLLUP_REFRESH_DELAY', '30'))  # 課程彙總延遲重建的秒數，期間內的變動合併為一次重建
+# 關鍵詞正規化對照檔（變體詞<TAB>標準詞），資料庫中的 KeywordNormalization 設定優先
+KEYWORD_NORMALIZATION_FILE = os.getenv(
+    'KEYWORD_NORMALIZATION_FILE', os.path.join(BASE_DIR, 'backend', 'data', 'keyword_normalization.tsv')
+)
+KEYWORD_USER_DICT = os.getenv('KEYWORD_USER_DICT', '')  # jieba 使用者詞典檔（jieba 格式），空字串表示不載入
+KEYWORD_ANALYZER_PREWARM = os.getenv('KEYWORD_ANALYZER_PREWARM', 'True').lower() == 'true'  # worker 啟動時預先載入 jieba 詞典與停用詞
+KEYWORD_TOKENIZER_CACHE_SIZE = int(os.getenv('KEYWORD_TOKENIZER_CACHE_SIZE', '8'))  # 每個 worker 行程保留的課程專用斷詞器數量（各複製一份 jieba 詞典）
+KEYWORD_NORMALIZATION_VERSION_TTL = int(os.getenv('KEYWORD_NORMALIZATION_VERSION_TTL', '60'))  # 正規化對照表版本的快取秒數
+OCR_MAX_IMAGE_PIXELS = int(os.getenv('OCR_MAX_IMAGE_PIXELS', '300000000'))  # 超過此像素數兩倍的圖片縮小到此像素數再辨識，0 表示不限制
+OCR_TARGET_DPI = int(os.getenv('OCR_TARGET_DPI', '144'))  # 高於此 DPI 的截圖先縮小
+OCR_TARGET_WIDTH = int(os.getenv('OCR_TARGET_WIDTH', '1600'))  # 辨識前的最大寬度 (px)
+OCR_TILE_HEIGHT = int(os.getenv('OCR_TILE_HEIGHT', '2000'))  # 長截圖切塊高度 (px)
+OCR_TILE_OVERLAP = int(os.getenv('OCR_TILE_OVERLAP', '200'))  # 相鄰切塊重疊高度 (px)，需大於單行文字高度
+OCR_TILE_WORKERS = int(os.getenv('OCR_TILE_WORKERS', '1'))  # 平行辨識的切塊數，受 OCR_READER_POOL_SIZE 限制
+OCR_PDF_DPI = int(os.getenv('OCR_PDF_DPI', '200'))  # PDF 頁面轉圖解析度
+OCR_PDF_WORKERS = int(os.getenv('OCR_PDF_WORKERS', '2'))  # 平行 OCR 的頁面行程數
+OCR_PDF_MIN_TEXT_CHARS = int(os.getenv('OCR_PDF_MIN_TEXT_CHARS', '20'))  # 文字層少於此字數的頁面改用 OCR
+OCR_CACHE_ENABLED = os.getenv('OCR_CACHE_ENABLED', 'True').lower() == 'true'  # 以檔案 SHA-256 快取 OCR 結果
+OCR_CACHE_MAX_ENTRIES = int(os.getenv('OCR_CACHE_MAX_ENTRIES', '5000'))
+OCR_CACHE_MAX_BYTES = int(os.getenv('OCR_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))
 
 # Optionally, you can allow all headers and methods
 CORS_ALLOW_HEADERS = [
@@ -145,6 +218,14 @@ if PROCESS_ON_PRODUCTION:
         }
     }
 
+    # web 與各 worker 行程共用的快取（課程彙總重建的合併鎖需跨行程可見）
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_REDIS_URL', CELERY_BROKER_URL),
+        }
+    }
+
     ALLOWED_HOSTS = ['localhost', 'ccj.infocom.yzu.edu.tw']
     CSRF_TRUSTED_ORIGINS = [
         'https://ccj.infocom.yzu.edu.tw'